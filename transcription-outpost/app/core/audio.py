@@ -1,25 +1,463 @@
+import asyncio
+import io
 import os
-from pathlib import Path
-from pydub import AudioSegment
+import shutil
+import subprocess
+import sys
+from functools import lru_cache
+from math import gcd
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+import soundfile as sf
 import pydub.utils
+from scipy.signal import resample_poly
+
+from .config import settings
+from .metrics import registry
+
+audio_decodes = registry.counter(
+    "audio_decodes_total", "Uploads decoded, by decoder", ["decoder"]
+)
+
+
+# Where `winget install Gyan.FFmpeg` puts the binaries on Windows
+WINGET_FFMPEG_DIR = os.path.join(
+    os.environ.get('LOCALAPPDATA', ''),
+    'Microsoft',
+    'WinGet',
+    'Packages',
+    'Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe',
+    'ffmpeg-7.1.1-full_build',
+    'bin',
+)
+
+# ffprobe only reads headers; anything slower than this is not worth waiting for
+PROBE_TIMEOUT_SECONDS = 10
+
+
+class DecodeTimeoutError(RuntimeError):
+    """Raised when ffmpeg takes longer than its decode timeout"""
+
+
+@lru_cache(maxsize=None)
+def find_tool(name: str) -> str:
+    """
+    Locate the ffmpeg or ffprobe executable
+
+    Looks at FFMPEG_PATH (the ffmpeg binary or its directory; ffprobe is
+    expected beside it), then PATH, then the WinGet install location.
 
-def configure_ffmpeg():
-    """Configure ffmpeg path for audio processing"""
-    ffmpeg_path = os.path.join(
-        os.environ.get('LOCALAPPDATA', ''),
-        'Microsoft',
-        'WinGet',
-        'Packages',
-        'Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe',
-        'ffmpeg-7.1.1-full_build',
-        'bin',
-        'ffmpeg.exe'
+    Raises:
+        FileNotFoundError: If the tool is in none of those places
+    """
+    executable = f"{name}.exe" if sys.platform == "win32" else name
+    candidates = []
+    if settings.FFMPEG_PATH:
+        configured = settings.FFMPEG_PATH
+        if os.path.isdir(configured):
+            candidates.append(os.path.join(configured, executable))
+        else:
+            if name == "ffmpeg":
+                candidates.append(configured)
+            candidates.append(os.path.join(os.path.dirname(configured), executable))
+    candidates.append(shutil.which(name))
+    candidates.append(os.path.join(WINGET_FFMPEG_DIR, executable))
+
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    raise FileNotFoundError(
+        f"{name} not found on PATH or at FFMPEG_PATH; install it (e.g. apt install ffmpeg)"
     )
-    
-    if not Path(ffmpeg_path).exists():
-        raise RuntimeError(
-            f"FFmpeg not found at {ffmpeg_path}. Please ensure FFmpeg is installed via winget install Gyan.FFmpeg"
-        )
-    
+
+
+def configure_ffmpeg() -> str:
+    """
+    Find ffmpeg and point the libraries that call it by name at it
+
+    Whisper's loader and pydub run ``ffmpeg`` from PATH, so a binary found
+    through FFMPEG_PATH or WinGet has its directory added there.
+
+    Returns:
+        The ffmpeg path
+    """
+    ffmpeg_path = find_tool("ffmpeg")
+    ffmpeg_dir = os.path.dirname(ffmpeg_path)
+    if ffmpeg_dir not in os.environ.get('PATH', '').split(os.pathsep):
+        os.environ['PATH'] = ffmpeg_dir + os.pathsep + os.environ.get('PATH', '')
+
     pydub.AudioSegment.converter = ffmpeg_path
-    return ffmpeg_path 
\ No newline at end of file
+    pydub.AudioSegment.ffmpeg = ffmpeg_path
+    try:
+        pydub.AudioSegment.ffprobe = find_tool("ffprobe")
+    except FileNotFoundError:
+        pass  # Only duration probing needs it, and that degrades gracefully
+    return ffmpeg_path
+
+
+# Raw bytes, or a binary file such as a spooled upload
+AudioSource = Union[bytes, BinaryIO]
+
+
+def decode_audio(
+    content: AudioSource, sample_rate: Optional[int] = None, timeout: Optional[float] = None
+) -> np.ndarray:
+    """
+    Decode an encoded audio payload into a mono float32 waveform
+
+    The payload is handed to a single ffmpeg process which resamples it to
+    ``sample_rate`` and writes 16-bit PCM to stdout, mirroring
+    ``whisper.audio.load_audio`` without going through a file on disk.
+    Where the platform supports it the bytes are exposed through an
+    anonymous in-memory file so that containers which need seeking (m4a
+    with a trailing moov atom) still decode; otherwise they are piped.
+
+    A file is never read into Python: one already on disk (an upload
+    spooled past its memory threshold) is opened by ffmpeg directly, and
+    one still in memory is written out from its buffer without a copy.
+
+    WAV and FLAC skip ffmpeg altogether (see ``_decode_native``); only
+    compressed formats pay for a subprocess.
+
+    ffmpeg is found with ``find_tool`` and limited to DECODE_THREADS
+    threads; callers that want decodes bounded and kept off the inference
+    cores run this on ``decoding.decoder_pool``.
+
+    Args:
+        content: Raw audio bytes, or a binary file of them, in any format ffmpeg understands
+        sample_rate: Target sample rate (defaults to settings.SAMPLE_RATE)
+        timeout: Seconds before ffmpeg is killed (defaults to settings.DECODE_TIMEOUT_SECONDS)
+
+    Returns:
+        1-D float32 array in the range [-1.0, 1.0]
+
+    Raises:
+        DecodeTimeoutError: If ffmpeg ran past ``timeout``
+    """
+    sample_rate = sample_rate or settings.SAMPLE_RATE
+    timeout = timeout or settings.DECODE_TIMEOUT_SECONDS
+    if settings.NATIVE_DECODE_ENABLED:
+        audio = _decode_native(content, sample_rate)
+        if audio is not None:
+            audio_decodes.inc(decoder="native")
+            return audio
+
+    output_args = [
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+
+    try:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            proc = _run_ffmpeg_on_bytes(content, output_args, timeout=timeout)
+        elif (fd := _disk_fileno(content)) is not None:
+            proc = _run_ffmpeg_on_fd(fd, output_args, timeout=timeout)
+        else:
+            with _memory_view(content) as view:
+                proc = _run_ffmpeg_on_bytes(view, output_args, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise DecodeTimeoutError(f"Audio decode timed out after {timeout:.0f}s")
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {proc.stderr.decode(errors='ignore')}")
+
+    audio_decodes.inc(decoder="ffmpeg")
+    return pcm16_to_float32(proc.stdout)
+
+
+def _is_native(head: bytes) -> bool:
+    """Whether the first bytes start a container libsndfile decodes in-process"""
+    riff = head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE"
+    return riff or head[:4] == b"fLaC"
+
+
+def _native_source(content: AudioSource) -> Optional[BinaryIO]:
+    """The payload as a file rewound to its start, if it is WAV or FLAC"""
+    source = io.BytesIO(content) if isinstance(content, (bytes, bytearray, memoryview)) else content
+    source.seek(0)
+    head = source.read(12)
+    source.seek(0)
+    return source if _is_native(head) else None
+
+
+def _decode_native(content: AudioSource, sample_rate: int) -> Optional[np.ndarray]:
+    """
+    Decode WAV or FLAC in-process with libsndfile and NumPy
+
+    Saves the ffmpeg fork and exec and the PCM round trip through a pipe,
+    which dominate decode time for short uncompressed clips. Output matches
+    the ffmpeg path: channels averaged to mono, polyphase resampling to
+    ``sample_rate`` only when the rates differ, and 16-bit PCM scaled
+    exactly as ``pcm16_to_float32`` does.
+
+    Returns:
+        The waveform, or None if the payload should go to ffmpeg instead
+    """
+    source = _native_source(content)
+    if source is None:
+        return None
+
+    try:
+        with sf.SoundFile(source) as f:
+            pcm16 = f.subtype == "PCM_16"
+            data = f.read(dtype="int16" if pcm16 else "float32", always_2d=True)
+            rate = f.samplerate
+    except (sf.LibsndfileError, RuntimeError, TypeError):
+        return None  # Unusual codec inside the container; ffmpeg may still read it
+    finally:
+        source.seek(0)
+
+    # Channel by channel; a reduction along the interleaved axis is ~10x slower
+    audio = data[:, 0].astype(np.float32)
+    for channel in range(1, data.shape[1]):
+        audio += data[:, channel]
+    scale = data.shape[1] * (32768.0 if pcm16 else 1.0)
+    if scale != 1.0:
+        audio /= scale
+    if rate != sample_rate:
+        common = gcd(rate, sample_rate)
+        audio = resample_poly(audio, sample_rate // common, rate // common).astype(np.float32)
+    return np.clip(audio, -1.0, 1.0, out=audio)
+
+
+def probe_duration(content: AudioSource) -> Optional[float]:
+    """
+    Duration of an encoded payload in seconds, read from its container
+
+    WAV and FLAC headers are read in-process; other formats go to ffprobe,
+    which only parses headers (or estimates from the bitrate), so this
+    costs a few milliseconds even for hours of audio. Accepts the same
+    inputs as ``decode_audio``.
+
+    Returns:
+        The duration, or None if ffprobe cannot tell
+    """
+    if settings.NATIVE_DECODE_ENABLED:
+        duration = _probe_native(content)
+        if duration is not None:
+            return duration
+
+    output_args = ["-show_entries", "format=duration", "-of", "csv=p=0"]
+    options = {"tool": "ffprobe", "timeout": PROBE_TIMEOUT_SECONDS}
+    try:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            proc = _run_ffmpeg_on_bytes(content, output_args, **options)
+        elif (fd := _disk_fileno(content)) is not None:
+            proc = _run_ffmpeg_on_fd(fd, output_args, **options)
+        else:
+            with _memory_view(content) as view:
+                proc = _run_ffmpeg_on_bytes(view, output_args, **options)
+    except (OSError, subprocess.TimeoutExpired):
+        return None  # ffprobe not installed, or stuck on a damaged file
+
+    try:
+        duration = float(proc.stdout.decode().strip())
+    except ValueError:
+        return None  # "N/A", or nothing for an unreadable file
+    return duration if proc.returncode == 0 and duration >= 0 else None
+
+
+def _probe_native(content: AudioSource) -> Optional[float]:
+    """Duration of WAV or FLAC from its header, or None to ask ffprobe"""
+    source = _native_source(content)
+    if source is None:
+        return None
+    try:
+        info = sf.info(source)
+    except (sf.LibsndfileError, RuntimeError, TypeError):
+        return None
+    finally:
+        source.seek(0)
+    return info.frames / info.samplerate if info.samplerate else None
+
+
+def _command(tool: str, source: str, args: list, uses_stdin: bool) -> list:
+    if tool == "ffprobe":
+        return [find_tool("ffprobe"), "-v", "error", "-i", source] + args
+    prefix = [find_tool("ffmpeg")] if uses_stdin else [find_tool("ffmpeg"), "-nostdin"]
+    # Bounded so decodes cannot spread over the cores inference is using
+    return prefix + ["-threads", str(settings.DECODE_THREADS), "-i", source] + args
+
+
+def _run_ffmpeg_on_bytes(
+    content, output_args: list, tool: str = "ffmpeg", timeout: Optional[float] = None
+) -> subprocess.CompletedProcess:
+    memfd = _memfd_from_bytes(content)
+    try:
+        if memfd is not None:
+            cmd = _command(tool, f"/proc/self/fd/{memfd}", output_args, uses_stdin=False)
+            return subprocess.run(cmd, capture_output=True, pass_fds=(memfd,), timeout=timeout)
+        cmd = _command(tool, "pipe:0", output_args, uses_stdin=True)
+        return subprocess.run(cmd, input=bytes(content), capture_output=True, timeout=timeout)
+    finally:
+        if memfd is not None:
+            os.close(memfd)
+
+
+def _run_ffmpeg_on_fd(
+    fd: int, output_args: list, tool: str = "ffmpeg", timeout: Optional[float] = None
+) -> subprocess.CompletedProcess:
+    if sys.platform.startswith("linux"):
+        # Reopened through /proc, so ffmpeg can seek and starts at offset 0
+        cmd = _command(tool, f"/proc/self/fd/{fd}", output_args, uses_stdin=False)
+        return subprocess.run(cmd, capture_output=True, pass_fds=(fd,), timeout=timeout)
+    os.lseek(fd, 0, os.SEEK_SET)
+    cmd = _command(tool, "pipe:0", output_args, uses_stdin=True)
+    return subprocess.run(cmd, stdin=fd, capture_output=True, timeout=timeout)
+
+
+def _disk_fileno(source: BinaryIO) -> Optional[int]:
+    """File descriptor of a file that is on disk, without forcing a spooled file there"""
+    # SpooledTemporaryFile.fileno() would roll an in-memory file over to disk
+    inner = getattr(source, "_file", source)
+    if isinstance(inner, io.BytesIO):
+        return None
+    try:
+        return inner.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _memory_view(source: BinaryIO) -> memoryview:
+    """The contents of an in-memory file, shared rather than copied where possible"""
+    inner = getattr(source, "_file", source)
+    if isinstance(inner, io.BytesIO):
+        return inner.getbuffer()
+    source.seek(0)
+    return memoryview(source.read())
+
+
+def _memfd_from_bytes(content: bytes) -> Optional[int]:
+    """Copy bytes into an anonymous in-memory file, if the OS supports it"""
+    if not sys.platform.startswith("linux") or not hasattr(os, "memfd_create"):
+        return None
+
+    fd = os.memfd_create("transcription-audio")
+    view = memoryview(content)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+    return fd
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    """Convert little-endian 16-bit PCM bytes into a float32 waveform"""
+    return np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+
+def find_quiet_point(
+    audio: np.ndarray, start: int, end: int, frame_size: Optional[int] = None
+) -> int:
+    """
+    Find the lowest-energy position within ``audio[start:end]``
+
+    Used to cut audio between words rather than through them. Energy is
+    computed over non-overlapping frames (20 ms by default) and the centre
+    of the quietest frame is returned as an absolute sample index.
+    """
+    frame_size = frame_size or settings.SAMPLE_RATE // 50
+    start = max(0, start)
+    end = min(len(audio), end)
+    n_frames = (end - start) // frame_size
+    if n_frames < 1:
+        return end
+
+    frames = audio[start:start + n_frames * frame_size].reshape(n_frames, frame_size)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    return start + int(np.argmin(energy)) * frame_size + frame_size // 2
+
+
+class StreamingDecoder:
+    """
+    Incrementally decode a stream of audio chunks to 16 kHz mono float32
+
+    ``pcm`` input is treated as raw little-endian 16-bit mono samples at
+    settings.SAMPLE_RATE and converted in-process. Any other format (for
+    example the Ogg/Opus or WebM/Opus chunks produced by MediaRecorder) is
+    piped through one long-lived ffmpeg process with probing disabled, so
+    samples come out while the stream is still arriving.
+    """
+
+    def __init__(self, audio_format: str = "pcm"):
+        self.audio_format = audio_format.lower()
+        self._remainder = b""
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._decoded = bytearray()
+
+    async def start(self) -> None:
+        """Spawn ffmpeg for compressed formats"""
+        if self.audio_format == "pcm" or self._proc is not None:
+            return
+        self._proc = await asyncio.create_subprocess_exec(
+            find_tool("ffmpeg"), "-nostdin", "-loglevel", "error",
+            "-probesize", "32", "-analyzeduration", "0", "-fflags", "nobuffer",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+            "-ar", str(settings.SAMPLE_RATE), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read_output())
+
+    async def _read_output(self) -> None:
+        while True:
+            data = await self._proc.stdout.read(65536)
+            if not data:
+                return
+            self._decoded.extend(data)
+
+    async def feed(self, chunk: bytes) -> np.ndarray:
+        """Push one chunk and return whatever samples are decoded so far"""
+        if self.audio_format == "pcm":
+            return self._take_pcm(chunk)
+
+        await self.start()
+        try:
+            self._proc.stdin.write(chunk)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise RuntimeError("Failed to decode audio stream: decoder exited")
+        # Give the decoder a moment to emit output for this chunk
+        await asyncio.sleep(0)
+        return self._take_decoded()
+
+    async def finish(self) -> np.ndarray:
+        """Flush the decoder and return the remaining samples"""
+        if self.audio_format == "pcm":
+            return self._take_pcm(b"")
+        if self._proc is None:
+            return np.empty(0, dtype=np.float32)
+
+        if not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+        await self._reader
+        await self._proc.wait()
+        self._proc = None
+        return self._take_decoded()
+
+    async def close(self) -> None:
+        """Terminate the decoder without waiting for pending output"""
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+        if self._reader is not None:
+            self._reader.cancel()
+        self._proc = None
+
+    def _take_pcm(self, chunk: bytes) -> np.ndarray:
+        data = self._remainder + chunk
+        usable = len(data) - len(data) % 2
+        self._remainder = data[usable:]
+        return pcm16_to_float32(data[:usable])
+
+    def _take_decoded(self) -> np.ndarray:
+        usable = len(self._decoded) - len(self._decoded) % 2
+        samples = pcm16_to_float32(bytes(self._decoded[:usable]))
+        del self._decoded[:usable]
+        return samples
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+from .config import settings
+from .logger import log
+
+
+# Files are hashed in pieces of this size rather than read whole
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_key(content: Union[bytes, BinaryIO], **params: Any) -> str:
+    """
+    Build a cache key from raw content and the parameters that shape the result
+
+    The content is hashed rather than stored, so identical uploads map to the
+    same key regardless of filename. A file gives the same key as its bytes
+    and is left rewound. Parameters are serialised with sorted keys so
+    argument order does not matter.
+    """
+    digest = hashlib.sha256()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        digest.update(content)
+    else:
+        content.seek(0)
+        for chunk in iter(lambda: content.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        content.seek(0)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier cache for JSON-serialisable results
+
+    Lookups check an in-process LRU first, bounded by the encoded size of its
+    values, then a SQLite table that survives restarts and is shared by every
+    worker process pointing at the same file. Disk hits are promoted back
+    into memory. Either tier is disabled by giving it a budget of 0. With a
+    ``ttl`` (seconds) entries expire in both tiers and count as misses.
+
+    The disk tier's total size lives in a one-row side table that triggers
+    keep current on every insert and delete, from any process, so a write
+    checks the budget without summing the whole table.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_memory_bytes: Optional[int] = None,
+        db_path: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.name = name
+        self.ttl = ttl or None
+        self.max_memory_bytes = (
+            settings.CACHE_MEMORY_MB * 1024 * 1024 if max_memory_bytes is None else max_memory_bytes
+        )
+        self.max_disk_bytes = (
+            settings.CACHE_DISK_MB * 1024 * 1024 if max_disk_bytes is None else max_disk_bytes
+        )
+        self.db_path = db_path or settings.CACHE_DB_PATH
+        # key -> (encoded value, expiry timestamp or None)
+        self._memory: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # One SQLite connection per thread
+        self._table_ready = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and memory tier usage"""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "expirations": self.expirations,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None"""
+        with self._lock:
+            data, expired = self._memory_get(key)
+        if data is not None:
+            return json.loads(data)
+        return self._get_from_disk(key, expired)
+
+    def _get_from_disk(self, key: str, expired: bool = False) -> Optional[Any]:
+        """Finish a lookup that missed memory; ``expired`` if memory held it expired"""
+        row, disk_expired = self._disk_get(key)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                if expired or disk_expired:
+                    self.expirations += 1  # Once per lookup, whichever tiers held it
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, *row)
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value in both tiers"""
+        data = json.dumps(value).encode()
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._memory_put(key, data, expires_at)
+        self._disk_put(key, data, expires_at)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Async get; only the disk tier is consulted off the event loop"""
+        with self._lock:
+            data, expired = self._memory_get(key)
+        if data is not None:
+            return json.loads(data)
+        return await asyncio.to_thread(self._get_from_disk, key, expired)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Async set; the disk write runs on a worker thread"""
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.max_disk_bytes > 0:
+            with self._connection() as conn:
+                conn.execute(f'DELETE FROM "{self.name}"')
+
+    def _memory_get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """
+        Look up the LRU tier; caller holds the lock
+
+        Returns the value, or None, and whether an expired entry was dropped.
+        """
+        entry = self._memory.get(key)
+        if entry is None:
+            return None, False
+        data, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._memory[key]
+            self._memory_bytes -= len(data)
+            return None, True
+        self._memory.move_to_end(key)
+        self.memory_hits += 1
+        return data, False
+
+    def _memory_put(self, key: str, data: bytes, expires_at: Optional[float] = None) -> None:
+        """Insert into the LRU tier and evict down to budget; caller holds the lock"""
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous[0])
+        self._memory[key] = (data, expires_at)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # WAL lets readers in other workers proceed while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # INSERT OR REPLACE then fires the delete trigger for the old row
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+        if not self._table_ready:
+            with conn:
+                # Other workers may set up the same file; serialise with them
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{self.name}" ('
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                    "size INTEGER NOT NULL, accessed_at REAL NOT NULL, expires_at REAL)"
+                )
+                columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{self.name}")')]
+                if "expires_at" not in columns:
+                    # Tables created before TTL support; NULL means never expires
+                    conn.execute(f'ALTER TABLE "{self.name}" ADD COLUMN expires_at REAL')
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{self.name}_accessed" '
+                    f'ON "{self.name}" (accessed_at)'
+                )
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{self.name}_size" ('
+                    "id INTEGER PRIMARY KEY CHECK (id = 1), total INTEGER NOT NULL)"
+                )
+                for event, change in (("insert", "+ NEW.size"), ("delete", "- OLD.size")):
+                    conn.execute(
+                        f'CREATE TRIGGER IF NOT EXISTS "{self.name}_size_{event}" '
+                        f'AFTER {event.upper()} ON "{self.name}" BEGIN '
+                        f'UPDATE "{self.name}_size" SET total = total {change}; END'
+                    )
+                # Counted once, for files from before the total was kept
+                conn.execute(
+                    f'INSERT OR IGNORE INTO "{self.name}_size" (id, total) '
+                    f'SELECT 1, COALESCE(SUM(size), 0) FROM "{self.name}"'
+                )
+            self._table_ready = True
+        return conn
+
+    def _disk_get(self, key: str) -> Tuple[Optional[Tuple[bytes, Optional[float]]], bool]:
+        """Look up the SQLite tier; returns the row, or None, and whether it had expired"""
+        if self.max_disk_bytes <= 0:
+            return None, False
+        try:
+            now = time.time()
+            expired = False
+            with self._connection() as conn:
+                row = conn.execute(
+                    f'SELECT value, expires_at FROM "{self.name}" WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and row[1] is not None and row[1] <= now:
+                    conn.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+                    row, expired = None, True
+                elif row is not None:
+                    conn.execute(
+                        f'UPDATE "{self.name}" SET accessed_at = ? WHERE key = ?', (now, key)
+                    )
+            return ((row[0], row[1]) if row is not None else None), expired
+        except sqlite3.Error as e:
+            log.warning(f"Cache '{self.name}' disk read failed: {str(e)}")
+            return None, False
+
+    def _disk_put(self, key: str, data: bytes, expires_at: Optional[float] = None) -> None:
+        if self.max_disk_bytes <= 0 or len(data) > self.max_disk_bytes:
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO "{self.name}" '
+                    "(key, value, size, accessed_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), time.time(), expires_at),
+                )
+                total = self._disk_bytes(conn)
+                evicted = 0
+                if total > self.max_disk_bytes and self.ttl:
+                    # Expired rows go before anything still live
+                    conn.execute(
+                        f'DELETE FROM "{self.name}" WHERE expires_at <= ?', (time.time(),)
+                    )
+                    total = self._disk_bytes(conn)
+                if total > self.max_disk_bytes:
+                    # Drop least recently used rows until back under budget
+                    victims = []
+                    for old_key, size in conn.execute(
+                        f'SELECT key, size FROM "{self.name}" ORDER BY accessed_at'
+                    ):
+                        if total <= self.max_disk_bytes:
+                            break
+                        victims.append((old_key,))
+                        total -= size
+                    conn.executemany(f'DELETE FROM "{self.name}" WHERE key = ?', victims)
+                    evicted = len(victims)
+            if evicted:
+                with self._lock:
+                    self.disk_evictions += evicted
+        except sqlite3.Error as e:
+            log.warning(f"Cache '{self.name}' disk write failed: {str(e)}")
+
+    def _disk_bytes(self, conn: sqlite3.Connection) -> int:
+        """Total size of the disk tier, kept by triggers"""
+        return conn.execute(f'SELECT total FROM "{self.name}_size"').fetchone()[0]
+
+
+# Shared caches for this process
+transcription_cache = TieredCache("transcriptions")
+llm_cache = TieredCache(
+    "llm_responses",
+    max_disk_bytes=None if settings.LLM_CACHE_DISK else 0,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+)
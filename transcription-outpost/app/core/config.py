@@ -16,11 +16,99 @@ class Settings(BaseSettings):
     
     # Audio Config
     MAX_AUDIO_SIZE_MB: int = 25
-    SUPPORTED_AUDIO_FORMATS: list[str] = ["wav", "mp3", "m4a", "ogg"]
+    UPLOAD_SPOOL_MB: int = 1  # Upload bytes kept in memory before spilling to a temporary file
+    SUPPORTED_AUDIO_FORMATS: list[str] = ["wav", "flac", "mp3", "m4a", "ogg"]
     SAMPLE_RATE: int = 16000
+    NATIVE_DECODE_ENABLED: bool = True  # Decode WAV/FLAC in-process instead of spawning ffmpeg
     
+    # Decode Config
+    FFMPEG_PATH: Optional[str] = None  # ffmpeg binary or its directory; PATH is searched if unset
+    DECODE_WORKERS: int = 2  # Concurrent decodes per process
+    DECODE_THREADS: int = 1  # Threads each ffmpeg may use
+    DECODE_CPUS: Optional[str] = None  # CPUs decode workers are pinned to, e.g. "0-1"; unpinned if unset
+    DECODE_TIMEOUT_SECONDS: int = 120  # ffmpeg is killed after this long
+    
+    # Model Registry Config
+    WHISPER_DEFAULT_MODEL: str = "base"
+    WHISPER_MODELS: list[str] = ["tiny", "base", "small", "medium", "large"]  # Sizes callers may request
+    WHISPER_PRECISION: str = "fp32"  # fp16 only pays off on CUDA
+    MODEL_MEMORY_BUDGET_MB: int = 4096  # Resident model weights before LRU eviction
+    
+    # Inference Config
+    INFERENCE_WORKERS: int = 1  # Concurrent Whisper inferences per process
+    INFERENCE_QUEUE_SIZE: int = 8  # Requests allowed to wait for a free worker
+    INFERENCE_RETRY_AFTER: int = 5  # seconds, sent with 503 when the queue is full
+    INFERENCE_REMOTE: bool = False  # Forward inference to the shared inference server instead of loading models
+    INFERENCE_SERVER_SOCKET: str = "/tmp/transcription-outpost/inference.sock"  # Where that server listens
+    INFERENCE_SERVER_CONNECT_TIMEOUT: int = 120  # seconds to wait for the server at startup
+    WEB_CONCURRENCY: int = 1  # HTTP worker processes; uvicorn reads the same variable for --workers
+    
+    # Admission Config
+    ADMISSION_ENABLED: bool = True  # Admit requests by estimated compute instead of only file size
+    ADMISSION_BUDGET_SECONDS: float = 600.0  # Estimated inference seconds admitted at once; also the cap per request
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0  # Requests expected to wait longer are rejected with Retry-After
+    ADMISSION_DEFAULT_RTF: float = 0.25  # Inference seconds per audio second until measured
+    
+    # Batching Config
+    BATCH_WINDOW_MS: int = 20  # How long a batch waits for more short clips
+    BATCH_MAX_SIZE: int = 8  # Clips per batched forward pass; 1 disables batching
+    
+    # Long-form Config
+    LONGFORM_THRESHOLD_SECONDS: int = 300  # Longer audio is split and run in parallel; 0 disables
+    LONGFORM_CHUNK_SECONDS: int = 60  # Maximum chunk length
+    LONGFORM_SEARCH_SECONDS: int = 5  # Window before each cut searched for silence
+    LONGFORM_WORKERS: int = 2  # Worker processes, each with its own model copy counted in MODEL_MEMORY_BUDGET_MB
+    
+    # VAD Config
+    VAD_ENABLED: bool = False  # Default when a request does not choose; opt in with vad=true
+    VAD_THRESHOLD_DB: float = 12.0  # Speech must exceed the noise floor by this much
+    VAD_MIN_SPEECH_MS: int = 250  # Shorter bursts are treated as noise
+    VAD_MIN_SILENCE_MS: int = 500  # Shorter pauses stay inside a speech region
+    VAD_PADDING_MS: int = 200  # Kept around each region so word edges survive
+    
+    # Cache Config
+    CACHE_ENABLED: bool = True
+    CACHE_MEMORY_MB: int = 64  # In-process LRU budget per cache
+    CACHE_DISK_MB: int = 1024  # SQLite budget per cache; 0 disables the disk tier
+    CACHE_DB_PATH: str = "cache/transcription-outpost.db"  # Shared by all workers
+    LLM_CACHE_ENABLED: bool = True  # Reuse responses to identical prompts at temperature 0
+    LLM_CACHE_DISK: bool = True  # Also keep LLM responses in the SQLite tier
+    LLM_CACHE_TTL_SECONDS: int = 86400  # 0 keeps responses until evicted
+    SINGLEFLIGHT_ENABLED: bool = True  # Identical concurrent requests share one computation
+    
+    # LLM Config
+    OLLAMA_BASE_URL: str = "http://localhost:11434/api"
+    OLLAMA_MODEL: str = "llama2:13b-chat"
+    OLLAMA_KEEP_ALIVE: str = "30m"  # Idle time before Ollama unloads the model; "-1m" never
+    LLM_ENHANCE_TEMPERATURE: float = 0.0  # Correction and summaries; only 0 is deterministic and cached
+    LLM_SHARED_CONTEXT: bool = True  # Evaluate a transcript once and branch each instruction off it
+    LLM_MAX_CONNECTIONS: int = 10  # Open connections to Ollama, busy or idle
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 5  # Idle connections kept for reuse
+    LLM_KEEPALIVE_EXPIRY: float = 60.0  # seconds an idle connection is kept
+    LLM_CONNECT_TIMEOUT: float = 5.0  # seconds
+    LLM_TIMEOUT: float = 30.0  # seconds for a response, or to get a pooled connection
+    LLM_CHAIN_CONCURRENCY: int = 4  # Chain steps sent to the LLM at once
+    LLM_STEP_TIMEOUT: float = 60.0  # seconds per chain step; 0 disables
+    LLM_CHUNK_TOKENS: int = 1500  # Longer transcripts are summarised map-reduce style
+    LLM_PIPELINE_BATCH_TOKENS: int = 400  # Finished speech sent for correction while Whisper runs
+    
+    # Jobs Config
+    JOBS_DIR: str = "jobs"  # Queue database and uploaded audio; shared by all workers
+    JOBS_WORKERS: int = 1  # Background jobs run at once per process
+    JOBS_MAX_AUDIO_MB: int = 500  # Uploads allowed to the jobs API
+    JOBS_LEASE_SECONDS: int = 60  # A job whose worker stops renewing this long is retried
+    JOBS_MAX_ATTEMPTS: int = 3  # Claims before a job that keeps dying is failed
+    
+    # Batch Endpoint Config
+    BATCH_CONCURRENCY: int = 16  # Clips of one batch request in flight at once
+    BATCH_RETRY_SECONDS: int = 120  # How long a clip is retried against a saturated server before it fails
+    BATCH_MAX_UPLOAD_MB: int = 1024  # Request body allowed for file lists and archives
+    BATCH_LOCAL_ROOT: Optional[str] = None  # Directory manifests may read from; unset disables them
+
     # WebSocket Config
     WS_PING_INTERVAL: int = 30  # seconds
+    STREAM_STEP_MS: int = 500  # New audio between partial results
+    STREAM_WINDOW_SECONDS: int = 15  # Buffer length at which a final result is committed
     
     # CORS Configuration
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:80"]
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from .audio import DecodeTimeoutError
+from .config import settings
+from .logger import log
+from .metrics import registry
+
+
+def parse_cpus(spec: Optional[str]) -> Optional[Set[int]]:
+    """
+    Parse a CPU list such as ``"0-3,6"``
+
+    Raises:
+        ValueError: If the list is malformed
+    """
+    if not spec:
+        return None
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    if not cpus:
+        raise ValueError(f"Empty CPU list: {spec!r}")
+    return cpus
+
+
+class DecoderPool:
+    """
+    Dedicated threads for turning uploads into waveforms
+
+    Decodes run on their own small pool instead of the default executor,
+    so a burst of uploads queues here rather than crowding out VAD, cache
+    hashing and everything else that uses ``asyncio.to_thread``. At most
+    ``max_workers`` decodes run at once; the rest wait their turn. With
+    DECODE_CPUS set, the worker threads, and the ffmpeg processes they
+    start, which inherit the affinity, stay off the cores inference uses.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, cpus: Optional[str] = None):
+        self.max_workers = max_workers or settings.DECODE_WORKERS
+        self.cpus = parse_cpus(cpus if cpus is not None else settings.DECODE_CPUS)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # Submitted and not yet finished (queued + running)
+        self._busy = 0  # Currently decoding on a worker thread
+        self.timed_out = 0
+
+    @property
+    def busy_workers(self) -> int:
+        """Number of workers currently decoding"""
+        return self._busy
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of decodes waiting for a free worker"""
+        return self._pending - self._busy
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of decoder utilisation"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "busy_workers": self._busy,
+                "queue_depth": self._pending - self._busy,
+                "cpus": sorted(self.cpus) if self.cpus else None,
+                "timed_out": self.timed_out,
+            }
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking decode on the pool, waiting for a free worker if all are busy"""
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._get_pool().submit(self._call, func, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._busy += 1
+        try:
+            return func(*args, **kwargs)
+        except DecodeTimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    def _release(self, _: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _pin(self) -> None:
+        """Restrict the calling worker thread, and ffmpeg started from it, to DECODE_CPUS"""
+        try:
+            os.sched_setaffinity(0, self.cpus)
+        except (AttributeError, OSError) as e:
+            log.warning(f"Could not pin decode worker to CPUs {sorted(self.cpus)}: {str(e)}")
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            log.info(
+                f"Starting decoder pool with {self.max_workers} worker(s)"
+                + (f" on CPUs {sorted(self.cpus)}" if self.cpus else "")
+            )
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="decode",
+                initializer=self._pin if self.cpus else None,
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once running decodes complete"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+# Shared decoder pool for all speech services in this process
+decoder_pool = DecoderPool()
+
+registry.gauge(
+    "decode_busy_workers", "Decode workers currently decoding"
+).set_function(lambda: decoder_pool.busy_workers)
+registry.gauge(
+    "decode_queue_depth", "Decodes waiting for a free worker"
+).set_function(lambda: decoder_pool.queue_depth)
@@ -0,0 +1,331 @@
+import bisect
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans a cached lookup up to a long-form transcription
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+LabelKey = Tuple[str, ...]
+
+
+class _Metric:
+    """Shared label handling; one lock per metric keeps hot-path contention low"""
+
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: LabelKey, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def values(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{self._format_labels(key)} {_number(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value on every read instead of storing it"""
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Count the wrapped block as in flight"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        if self._function is not None:
+            lines.append(f"{self.name} {_number(self.value())}")
+            return lines
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{self._format_labels(key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket latency histogram
+
+    ``observe`` is a bisect plus a few additions under a lock, cheap enough
+    to call on every request and every pipeline stage.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum, count]
+        self._series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the wrapped block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self) -> Dict[LabelKey, Dict[str, float]]:
+        """Count, mean and bucket-estimated p50/p95 (ms) per label set"""
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        result = {}
+        for key, (counts, total, count) in series.items():
+            result[key] = {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+                "p50_ms": self._quantile(counts, count, 0.5),
+                "p95_ms": self._quantile(counts, count, 0.95),
+            }
+        return result
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, in ms"""
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                bound = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return bound * 1000
+        return self.buckets[-1] * 1000
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing  # Re-imports and reloads get the same series
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Per-thread accumulator for stages that run as many small calls
+
+    Whisper runs its decoder once per token, so timing each call into the
+    histogram would record hundreds of tiny samples per request. Instead the
+    calls add to a thread-local total that ``flush`` records once per
+    inference.
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self._local = threading.local()
+
+    def _totals(self) -> Dict[str, float]:
+        totals = getattr(self._local, "totals", None)
+        if totals is None:
+            totals = self._local.totals = {}
+        return totals
+
+    def _starts(self) -> Dict[str, float]:
+        starts = getattr(self._local, "starts", None)
+        if starts is None:
+            starts = self._local.starts = {}
+        return starts
+
+    def add(self, stage: str, seconds: float) -> None:
+        totals = self._totals()
+        totals[stage] = totals.get(stage, 0.0) + seconds
+
+    def flush(self) -> None:
+        """Record and reset this thread's accumulated stage totals"""
+        totals = self._totals()
+        for stage, seconds in totals.items():
+            self.histogram.observe(seconds, stage=stage)
+        totals.clear()
+
+    def instrument(self, module, stage: str) -> None:
+        """Accumulate the forward time of a torch module under ``stage``"""
+        def before(*_):
+            self._starts()[stage] = time.perf_counter()
+
+        def after(*_):
+            started = self._starts().pop(stage, None)
+            if started is not None:
+                self.add(stage, time.perf_counter() - started)
+
+        module.register_forward_pre_hook(before)
+        module.register_forward_hook(after)
+
+
+def process_memory_mb() -> float:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        # Peak rather than current RSS where /proc is unavailable
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def format_uptime(seconds: float) -> str:
+    """Render seconds as 'Xd Yh Zm'"""
+    minutes = int(seconds // 60)
+    return f"{minutes // 1440}d {minutes // 60 % 24}h {minutes % 60}m"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide registry and the metrics shared across modules
+registry = MetricsRegistry()
+started_at = time.time()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled", ["method", "path", "status"]
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "path"]
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+websockets_open = registry.gauge("websocket_connections", "Open streaming WebSocket connections")
+transcriptions_in_flight = registry.gauge(
+    "transcriptions_in_flight", "Transcriptions currently being processed"
+)
+stage_latency = registry.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each pipeline stage", ["stage"]
+)
+stage_timer = StageTimer(stage_latency)
+uptime = registry.gauge("process_uptime_seconds", "Seconds since the process started")
+uptime.set_function(lambda: time.time() - started_at)
+memory = registry.gauge("process_resident_memory_megabytes", "Resident memory of this process")
+memory.set_function(process_memory_mb)
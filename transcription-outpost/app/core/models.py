@@ -33,4 +33,24 @@ class TranscriptionResponse(BaseModel):
     text: str = Field(..., description="Transcribed text")
     confidence: float = Field(..., description="Confidence score of the transcription")
     segments: Optional[List[dict]] = Field(default=None, description="Time-aligned segments")
-    metadata: Optional[dict] = Field(default=None, description="Additional metadata") 
\ No newline at end of file
+    metadata: Optional[dict] = Field(default=None, description="Additional metadata") 
+
+
+class EnhancementRequest(BaseModel):
+    """Model for LLM enhancement requests"""
+    transcription: str = Field(..., min_length=1, description="Raw transcription text to enhance")
+
+
+class JobStatus(BaseModel):
+    """Model for background job status"""
+    id: str = Field(..., description="Job id")
+    status: str = Field(..., description="queued, running, completed or failed")
+    progress_seconds: float = Field(default=0.0, description="Seconds of audio transcribed so far")
+    duration: Optional[float] = Field(default=None, description="Audio length in seconds, once decoded")
+    progress: Optional[float] = Field(default=None, description="Fraction of the audio transcribed")
+    attempts: int = Field(default=0, description="Times a worker has started the job")
+    result: Optional[dict] = Field(default=None, description="Transcription result, once completed")
+    error: Optional[str] = Field(default=None, description="Failure reason, if failed")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
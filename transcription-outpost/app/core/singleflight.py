@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from .metrics import registry
+
+T = TypeVar("T")
+
+coalesced_requests = registry.counter(
+    "singleflight_coalesced_total", "Requests served by an identical in-flight computation", ["name"]
+)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work into one computation
+
+    The first caller for a key starts the work; callers that arrive with
+    the same key while it is running wait for that same result or error
+    instead of repeating it. The work runs as its own task, so a caller
+    that gives up (client disconnect) does not cancel it for the others.
+    Nothing is remembered once the work finishes; that is the caches' job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Computations started, callers that joined one, and those running now"""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        """Run work for key, or wait for the identical run already in flight"""
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(work())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            coalesced_requests.inc(name=self.name)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller gave up
+
+
+# Shared coalescing layers for this process
+transcription_flights = SingleFlight("transcriptions")
+llm_flights = SingleFlight("llm")
@@ -0,0 +1,103 @@
+import io
+import os
+import time
+from typing import BinaryIO, Dict, Optional
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartParser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .metrics import registry, stage_latency
+
+# Multipart boundaries and the non-file form fields on top of the audio itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+SIZE_BUCKETS = tuple(2 ** n for n in range(10, 31, 2))  # 1 KB .. 1 GB
+
+upload_sizes = registry.histogram(
+    "upload_size_bytes", "Request body size of uploads", buckets=SIZE_BUCKETS
+)
+upload_memory = registry.histogram(
+    "upload_memory_bytes",
+    "Bytes of each upload held in memory; the rest was spooled to disk",
+    buckets=SIZE_BUCKETS,
+)
+
+# Uploaded files stay in memory up to this size, then move to a temporary file
+MultiPartParser.spool_max_size = settings.UPLOAD_SPOOL_MB * 1024 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies over the upload limit while they are arriving
+
+    A Content-Length over the limit is refused before any of the body is
+    read. Chunked uploads, which have no Content-Length, are counted as
+    they arrive and cut off with a 413 once they pass the limit, instead of
+    being spooled in full before the size check.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, overrides: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        # Path prefix -> limit, e.g. a larger one for the jobs API
+        self.overrides = overrides or {}
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.overrides.items():
+            if path.startswith(prefix):
+                return limit + FORM_OVERHEAD_BYTES
+        return self.max_bytes + FORM_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        detail = f"Request body exceeds maximum of {limit // (1024 * 1024)}MB"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+        started: Optional[float] = None
+
+        async def limited_receive() -> Message:
+            nonlocal received, started
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            if started is None:
+                started = time.perf_counter()
+            received += len(message.get("body", b""))
+            if received > limit:
+                # Raised inside the route, so the app's handlers answer with a 413
+                raise HTTPException(status_code=413, detail=detail)
+            if not message.get("more_body", False) and received:
+                upload_sizes.observe(received)
+                stage_latency.observe(time.perf_counter() - started, stage="upload_receive")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def spooled_upload(file: UploadFile) -> BinaryIO:
+    """
+    The spooled file behind an upload, rewound and ready to decode
+
+    Records how much of it is held in memory; at most UPLOAD_SPOOL_MB per
+    upload, since anything larger was written to a temporary file while
+    it arrived.
+    """
+    source = file.file
+    size = source.seek(0, os.SEEK_END)
+    # A SpooledTemporaryFile wraps a BytesIO until it rolls over to disk
+    in_memory = isinstance(getattr(source, "_file", source), io.BytesIO)
+    upload_memory.observe(size if in_memory else 0)
+    source.seek(0)
+    return source
@@ -1,10 +1,42 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Form
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import FastAPI, UploadFile, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .core.config import settings
 from .core.logger import log
 from .core.audio import configure_ffmpeg
+from .core.decoding import decoder_pool
+from .core.cache import llm_cache, transcription_cache
+from .core.metrics import (
+    format_uptime,
+    http_in_flight,
+    http_latency,
+    http_requests,
+    process_memory_mb,
+    registry,
+    stage_latency,
+    transcriptions_in_flight,
+    uptime,
+    websockets_open,
+)
+from .core.models import TranscriptionRequest
+from .core.singleflight import llm_flights, transcription_flights
+from .core.uploads import BodySizeLimitMiddleware, spooled_upload
+from .services.jobs.router import router as jobs_router
+from .services.jobs.runner import job_runner
+from .services.llm.chains import transcription_chain
+from .services.llm.factory import LLMServiceFactory
+from .services.llm.router import router as enhancement_router
+from .services.llm.providers.llama import llama_service
 from .services.speech.router import router as transcription_router
-from .services.speech.factory import get_transcription_service, SpeechServiceType
+from .services.speech.factory import get_transcription_service, SpeechServiceFactory, SpeechServiceType
+from .services.speech.admission import admission_controller, AudioTooLongError, transcribe_admitted
+from .services.speech.executor import inference_executor, InferenceQueueFullError
+from .services.speech.vad import voice_activity_detector
+from .services.speech.warmup import model_warmup
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -23,8 +55,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cut off uploads over the size limit while they arrive, not once spooled
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.MAX_AUDIO_SIZE_MB * 1024 * 1024,
+    overrides={
+        f"{settings.API_V1_STR}/jobs": settings.JOBS_MAX_AUDIO_MB * 1024 * 1024,
+        f"{settings.API_V1_STR}/transcription/batch": settings.BATCH_MAX_UPLOAD_MB * 1024 * 1024,
+    },
+)
+
 # Include routers
 app.include_router(transcription_router, prefix=settings.API_V1_STR)
+app.include_router(enhancement_router, prefix=settings.API_V1_STR)
+app.include_router(jobs_router, prefix=settings.API_V1_STR)
 
 # Health check endpoint
 @app.get("/health")
@@ -32,6 +76,18 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": settings.APP_NAME}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once the default model is loaded and warmed up, 503 until then"""
+    status = model_warmup.stats()
+    if not model_warmup.ready:
+        return JSONResponse(
+            status_code=503,
+            content=status,
+            headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)}
+        )
+    return status
+
 # API Info endpoints
 @app.get("/languages")
 async def get_supported_languages():
@@ -66,16 +122,65 @@ async def get_service_info():
         "api_version": "v1",
     }
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template"""
+    started = time.perf_counter()
+    status = 500
+    http_in_flight.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_in_flight.dec()
+        # Route templates keep label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        http_requests.inc(method=request.method, path=path, status=str(status))
+        http_latency.observe(time.perf_counter() - started, method=request.method, path=path)
+
 @app.get("/metrics")
-async def get_service_metrics():
-    """Get service metrics and statistics"""
+async def get_service_metrics(request: Request, format: Optional[str] = None):
+    """
+    Get service metrics and statistics
+    
+    Returns JSON by default and Prometheus text exposition when called with
+    ?format=prometheus or by a scraper that accepts text/plain.
+    """
+    accept = request.headers.get("accept", "")
+    if format == "prometheus" or (
+        format is None and ("text/plain" in accept or "openmetrics" in accept)
+    ):
+        return PlainTextResponse(
+            registry.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
+    transcription_stage = stage_latency.summary().get(("transcribe",), {})
     return {
-        "requests_total": 0,
-        "processing_time_avg": 0.0,
-        "active_connections": 0,
-        "service_uptime": "0d 0h 0m",
-        "memory_usage_mb": 0,
+        "requests_total": int(http_requests.total()),
+        "processing_time_avg": transcription_stage.get("avg_ms", 0.0) / 1000,
+        "active_connections": int(http_in_flight.value() + websockets_open.value()),
+        "service_uptime": format_uptime(uptime.value()),
+        "memory_usage_mb": round(process_memory_mb(), 1),
         "available_models": ["whisper"],
+        "in_flight": {
+            "http": int(http_in_flight.value()),
+            "websockets": int(websockets_open.value()),
+            "transcriptions": int(transcriptions_in_flight.value()),
+        },
+        "stages": {key[0]: value for key, value in sorted(stage_latency.summary().items())},
+        "inference": inference_executor.stats(),
+        "decode": decoder_pool.stats(),
+        "admission": admission_controller.stats(),
+        "cache": {"transcriptions": transcription_cache.stats(), "llm": llm_cache.stats()},
+        "coalescing": {"transcriptions": transcription_flights.stats(), "llm": llm_flights.stats()},
+        "vad": voice_activity_detector.stats(),
+        "models": SpeechServiceFactory.stats(),
+        "warmup": model_warmup.stats(),
+        "llm": llama_service.stats(),
+        "jobs": await job_runner.stats(),
     }
 
 # Additional endpoints expected by tests
@@ -84,11 +189,10 @@ async def transcribe_basic(
     file: UploadFile,
     language: str = Form("auto"),
     format: str = Form("wav"),
-    enhance: str = Form("false")
+    enhance: str = Form("false"),
+    vad: Optional[bool] = Form(None)
 ):
     """Basic transcription endpoint (alias for main endpoint)"""
-    from .services.speech.factory import get_transcription_service, SpeechServiceType
-    from .core.config import settings
     
     # Validate file size
     if file.size and file.size > settings.MAX_AUDIO_SIZE_MB * 1024 * 1024:
@@ -105,30 +209,62 @@ async def transcribe_basic(
             detail=f"Unsupported audio format. Supported formats: {settings.SUPPORTED_AUDIO_FORMATS}"
         )
     
+    pipeline = None
     try:
         # Get transcription service
         transcription_service = await get_transcription_service(SpeechServiceType.WHISPER)
         
-        # Read file content
-        content = await file.read()
+        # Enhancement starts on finished segments while Whisper is still
+        # working, so the LLM's latency overlaps the transcription's
+        if enhance.lower() == "true":
+            pipeline = transcription_chain.pipeline()
         
         # Perform transcription
-        result = await transcription_service.transcribe(content, file_ext)
+        result = await transcribe_admitted(
+            transcription_service,
+            spooled_upload(file),
+            file_ext,
+            vad=vad,
+            on_segments=pipeline.feed if pipeline else None,
+        )
         
         response_data = {
             "text": result.text,
             "confidence": result.confidence,
             "language": result.language,
-            "duration": result.duration
+            "duration": result.duration,
+            "silence_removed": result.silence_removed
         }
         
-        # If enhancement is requested, add enhanced text
-        if enhance.lower() == "true":
-            response_data["enhanced_text"] = result.text  # For now, same as original
+        if pipeline is not None:
+            try:
+                enhancement = await pipeline.finish(result.segments, result.text)
+                response_data["enhanced_text"] = enhancement["processed_text"]
+                response_data["summary"] = enhancement["summary"]
+            except Exception as e:
+                # The transcript is still worth returning without the LLM
+                log.error(f"Enhancement failed: {str(e)}")
+                response_data["enhanced_text"] = None
+                response_data["enhancement_error"] = "Enhancement failed"
+            response_data["timings"] = pipeline.timings()
             
         return response_data
         
+    except AudioTooLongError as e:
+        if pipeline is not None:
+            pipeline.cancel()
+        raise HTTPException(status_code=413, detail={"error": str(e)})
+    except InferenceQueueFullError as e:
+        if pipeline is not None:
+            pipeline.cancel()
+        raise HTTPException(
+            status_code=503,
+            detail={"error": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
+        if pipeline is not None:
+            pipeline.cancel()
         raise HTTPException(
             status_code=500,
             detail={"error": str(e)}
@@ -141,10 +277,72 @@ async def transcribe_stream(
     format: str = "wav",
     stream: str = "true"
 ):
-    """Streaming transcription endpoint (placeholder)"""
-    # For now, return the same as basic transcription
-    # In a real implementation, this would use Server-Sent Events or WebSockets
-    return {"message": "Streaming transcription not yet implemented", "status": "placeholder"}
+    """Streaming transcription over HTTP is not supported; point clients at the WebSocket"""
+    return {
+        "message": "Open a WebSocket to /transcribe/stream to stream audio",
+        "status": "websocket",
+    }
+
+@app.websocket("/transcribe/stream")
+async def transcribe_stream_ws(
+    websocket: WebSocket,
+    language: str = "auto",
+    format: str = "pcm"
+):
+    """
+    Streaming transcription over WebSocket
+    
+    Clients send binary frames of audio (raw 16-bit mono PCM at the service
+    sample rate when format=pcm, otherwise e.g. Ogg/WebM Opus chunks from
+    MediaRecorder) and a text frame "end" when done. The server replies with
+    JSON messages of type "partial" and "final" carrying an
+    AudioTranscriptionResult, "ping" every WS_PING_INTERVAL seconds, and
+    "done" once the stream has been fully transcribed.
+    """
+    await websocket.accept()
+    websockets_open.inc()
+    send_lock = asyncio.Lock()
+    
+    async def send(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+    
+    async def keepalive() -> None:
+        while True:
+            await asyncio.sleep(settings.WS_PING_INTERVAL)
+            await send({"type": "ping"})
+    
+    async def audio_chunks():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                yield message["bytes"]
+            elif message.get("text", "").strip().lower() in ("end", "eof", "stop"):
+                return
+    
+    request = TranscriptionRequest(audio_format=format, language=language, stream=True)
+    pinger = asyncio.create_task(keepalive())
+    try:
+        transcription_service = await get_transcription_service(SpeechServiceType.WHISPER)
+        async for result in transcription_service.transcribe_stream(audio_chunks(), request):
+            await send({
+                "type": "final" if result.is_final else "partial",
+                **result.model_dump(),
+            })
+        await send({"type": "done"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        log.info("Streaming client disconnected")
+    except InferenceQueueFullError as e:
+        await websocket.close(code=1013, reason=str(e))  # 1013: try again later
+    except Exception as e:
+        log.error(f"Streaming transcription failed: {str(e)}")
+        await websocket.close(code=1011, reason="Transcription failed")
+    finally:
+        pinger.cancel()
+        websockets_open.dec()
 
 # Startup event
 @app.on_event("startup")
@@ -160,16 +358,25 @@ async def startup_event():
         log.error(f"Failed to configure FFmpeg: {str(e)}")
         raise
     
-    # Initialize Whisper model on startup
-    transcription_service = await get_transcription_service(SpeechServiceType.WHISPER)
-    await transcription_service.initialize()
+    # Load and warm the model in the background so the worker binds immediately;
+    # /ready reports when it can take traffic
+    model_warmup.start(SpeechServiceType.WHISPER)
+    
+    # Resume queued jobs, including any left over from before a restart
+    job_runner.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     log.info(f"Shutting down {settings.APP_NAME}")
-    # Cleanup will be handled by Python's garbage collection
+    await model_warmup.stop()
+    await job_runner.stop()  # Running jobs go back to the queue for the next start
+    await SpeechServiceFactory.cleanup()
+    inference_executor.shutdown()
+    decoder_pool.shutdown()
+    await LLMServiceFactory.cleanup()
+    await llama_service.cleanup()
 
 # Import and include routers
 # TODO: Add routers for transcription, chat, and websocket endpoints 
\ No newline at end of file
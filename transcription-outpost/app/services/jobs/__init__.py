@@ -0,0 +1,9 @@
+from .runner import JobRunner, job_runner
+from .store import JobStore, job_store
+
+__all__ = [
+    "JobRunner",
+    "JobStore",
+    "job_runner",
+    "job_store",
+]
@@ -0,0 +1,143 @@
+import asyncio
+import os
+from typing import BinaryIO, Optional
+
+from fastapi import APIRouter, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from ...core.config import settings
+from ...core.logger import log
+from ...core.uploads import spooled_upload
+from ...core.models import JobStatus
+from ..speech.factory import SpeechServiceType
+from .runner import job_runner
+from .store import job_store
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+# Upload copy size; the file is never held in memory whole
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds JOBS_MAX_AUDIO_MB while being saved"""
+
+
+def _save_upload(source: BinaryIO, path: str, limit: int) -> None:
+    """Copy an upload to disk in chunks, removing it again if it is too large"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    try:
+        with open(path, "wb") as target:
+            while True:
+                chunk = source.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise UploadTooLargeError
+                target.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+@router.post("", status_code=202)
+async def create_job(
+    file: UploadFile,
+    model: str = Form("whisper"),  # provider, optionally with a size: "whisper-small"
+    vad: Optional[bool] = Form(None),
+    enhance: bool = Form(False),
+) -> JSONResponse:
+    """
+    Queue an audio file for background transcription
+
+    Returns immediately with the job id; poll ``GET /jobs/{id}`` for
+    progress and the result.
+
+    Args:
+        file: The audio file to transcribe
+        model: Provider and optional size, e.g. 'whisper' or 'whisper-small'
+        vad: Strip silence before transcribing; defaults to settings.VAD_ENABLED
+        enhance: Also correct and summarise the transcript with the LLM
+    """
+    limit = settings.JOBS_MAX_AUDIO_MB * 1024 * 1024
+    if file.size and file.size > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum of {settings.JOBS_MAX_AUDIO_MB}MB"
+        )
+
+    file_ext = file.filename.split(".")[-1].lower()
+    if file_ext not in settings.SUPPORTED_AUDIO_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported audio format. Supported formats: {settings.SUPPORTED_AUDIO_FORMATS}"
+        )
+
+    # Reject unknown models now rather than when a worker picks the job up
+    provider, _, model_size = model.partition("-")
+    try:
+        SpeechServiceType(provider)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown speech provider: {provider}")
+    if model_size and model_size not in settings.WHISPER_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown model size: {model_size}. Available: {settings.WHISPER_MODELS}"
+        )
+
+    job_id = job_store.new_id()
+    try:
+        await asyncio.to_thread(
+            _save_upload, spooled_upload(file), job_store.audio_path(job_id, file_ext), limit
+        )
+        params = {"provider": provider, "model_size": model_size or None, "vad": vad, "enhance": enhance}
+        job = await asyncio.to_thread(job_store.create, job_id, file_ext, params)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum of {settings.JOBS_MAX_AUDIO_MB}MB"
+        )
+    except Exception as e:
+        log.error(f"Failed to queue job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to queue job. Please try again.")
+    finally:
+        await file.close()
+
+    job_runner.notify()
+    url = f"{settings.API_V1_STR}/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={"id": job_id, "status": job["status"], "url": url},
+        headers={"Location": url},
+    )
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str) -> JobStatus:
+    """Status, progress in audio seconds and, once completed, the result of a job"""
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["status"] == "running":
+        # The store only sees progress at each heartbeat; this worker knows more
+        live = job_runner.progress(job_id)
+        if live is not None:
+            job.update(live)
+
+    duration = job["duration"]
+    return JobStatus(
+        id=job["id"],
+        status=job["status"],
+        progress_seconds=round(job["progress_seconds"], 2),
+        duration=duration,
+        progress=round(min(job["progress_seconds"] / duration, 1.0), 3) if duration else None,
+        attempts=job["attempts"],
+        result=job["result"],
+        error=job["error"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+    )
@@ -0,0 +1,177 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from ...core.config import settings
+from ...core.logger import log
+from ...core.metrics import registry
+from ..llm.factory import get_llm_service
+from ..speech.admission import transcribe_reserved
+from ..speech.executor import InferenceQueueFullError
+from ..speech.factory import get_transcription_service
+from .store import JobStore, job_store
+
+jobs_finished = registry.counter("jobs_finished_total", "Background jobs finished", ["status"])
+jobs_running = registry.gauge("jobs_running", "Background jobs being processed by this process")
+
+# Seconds between queue polls when nobody calls notify (e.g. jobs queued by another process)
+POLL_INTERVAL = 1.0
+
+
+class JobRunner:
+    """
+    Background workers that drain the job queue
+
+    Each worker claims one job at a time from the store, transcribes its
+    audio while reporting progress through the lease heartbeat, optionally
+    enhances the text with the LLM, and stores the result. Workers stopped
+    by a shutdown hand their job back to the queue; a crashed process's
+    jobs are picked up again once their lease expires.
+    """
+
+    def __init__(self, store: JobStore, workers: Optional[int] = None):
+        self.store = store
+        self.workers = workers or settings.JOBS_WORKERS
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        log.info(f"Started {self.workers} job worker(s) on {self.store.db_path}")
+
+    def notify(self) -> None:
+        """Wake idle workers after a job is queued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Live progress of a job running in this process, fresher than the last heartbeat"""
+        state = self._running.get(job_id)
+        return dict(state) if state is not None else None
+
+    async def stats(self) -> Dict[str, Any]:
+        """Workers, jobs in progress here and queue totals; the count query runs off the event loop"""
+        queue = await asyncio.to_thread(self.store.counts)
+        return {
+            "workers": len(self._tasks),
+            "running": sorted(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue": queue,
+        }
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.store.claim)
+            except Exception as e:
+                log.error(f"Claiming a job failed: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        """Process one claimed job and record how it ended"""
+        job_id, attempt = job["id"], job["attempts"]
+        state = {"progress_seconds": 0.0, "duration": job["duration"]}
+        self._running[job_id] = state
+
+        def progress(seconds: float, duration: float) -> None:
+            # Called from inference threads; the heartbeat persists it
+            state["progress_seconds"] = seconds
+            state["duration"] = duration
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, attempt, state))
+        jobs_running.inc()
+        try:
+            result = await self._execute(job, progress)
+            if await asyncio.to_thread(self.store.complete, job_id, attempt, result):
+                self.completed += 1
+                jobs_finished.inc(status="completed")
+            self._remove_audio(job)
+        except asyncio.CancelledError:
+            self.store.release(job_id, attempt)
+            raise
+        except InferenceQueueFullError:
+            # Interactive requests have the inference slots; try again later
+            await asyncio.to_thread(self.store.release, job_id, attempt)
+            await asyncio.sleep(settings.INFERENCE_RETRY_AFTER)
+        except Exception as e:
+            log.error(f"Job {job_id} failed: {str(e)}")
+            if await asyncio.to_thread(self.store.fail, job_id, attempt, str(e)):
+                self.failed += 1
+                jobs_finished.inc(status="failed")
+            self._remove_audio(job)
+        finally:
+            heartbeat.cancel()
+            jobs_running.dec()
+            self._running.pop(job_id, None)
+
+    async def _execute(self, job: Dict[str, Any], progress) -> Dict[str, Any]:
+        """Transcribe, and optionally enhance, one job's audio"""
+        params = job["params"]
+        service = await get_transcription_service(params["provider"], params.get("model_size"))
+        with open(self.store.audio_path(job["id"], job["file_ext"]), "rb") as audio:
+            # ffmpeg reads the saved file itself; it is never loaded into memory.
+            # Jobs hold compute budget too, so interactive admission sees them
+            transcription = await transcribe_reserved(
+                service, audio, job["file_ext"], vad=params.get("vad"), progress=progress
+            )
+        result = transcription.model_dump()
+
+        if params.get("enhance") and transcription.text.strip():
+            # The transcript is the expensive part; keep it even if the LLM is down
+            try:
+                llm_service = await get_llm_service()
+                result["enhancement"] = await llm_service.process_transcription(transcription.text)
+            except Exception as e:
+                log.error(f"Enhancement of job {job['id']} failed: {str(e)}")
+                result["enhancement_error"] = str(e)
+        return result
+
+    async def _heartbeat(self, job_id: str, attempt: int, state: Dict[str, Any]) -> None:
+        """Persist progress and renew the lease until the job finishes"""
+        interval = settings.JOBS_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(
+                    self.store.heartbeat,
+                    job_id,
+                    attempt,
+                    state["progress_seconds"],
+                    state["duration"],
+                )
+            except Exception as e:
+                log.warning(f"Heartbeat for job {job_id} failed: {str(e)}")
+
+    def _remove_audio(self, job: Dict[str, Any]) -> None:
+        try:
+            os.remove(self.store.audio_path(job["id"], job["file_ext"]))
+        except FileNotFoundError:
+            pass
+
+
+# Job workers for this process
+job_runner = JobRunner(job_store)
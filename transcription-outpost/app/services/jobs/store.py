@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from ...core.config import settings
+
+# queued -> running -> completed | failed; running goes back to queued on shutdown
+STATUSES = ("queued", "running", "completed", "failed")
+
+_COLUMNS = (
+    "id, status, file_ext, params, progress_seconds, duration, result, error, "
+    "attempts, created_at, started_at, finished_at, lease_until"
+)
+
+
+class JobStore:
+    """
+    SQLite-backed queue of transcription jobs
+
+    Job rows and their uploaded audio live under one directory, so queued
+    and half-done work survives a restart and every worker process pointing
+    at the same directory shares one queue. A worker claims a job with a
+    lease it keeps renewing; if the worker dies, the lease runs out and the
+    job is claimed again, up to JOBS_MAX_ATTEMPTS times. Writes from a worker
+    carry the attempt number it claimed, so a worker that lost its lease
+    cannot overwrite the job's new owner.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or settings.JOBS_DIR
+        self.db_path = os.path.join(self.directory, "jobs.db")
+        self.audio_dir = os.path.join(self.directory, "audio")
+        self._local = threading.local()  # One SQLite connection per thread
+        self._table_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.audio_dir, exist_ok=True)
+            # Autocommit, so claims can take the write lock with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._table_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, file_ext TEXT NOT NULL, "
+                "params TEXT NOT NULL, progress_seconds REAL NOT NULL DEFAULT 0, "
+                "duration REAL, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, lease_until REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._table_ready = True
+        return conn
+
+    def audio_path(self, job_id: str, file_ext: str) -> str:
+        """Where a job's uploaded audio is kept until it finishes"""
+        return os.path.join(self.audio_dir, f"{job_id}.{file_ext}")
+
+    def new_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def create(self, job_id: str, file_ext: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job whose audio is already at ``audio_path(job_id, file_ext)``"""
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO jobs (id, status, file_ext, params, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, "queued", file_ext, json.dumps(params), time.time()),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def claim(self, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job, or a running one whose worker stopped renewing
+
+        Jobs that have already used up JOBS_MAX_ATTEMPTS are failed instead
+        of being handed out again.
+        """
+        lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+        conn = self._connection()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")  # One claimer at a time across processes
+            try:
+                row = conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row["attempts"] >= settings.JOBS_MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, "
+                        "lease_until = NULL WHERE id = ?",
+                        (f"Gave up after {row['attempts']} attempts", now, row["id"]),
+                    )
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "started_at = COALESCE(started_at, ?), lease_until = ?, "
+                    "progress_seconds = 0 WHERE id = ?",
+                    (now, now + lease_seconds, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            job = self._to_dict(row)
+            job.update(status="running", attempts=row["attempts"] + 1, progress_seconds=0.0)
+            return job
+
+    def heartbeat(
+        self,
+        job_id: str,
+        attempt: int,
+        progress_seconds: float,
+        duration: Optional[float],
+        lease_seconds: Optional[float] = None,
+    ) -> bool:
+        """Record progress and extend the lease; False if the job is no longer ours"""
+        lease_seconds = lease_seconds or settings.JOBS_LEASE_SECONDS
+        cursor = self._connection().execute(
+            "UPDATE jobs SET progress_seconds = ?, duration = ?, lease_until = ? "
+            "WHERE id = ? AND attempts = ? AND status = 'running'",
+            (progress_seconds, duration, time.time() + lease_seconds, job_id, attempt),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, attempt: int, result: Dict[str, Any]) -> bool:
+        duration = result.get("duration")
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'completed', result = ?, duration = ?, "
+            "progress_seconds = ?, finished_at = ?, lease_until = NULL "
+            "WHERE id = ? AND attempts = ? AND status = 'running'",
+            (json.dumps(result), duration, duration or 0, time.time(), job_id, attempt),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, attempt: int, error: str) -> bool:
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL "
+            "WHERE id = ? AND attempts = ? AND status = 'running'",
+            (error, time.time(), job_id, attempt),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, job_id: str, attempt: int) -> bool:
+        """Put a job back in the queue without counting the attempt (shutdown, overload)"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'queued', attempts = attempts - 1, "
+            "progress_seconds = 0, lease_until = NULL "
+            "WHERE id = ? AND attempts = ? AND status = 'running'",
+            (job_id, attempt),
+        )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, count in self._connection().execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+
+# Job queue shared by every worker process using the same JOBS_DIR
+job_store = JobStore()
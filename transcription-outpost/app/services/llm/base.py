@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
 
@@ -33,6 +33,15 @@ class BaseLLMService(ABC):
         """
         pass
 
+    async def stream_response(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Yield a response as it is generated
+        
+        Providers that can stream should override this; the default yields
+        the complete response as a single chunk.
+        """
+        yield await self.generate_response(prompt, **kwargs)
+
     @abstractmethod
     async def process_transcription(self, transcription: str) -> Dict[str, str]:
         """
@@ -46,6 +55,17 @@ class BaseLLMService(ABC):
         """
         pass
 
+    async def stream_transcription(self, transcription: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a transcription's processed results
+        
+        Yields (field, text) pairs such as ('summary', token). The default
+        yields each field of ``process_transcription`` whole.
+        """
+        results = await self.process_transcription(transcription)
+        for field, text in results.items():
+            yield field, text
+
     @abstractmethod
     async def cleanup(self) -> None:
         """Cleanup resources"""
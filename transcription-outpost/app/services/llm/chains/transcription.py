@@ -1,8 +1,14 @@
+import time
 from typing import Any, Dict
 from langchain.llms.base import LLM
 from langchain.prompts import PromptTemplate
 from loguru import logger
 
+from ....core.config import settings
+from ....core.metrics import stage_latency
+from ..dag import ChainGraph, ChainStep
+from ..mapreduce import MapReduceSummarizer
+from ..pipeline import EnhancementPipeline
 from ..providers.llama import llama_service
 
 class LlamaLLM(LLM):
@@ -14,7 +20,9 @@ class LlamaLLM(LLM):
     
     async def _acall(self, prompt: str, stop: list[str] | None = None, **kwargs: Any) -> str:
         """Async call to the LlamaService"""
-        return await llama_service.generate_response(prompt)
+        return await llama_service.generate_response(
+            prompt, temperature=settings.LLM_ENHANCE_TEMPERATURE
+        )
     
     def _call(self, prompt: str, stop: list[str] | None = None, **kwargs: Any) -> str:
         """Synchronous call - we'll use async in practice"""
@@ -55,22 +63,76 @@ class TranscriptionChain:
         
         # Modern LangChain pattern: prompt | llm
         self.summary_chain = self.summary_prompt | self.llm
+        
+        # Merges partial summaries of a long transcript
+        self.combine_prompt = PromptTemplate(
+            input_variables=["summaries"],
+            template="""
+            The following are summaries of consecutive parts of one transcription.
+            Combine them into a single concise summary:
+            
+            {summaries}
+            """
+        )
+        self.combine_chain = self.combine_prompt | self.llm
+        
+        # Transcripts too long for one prompt are processed chunk by chunk
+        self.summarizer = MapReduceSummarizer(
+            summarize=lambda text: self.summary_chain.ainvoke({"transcription": text}),
+            combine=lambda text: self.combine_chain.ainvoke({"summaries": text}),
+        )
+        
+        # Both steps only read the transcription, so they run concurrently
+        self.graph = ChainGraph([
+            ChainStep("processed_text", self._process),
+            ChainStep("summary", self._summarize),
+        ])
+    
+    async def _process(self, transcription: str) -> str:
+        """Correct the transcription, chunk by chunk when it is long"""
+        if self.summarizer.is_long(transcription):
+            chunks = await self.summarizer.map(
+                transcription,
+                lambda text: self.process_chain.ainvoke({"transcription": text}),
+            )
+            return " ".join(chunk.strip() for chunk in chunks)
+        return await self.process_chain.ainvoke({"transcription": transcription})
+    
+    async def _summarize(self, transcription: str) -> str:
+        """Summarise the transcription, map-reduce style when it is long"""
+        return await self.summarizer.summarize(transcription)
+    
+    def pipeline(self) -> EnhancementPipeline:
+        """
+        Start an enhancement to feed with segments while transcription runs
+        
+        Must be called on the event loop that will await its ``finish``.
+        """
+        return EnhancementPipeline(
+            correct=lambda text: self.process_chain.ainvoke({"transcription": text}),
+            summarizer=self.summarizer,
+        )
+    
+    def add_step(self, step: ChainStep) -> None:
+        """
+        Add a step to the chain graph
+        
+        Its output appears in the result under the step name. A step that
+        only reads the transcription runs alongside the existing ones.
+        """
+        self.graph = ChainGraph(list(self.graph.steps.values()) + [step])
     
     async def process_transcription(self, transcription: str) -> Dict[str, str]:
         """Process a transcription through multiple chains"""
+        started = time.perf_counter()
         try:
-            # Run chains using modern LangChain invoke API
-            processed = await self.process_chain.ainvoke({"transcription": transcription})
-            summary = await self.summary_chain.ainvoke({"transcription": transcription})
-            
-            return {
-                "processed_text": processed,
-                "summary": summary
-            }
+            return await self.graph.run(transcription=transcription)
         
         except Exception as e:
             logger.error(f"Error in transcription chain: {str(e)}")
             raise
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_enhance")
 
 # Initialize the chain
 transcription_chain = TranscriptionChain() 
\ No newline at end of file
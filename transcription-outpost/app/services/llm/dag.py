@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from ...core.config import settings
+from ...core.metrics import stage_latency
+
+StepFunction = Callable[..., Awaitable[Any]]
+
+
+class ChainStepError(RuntimeError):
+    """A chain step failed or timed out"""
+
+    def __init__(self, step: str, error: BaseException):
+        self.step = step
+        self.error = error
+        reason = "timed out" if isinstance(error, asyncio.TimeoutError) else str(error)
+        super().__init__(f"Chain step '{step}' failed: {reason}")
+
+
+class ChainStep:
+    """
+    One node of a chain graph
+
+    ``run`` is called with the named ``inputs`` as keyword arguments; each
+    input is either a value passed to ``ChainGraph.run`` or the output of
+    another step with that name.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: StepFunction,
+        inputs: Sequence[str] = ("transcription",),
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+
+
+class ChainGraph:
+    """
+    Runs chain steps as a dependency graph
+
+    Every step starts as soon as the steps it reads from have finished, so
+    steps that only need the transcription run side by side and the whole
+    graph costs about as long as its slowest path. A semaphore caps how many
+    steps are in flight at once, each step has its own timeout, and the
+    first failure cancels the steps still running.
+    """
+
+    def __init__(
+        self,
+        steps: Sequence[ChainStep],
+        max_concurrency: Optional[int] = None,
+        step_timeout: Optional[float] = None,
+    ):
+        self.steps: Dict[str, ChainStep] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate chain step: {step.name}")
+            self.steps[step.name] = step
+        self.max_concurrency = max_concurrency or settings.LLM_CHAIN_CONCURRENCY
+        self.step_timeout = settings.LLM_STEP_TIMEOUT if step_timeout is None else step_timeout
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        """Reject graphs where a step depends on itself, directly or not"""
+        visiting, done = set(), set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in done or name not in self.steps:
+                return
+            if name in visiting:
+                raise ValueError(f"Chain steps form a cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dependency in self.steps[name].inputs:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name, [])
+
+    async def run(self, **inputs: Any) -> Dict[str, Any]:
+        """
+        Execute every step
+
+        Args:
+            **inputs: Values the steps read that no step produces
+
+        Returns:
+            Output of each step by name
+
+        Raises:
+            ValueError: If a step reads an input that is neither given nor produced
+            ChainStepError: If a step raises or exceeds its timeout
+        """
+        for step in self.steps.values():
+            missing = [name for name in step.inputs if name not in self.steps and name not in inputs]
+            if missing:
+                raise ValueError(f"Chain step '{step.name}' is missing inputs: {missing}")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def execute(step: ChainStep) -> Any:
+            arguments = {}
+            for name in step.inputs:
+                arguments[name] = await tasks[name] if name in self.steps else inputs[name]
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(
+                        step.run(**arguments), step.timeout or self.step_timeout or None
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    raise ChainStepError(step.name, e) from e
+                finally:
+                    stage_latency.observe(time.perf_counter() - started, stage=f"llm_{step.name}")
+
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.create_task(execute(step))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,129 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, List, Optional
+
+from ...core.config import settings
+
+TextFunction = Callable[[str], Awaitable[str]]
+
+# LLaMA tokenizers average roughly four characters of English per token
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count without loading a tokenizer"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_by_tokens(text: str, budget: int) -> List[str]:
+    """
+    Split text into chunks of at most ``budget`` estimated tokens
+
+    Chunks end at sentence boundaries where possible and are filled greedily
+    from the start, so appending text to a transcript leaves every chunk but
+    the last unchanged.
+    """
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if estimate_tokens(sentence) <= budget:
+            pieces.append(sentence)
+            continue
+        # A run-on sentence (no punctuation) is cut between words instead
+        words: List[str] = []
+        for word in sentence.split():
+            if words and estimate_tokens(" ".join(words + [word])) > budget:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for piece in pieces:
+        if current and estimate_tokens(" ".join(current + [piece])) > budget:
+            chunks.append(" ".join(current))
+            current = []
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    Summaries of transcripts longer than the model's context window
+
+    The transcript is split into chunks of LLM_CHUNK_TOKENS, each chunk is
+    summarised concurrently (at most LLM_CHAIN_CONCURRENCY in flight), then
+    the partial summaries are combined in groups that fit the same budget,
+    level by level, until one summary is left.
+
+    Chunking and grouping are both greedy from the start, so when new audio
+    is appended only the tail's prompts change; the earlier prompts are
+    identical and, as long as the callers run them at temperature 0, are
+    answered by the LLM response cache.
+    """
+
+    def __init__(
+        self,
+        summarize: TextFunction,
+        combine: TextFunction,
+        chunk_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.summarize_chunk = summarize
+        self.combine_summaries = combine
+        self.chunk_tokens = chunk_tokens or settings.LLM_CHUNK_TOKENS
+        self.max_concurrency = max_concurrency or settings.LLM_CHAIN_CONCURRENCY
+
+    def is_long(self, text: str) -> bool:
+        """Whether text needs splitting to fit one prompt"""
+        return estimate_tokens(text) > self.chunk_tokens
+
+    async def map(self, text: str, function: TextFunction) -> List[str]:
+        """Apply function to every chunk of text concurrently, in order"""
+        return await self._gather(function, split_by_tokens(text, self.chunk_tokens))
+
+    async def summarize(self, text: str) -> str:
+        """Summarise text of any length"""
+        if not self.is_long(text):
+            return await self.summarize_chunk(text)
+
+        return await self.reduce(await self.map(text, self.summarize_chunk))
+
+    async def reduce(self, summaries: List[str]) -> str:
+        """Combine partial summaries of consecutive text, level by level, into one"""
+        while len(summaries) > 1:
+            groups = self._group(summaries)
+            summaries = await self._gather(
+                self.combine_summaries, ["\n\n".join(group) for group in groups]
+            )
+        return summaries[0]
+
+    def _group(self, summaries: List[str]) -> List[List[str]]:
+        """Group consecutive summaries that fit one prompt, at least two per group"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        for summary in summaries:
+            fits = estimate_tokens("\n\n".join(current + [summary])) <= self.chunk_tokens
+            if len(current) >= 2 and not fits:
+                groups.append(current)
+                current = []
+            current.append(summary)
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])  # A lone tail would not shrink
+        elif current:
+            groups.append(current)
+        return groups
+
+    async def _gather(self, function: TextFunction, texts: List[str]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(text: str) -> str:
+            async with semaphore:
+                return await function(text)
+
+        return list(await asyncio.gather(*(run(text) for text in texts)))
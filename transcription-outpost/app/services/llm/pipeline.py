@@ -0,0 +1,131 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from ...core.config import settings
+from ...core.metrics import stage_latency
+from .mapreduce import MapReduceSummarizer, TextFunction, estimate_tokens
+
+
+class EnhancementPipeline:
+    """
+    LLM enhancement that overlaps with transcription
+
+    Segments are fed in as the speech service finalises them. Every
+    LLM_PIPELINE_BATCH_TOKENS of text is corrected and summarised straight
+    away, at most LLM_CHAIN_CONCURRENCY calls at once, while Whisper works
+    on the rest of the audio. ``finish`` sends whatever is left, then joins
+    the corrected batches and combines the partial summaries the same way
+    the map-reduce summariser does.
+
+    Providers that only return segments at the end still work; the whole
+    transcript then arrives as one feed in ``finish``.
+    """
+
+    def __init__(
+        self,
+        correct: TextFunction,
+        summarizer: MapReduceSummarizer,
+        batch_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.correct = correct
+        self.summarizer = summarizer
+        self.batch_tokens = batch_tokens or settings.LLM_PIPELINE_BATCH_TOKENS
+        self._semaphore = asyncio.Semaphore(max_concurrency or settings.LLM_CHAIN_CONCURRENCY)
+        self._loop = asyncio.get_running_loop()
+        self._buffer: List[str] = []
+        self._fed = 0  # Segments received so far
+        self._batches: List[asyncio.Task] = []
+        self._started = time.perf_counter()
+        self._first_batch: Optional[float] = None
+        self._transcribed: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def feed(self, segments: List[dict]) -> None:
+        """Add finished segments, in order; safe to call from worker threads"""
+        self._loop.call_soon_threadsafe(self._add, list(segments))
+
+    def _add(self, segments: List[dict]) -> None:
+        self._fed += len(segments)
+        for segment in segments:
+            text = segment.get("text", "").strip()
+            if text:
+                self._buffer.append(text)
+        if self._buffer and estimate_tokens(" ".join(self._buffer)) >= self.batch_tokens:
+            self._send()
+
+    def _send(self) -> None:
+        """Start correcting and summarising the buffered text"""
+        if self._first_batch is None:
+            self._first_batch = time.perf_counter()
+        text = " ".join(self._buffer)
+        self._buffer = []
+        self._batches.append(asyncio.ensure_future(self._enhance(text)))
+
+    async def _enhance(self, text: str) -> List[str]:
+        return list(await asyncio.gather(
+            self._limited(self.correct, text),
+            self._limited(self.summarizer.summarize_chunk, text),
+        ))
+
+    async def _limited(self, function: TextFunction, text: str) -> str:
+        async with self._semaphore:
+            return await function(text)
+
+    async def finish(self, segments: Optional[List[dict]], text: str) -> Dict[str, str]:
+        """
+        Enhance the rest of the transcript and return the combined result
+
+        Args:
+            segments: All segments of the final transcription result
+            text: Its full text, used when there are no segments
+
+        Returns:
+            ``processed_text`` and ``summary``, as from ``process_transcription``
+        """
+        await asyncio.sleep(0)  # Let feeds already scheduled on the loop land first
+        self._transcribed = time.perf_counter()
+        try:
+            if segments:
+                self._add(segments[self._fed:])
+            elif not self._fed and text.strip():
+                self._add([{"text": text}])
+            if self._buffer:
+                self._send()
+            if not self._batches:
+                return {"processed_text": "", "summary": ""}
+
+            results = await asyncio.gather(*self._batches)
+            corrected = [result[0].strip() for result in results]
+            summary = await self.summarizer.reduce([result[1].strip() for result in results])
+            return {"processed_text": " ".join(corrected), "summary": summary.strip()}
+        except BaseException:
+            self.cancel()
+            raise
+        finally:
+            self._finished = time.perf_counter()
+            if self._first_batch is not None:
+                stage_latency.observe(self._finished - self._first_batch, stage="llm_enhance_pipelined")
+
+    def cancel(self) -> None:
+        """Abandon batches still running, e.g. when transcription fails"""
+        for batch in self._batches:
+            batch.cancel()
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        """
+        Per-stage wall-clock times in ms
+
+        ``enhance_after_transcribe_ms`` is the latency enhancement adds on top
+        of transcription; without pipelining it would equal ``enhance_ms``.
+        """
+        def ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+            return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+        return {
+            "transcribe_ms": ms(self._started, self._transcribed),
+            "enhance_ms": ms(self._first_batch, self._finished),
+            "enhance_after_transcribe_ms": ms(self._transcribed, self._finished),
+            "total_ms": ms(self._started, self._finished),
+        }
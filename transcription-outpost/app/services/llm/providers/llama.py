@@ -1,35 +1,258 @@
-from typing import Optional, Dict, Any
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Awaitable, Optional, Dict, Any, List, Tuple
 import httpx
 from loguru import logger
 
+from ....core.cache import content_key, llm_cache
+from ....core.config import settings
+from ....core.metrics import registry, stage_latency
+from ....core.singleflight import llm_flights
 from ..base import BaseLLMService
+from ..dag import ChainGraph, ChainStep
+from ..mapreduce import MapReduceSummarizer, split_by_tokens
+
+PROCESS_PROMPT = """
+            Process the following transcription, correcting any obvious errors,
+            and format it into clear, punctuated text:
+            
+            {transcription}
+            """
+
+SUMMARY_PROMPT = """
+            Provide a concise summary of the following transcription:
+            
+            {transcription}
+            """
+
+# Shared-context mode: the transcript is evaluated once by PRIME_PROMPT and
+# each instruction continues from the context Ollama returns for it
+PRIME_PROMPT = """
+            Here is a transcription. Read it and reply only with OK.
+            
+            {transcription}
+            """
+
+PROCESS_INSTRUCTION = """
+            Process the transcription above, correcting any obvious errors,
+            and format it into clear, punctuated text.
+            """
+
+SUMMARY_INSTRUCTION = """
+            Provide a concise summary of the transcription above.
+            """
+
+COMBINE_PROMPT = """
+            The following are summaries of consecutive parts of one transcription.
+            Combine them into a single concise summary:
+            
+            {summaries}
+            """
+
+# httpcore trace events fired when the pool has to open a new connection
+_CONNECT_EVENTS = {"connection.connect_tcp.complete", "connection.connect_unix_socket.complete"}
+
+llm_requests = registry.counter(
+    "llm_http_requests_total", "HTTP requests sent to the LLM backend", ["status"]
+)
+llm_connections = registry.counter(
+    "llm_http_connections_opened_total", "New connections opened to the LLM backend"
+)
+llm_latency = registry.histogram(
+    "llm_http_request_duration_seconds", "LLM backend HTTP request latency", ["endpoint"]
+)
+llm_prompt_tokens = registry.counter(
+    "llm_prompt_eval_tokens_total", "Prompt tokens evaluated by the LLM backend"
+)
+
 
 class LlamaService(BaseLLMService):
-    def __init__(self):
-        self.base_url = "http://localhost:11434/api"
-        self.model = "llama2:13b-chat"
-        self.model_name = "llama2:13b-chat"  # For compatibility with tests
+    """
+    LLaMA via the Ollama HTTP API
+
+    All requests share one long-lived ``httpx.AsyncClient``, so connections
+    to Ollama are kept alive and reused instead of being opened per prompt.
+    Pool size, keep-alive and timeouts come from the LLM settings.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = settings.OLLAMA_BASE_URL
+        self.model = settings.OLLAMA_MODEL
+        self.model_name = settings.OLLAMA_MODEL  # For compatibility with tests
         self._initialized = False
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.connections_opened = 0
+        # Transcripts too long for one prompt are processed chunk by chunk
+        self.summarizer = MapReduceSummarizer(
+            summarize=lambda text: self._enhance(SUMMARY_PROMPT.format(transcription=text)),
+            combine=lambda text: self._enhance(COMBINE_PROMPT.format(summaries=text)),
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, created on first use inside the running event loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+                event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            )
+        return self._client
+    
+    async def _on_request(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+        request.extensions["started"] = time.perf_counter()
+    
+    async def _on_response(self, response: httpx.Response) -> None:
+        request = response.request
+        started = request.extensions.get("started")
+        if started is not None:
+            llm_latency.observe(time.perf_counter() - started, endpoint=request.url.path)
+        llm_requests.inc(status=str(response.status_code))
+        self.requests += 1
+    
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """Count connections the pool had to open rather than reuse"""
+        if event_name in _CONNECT_EVENTS:
+            llm_connections.inc()
+            self.connections_opened += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Requests sent and how many of them reused a pooled connection"""
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(self.requests - self.connections_opened, 0),
+        }
+    
+    def _cache_key(
+        self,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        cache: Optional[bool],
+        context: Optional[List[int]] = None,
+    ) -> Optional[str]:
+        """
+        Response cache key, or None when this call should not be cached
+        
+        Only greedy (temperature 0) output is cached by default; a sampled
+        response is one draw of many, so replaying it needs ``cache=True``.
+        """
+        if cache is None:
+            cache = settings.CACHE_ENABLED and settings.LLM_CACHE_ENABLED and temperature == 0
+        if not cache:
+            return None
+        return self._request_key(prompt, temperature, top_p, context)
+    
+    def _request_key(
+        self, prompt: str, temperature: float, top_p: float, context: Optional[List[int]] = None
+    ) -> str:
+        """Identity of a generation request, shared by the cache and coalescing"""
+        return content_key(
+            prompt.encode(), model=self.model, temperature=temperature, top_p=top_p, context=context
+        )
+    
+    def _payload(
+        self,
+        prompt: str,
+        stream: bool,
+        context: Optional[List[int]] = None,
+        **options: Any,
+    ) -> Dict[str, Any]:
+        """Body of an Ollama /generate request"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options,
+            # Keep the model loaded between calls instead of Ollama's 5 minute default
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        }
+        if context is not None:
+            payload["context"] = context
+        return payload
+    
+    @staticmethod
+    def _record_prompt_eval(result: Dict[str, Any]) -> None:
+        """Report how long Ollama spent evaluating the prompt of one call"""
+        duration = result.get("prompt_eval_duration")
+        if duration is None:
+            return  # Ollama omits it when the whole prompt came from its cache
+        tokens = result.get("prompt_eval_count", 0)
+        stage_latency.observe(duration / 1e9, stage="llm_prompt_eval")
+        llm_prompt_tokens.inc(tokens)
+        logger.debug(f"Prompt eval: {tokens} tokens in {duration / 1e6:.0f} ms")
+    
+    async def prime_context(self, transcription: str) -> List[int]:
+        """
+        Evaluate a transcript once and return Ollama's context for it
+        
+        Prompts that pass this context continue from the evaluated
+        transcript, so each instruction only costs its own tokens.
+        """
+        prompt = PRIME_PROMPT.format(transcription=transcription)
+        cache_key = self._cache_key(prompt, 0.0, 1.0, None)
+        if cache_key is not None:
+            cached = await llm_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+        
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return await self._fetch_context(prompt, cache_key)
+        context = await llm_flights.do(
+            self._request_key(prompt, 0.0, 1.0), lambda: self._fetch_context(prompt, cache_key)
+        )
+        return list(context)
+    
+    async def _fetch_context(self, prompt: str, cache_key: Optional[str]) -> List[int]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                "generate", json=self._payload(prompt, False, temperature=0.0, num_predict=1)
+            )
+            response.raise_for_status()
+            result = response.json()
+            self._record_prompt_eval(result)
+            context = result["context"]
+            if cache_key is not None:
+                await llm_cache.aset(cache_key, context)
+            return context
+        
+        except Exception as e:
+            logger.error(f"Error priming context: {str(e)}")
+            raise
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_prime")
     
     async def initialize(self) -> None:
         """Initialize the LLM service and load models"""
         if not self._initialized:
-            self._check_model()
+            await self._check_model()
             self._initialized = True
     
-    def _check_model(self) -> None:
+    async def _check_model(self) -> None:
         """Verify that the model is available"""
         try:
-            with httpx.Client() as client:
-                response = client.get(f"{self.base_url}/tags")
-                models = response.json()
-                
-                if not any(model["name"] == self.model for model in models["models"]):
-                    raise RuntimeError(
-                        f"Model {self.model} not found. Please run 'ollama pull {self.model}' first."
-                    )
-                
-                logger.success(f"LLaMA model '{self.model}' is available!")
+            response = await self.client.get("tags")
+            response.raise_for_status()
+            models = response.json()
+            
+            if not any(model["name"] == self.model for model in models["models"]):
+                raise RuntimeError(
+                    f"Model {self.model} not found. Please run 'ollama pull {self.model}' first."
+                )
+            
+            logger.success(f"LLaMA model '{self.model}' is available!")
         
         except Exception as e:
             logger.error(f"Failed to check LLaMA model: {str(e)}")
@@ -40,66 +263,261 @@ class LlamaService(BaseLLMService):
         prompt: str,
         temperature: float = 0.7,
         top_p: float = 0.95,
+        cache: Optional[bool] = None,
+        context: Optional[List[int]] = None,
     ) -> str:
-        """Generate a response from the LLaMA model using Ollama"""
+        """
+        Generate a response from the LLaMA model using Ollama
+        
+        Responses at temperature 0 are cached by model, prompt, context and
+        sampling parameters, so a repeated prompt is answered without calling
+        Ollama. Pass ``cache=True`` to also cache sampled responses,
+        ``cache=False`` when a fresh sample is wanted, and a ``context``
+        from ``prime_context`` to continue from an evaluated transcript.
+        Identical requests already in flight are joined rather than repeated,
+        unless ``cache=False`` asks for a sample of its own.
+        """
         if not prompt:
             raise ValueError("Prompt cannot be empty")
         
+        cache_key = self._cache_key(prompt, temperature, top_p, cache, context)
+        if cache_key is not None:
+            cached = await llm_cache.aget(cache_key)
+            if cached is not None:
+                return cached.strip()
+        
+        if cache is False or not settings.SINGLEFLIGHT_ENABLED:
+            return await self._generate(prompt, temperature, top_p, context, cache_key)
+        return await llm_flights.do(
+            self._request_key(prompt, temperature, top_p, context),
+            lambda: self._generate(prompt, temperature, top_p, context, cache_key),
+        )
+    
+    async def _generate(
+        self,
+        prompt: str,
+        temperature: float,
+        top_p: float,
+        context: Optional[List[int]],
+        cache_key: Optional[str],
+    ) -> str:
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "temperature": temperature,
-                        "top_p": top_p,
-                        "stream": False,
-                    },
-                    timeout=30.0,
-                )
-                
-                result = response.json()
-                return result["response"].strip()
+            response = await self.client.post(
+                "generate",
+                json=self._payload(prompt, False, context, temperature=temperature, top_p=top_p),
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            self._record_prompt_eval(result)
+            text = result["response"].strip()
+            if cache_key is not None:
+                await llm_cache.aset(cache_key, text)
+            return text
         
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_generate")
 
+    async def stream_response(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        cache: Optional[bool] = None,
+        context: Optional[List[int]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield response tokens as Ollama generates them
+        
+        Reads Ollama's NDJSON stream, so the caller sees the first token
+        after the prompt is processed rather than after the whole completion.
+        The read timeout applies between chunks, not to the full generation.
+        A cached response is yielded as a single chunk, stripped as
+        ``generate_response`` returns it; a completed stream is cached the
+        same way.
+        """
+        if not prompt:
+            raise ValueError("Prompt cannot be empty")
+        
+        cache_key = self._cache_key(prompt, temperature, top_p, cache, context)
+        if cache_key is not None:
+            cached = await llm_cache.aget(cache_key)
+            if cached is not None:
+                yield cached.strip()
+                return
+        
+        started = time.perf_counter()
+        first_token = True
+        tokens = []
+        try:
+            async with self.client.stream(
+                "POST",
+                "generate",
+                json=self._payload(prompt, True, context, temperature=temperature, top_p=top_p),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token:
+                            first_token = False
+                            stage_latency.observe(
+                                time.perf_counter() - started, stage="llm_first_token"
+                            )
+                        tokens.append(token)
+                        yield token
+                    if chunk.get("done"):
+                        self._record_prompt_eval(chunk)
+                        if cache_key is not None:
+                            await llm_cache.aset(cache_key, "".join(tokens).strip())
+                        break
+        
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_stream")
+    
+    async def stream_transcription(self, transcription: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream the corrected text and the summary concurrently
+        
+        Yields (field, token) pairs, interleaved as both generations progress.
+        A long transcription is corrected chunk by chunk, in order, and its
+        map-reduce summary arrives in one piece once it is complete.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def pump(field: str, tokens: AsyncIterator[str]) -> None:
+            try:
+                async for token in tokens:
+                    await queue.put((field, token))
+            finally:
+                await queue.put((field, None))
+        
+        context = await self._shared_context(transcription)
+        tasks = [
+            asyncio.create_task(pump("processed_text", self._stream_correction(transcription, context))),
+            asyncio.create_task(pump("summary", self._stream_summary(transcription, context))),
+        ]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                field, token = await queue.get()
+                if token is None:
+                    remaining -= 1
+                else:
+                    yield field, token
+            await asyncio.gather(*tasks)  # Re-raise a failed stream
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _shared_context(self, transcription: str) -> Optional[List[int]]:
+        """Context to branch instructions from, or None to send full prompts"""
+        if not settings.LLM_SHARED_CONTEXT or self.summarizer.is_long(transcription):
+            return None
+        try:
+            return await self.prime_context(transcription)
+        except Exception as e:
+            logger.warning(f"Shared context unavailable, sending full prompts: {str(e)}")
+            return None
+    
+    def _enhance(self, prompt: str, context: Optional[List[int]] = None) -> Awaitable[str]:
+        """Correction and summary prompts, run at LLM_ENHANCE_TEMPERATURE so repeats are cached"""
+        return self.generate_response(
+            prompt, temperature=settings.LLM_ENHANCE_TEMPERATURE, context=context
+        )
+    
+    def _stream_enhance(self, prompt: str, context: Optional[List[int]] = None) -> AsyncIterator[str]:
+        """Streaming form of ``_enhance``"""
+        return self.stream_response(
+            prompt, temperature=settings.LLM_ENHANCE_TEMPERATURE, context=context
+        )
+    
+    async def _stream_correction(
+        self, transcription: str, context: Optional[List[int]] = None
+    ) -> AsyncIterator[str]:
+        if context is not None:
+            async for token in self._stream_enhance(PROCESS_INSTRUCTION, context=context):
+                yield token
+            return
+        if not self.summarizer.is_long(transcription):
+            async for token in self._stream_enhance(PROCESS_PROMPT.format(transcription=transcription)):
+                yield token
+            return
+        for index, chunk in enumerate(split_by_tokens(transcription, self.summarizer.chunk_tokens)):
+            if index:
+                yield " "
+            async for token in self._stream_enhance(PROCESS_PROMPT.format(transcription=chunk)):
+                yield token
+    
+    async def _stream_summary(
+        self, transcription: str, context: Optional[List[int]] = None
+    ) -> AsyncIterator[str]:
+        if context is not None:
+            async for token in self._stream_enhance(SUMMARY_INSTRUCTION, context=context):
+                yield token
+            return
+        if not self.summarizer.is_long(transcription):
+            async for token in self._stream_enhance(SUMMARY_PROMPT.format(transcription=transcription)):
+                yield token
+            return
+        yield await self.summarizer.summarize(transcription)
+    
+    async def _correct(self, transcription: str, context: Optional[List[int]] = None) -> str:
+        """Process the transcription for better formatting, chunk by chunk when it is long"""
+        if context is not None:
+            return await self._enhance(PROCESS_INSTRUCTION, context=context)
+        if self.summarizer.is_long(transcription):
+            chunks = await self.summarizer.map(
+                transcription,
+                lambda text: self._enhance(PROCESS_PROMPT.format(transcription=text)),
+            )
+            return " ".join(chunks)
+        return await self._enhance(PROCESS_PROMPT.format(transcription=transcription))
+    
+    async def _summarize(self, transcription: str, context: Optional[List[int]] = None) -> str:
+        """Generate a summary, map-reduce style when the transcription is long"""
+        if context is not None:
+            return await self._enhance(SUMMARY_INSTRUCTION, context=context)
+        return await self.summarizer.summarize(transcription)
+    
     async def process_transcription(self, transcription: str) -> Dict[str, str]:
         """Process a transcription through LLM chains"""
+        started = time.perf_counter()
         try:
-            # Process the transcription for better formatting
-            process_prompt = f"""
-            Process the following transcription, correcting any obvious errors,
-            and format it into clear, punctuated text:
-            
-            {transcription}
-            """
-            
-            processed_text = await self.generate_response(process_prompt)
-            
-            # Generate a summary
-            summary_prompt = f"""
-            Provide a concise summary of the following transcription:
-            
-            {transcription}
-            """
-            
-            summary = await self.generate_response(summary_prompt)
-            
-            return {
-                "processed_text": processed_text,
-                "summary": summary
-            }
+            # The transcript is evaluated once, then both instructions branch
+            # off its context concurrently
+            graph = ChainGraph([
+                ChainStep("context", self._shared_context),
+                ChainStep("processed_text", self._correct, inputs=("transcription", "context")),
+                ChainStep("summary", self._summarize, inputs=("transcription", "context")),
+            ])
+            results = await graph.run(transcription=transcription)
+            return {"processed_text": results["processed_text"], "summary": results["summary"]}
             
         except Exception as e:
             logger.error(f"Error in transcription processing: {str(e)}")
             raise
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_enhance")
     
     async def cleanup(self) -> None:
-        """Cleanup resources"""
-        # No specific cleanup needed for HTTP client
+        """Close the pooled HTTP connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
         self._initialized = False
 
 # Initialize the service
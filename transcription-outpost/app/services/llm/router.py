@@ -0,0 +1,57 @@
+import json
+import time
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ...core.logger import log
+from ...core.metrics import stage_latency
+from ...core.models import EnhancementRequest
+from .factory import get_llm_service
+
+router = APIRouter(prefix="/enhancement", tags=["enhancement"])
+
+
+def _event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def stream_enhancement(request: EnhancementRequest) -> StreamingResponse:
+    """
+    Stream the processed text and summary of a transcription as Server-Sent Events
+    
+    Both fields are generated concurrently and sent token by token:
+    
+    - ``token``: ``{"field": "summary", "text": " The"}``
+    - ``done``: ``{"processed_text": "...", "summary": "..."}``, sent last
+    - ``error``: ``{"detail": "..."}`` if generation fails part-way
+    """
+    try:
+        llm_service = await get_llm_service()
+    except Exception as e:
+        log.error(f"LLM service unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail="LLM service unavailable")
+    
+    async def events():
+        started = time.perf_counter()
+        texts: dict = {}
+        try:
+            async for field, token in llm_service.stream_transcription(request.transcription):
+                texts[field] = texts.get(field, "") + token
+                yield _event("token", {"field": field, "text": token})
+            yield _event("done", {field: text.strip() for field, text in texts.items()})
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            log.error(f"Enhancement stream failed: {str(e)}")
+            yield _event("error", {"detail": "Enhancement failed. Please try again."})
+        finally:
+            stage_latency.observe(time.perf_counter() - started, stage="llm_enhance_stream")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream into one late response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
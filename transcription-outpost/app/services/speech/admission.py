@@ -0,0 +1,314 @@
+import asyncio
+import math
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from ...core.audio import AudioSource, probe_duration
+from ...core.config import settings
+from ...core.logger import log
+from ...core.metrics import registry, stage_latency
+from .base import AudioTranscriptionResult, BaseSpeechService
+from .executor import InferenceQueueFullError
+
+admission_decisions = registry.counter(
+    "admission_decisions_total", "Transcription requests by admission outcome", ["decision"]
+)
+
+# Weight of the history when a new measurement updates the real-time factor
+RTF_DECAY = 0.9
+
+# Bitrate assumed when a duration cannot be probed (128 kbps, typical of MP3 and AAC)
+FALLBACK_BYTES_PER_SECOND = 16000
+
+
+class AdmissionRejectedError(InferenceQueueFullError):
+    """Raised when admitting a request would overrun the compute budget for too long"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.args = (f"Server is at capacity, please retry in {retry_after}s",)
+
+
+class AudioTooLongError(ValueError):
+    """Raised when one request alone would cost more than the whole compute budget"""
+
+
+class AdmissionController:
+    """
+    Admit transcriptions by their expected compute, not their byte size
+
+    A request's cost is its audio duration, probed from the container
+    before decoding, times the model's measured real-time factor (inference
+    seconds per audio second). Admitted requests hold their cost against
+    ADMISSION_BUDGET_SECONDS until they finish. A request that does not fit
+    waits in line if the backlog ahead of it should drain within
+    ADMISSION_MAX_WAIT_SECONDS, and is rejected with the expected drain
+    time as Retry-After otherwise. The backlog drains at one compute second
+    per second per inference worker.
+
+    A burst of hour-long recordings therefore cannot park hours of work in
+    front of short clips: they are turned away at the door, while clips
+    that fit are admitted straight away.
+
+    Background jobs run on the same inference workers, so they hold budget
+    too (``reserve``), but at lower priority: they wait, however long it
+    takes, until no request is in line and their cost fits.
+
+    With INFERENCE_REMOTE, every HTTP worker admits work for the one shared
+    inference server, so each holds only its share of the budget and of
+    the server's inference workers (divided by WEB_CONCURRENCY). The
+    per-request cap shrinks with the share; longer audio goes to jobs.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[float] = None,
+        max_wait: Optional[float] = None,
+        default_rtf: Optional[float] = None,
+        workers: Optional[int] = None,
+    ):
+        shares = max(settings.WEB_CONCURRENCY, 1) if settings.INFERENCE_REMOTE else 1
+        self.budget = budget or settings.ADMISSION_BUDGET_SECONDS / shares
+        self.max_wait = settings.ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        self.default_rtf = default_rtf or settings.ADMISSION_DEFAULT_RTF
+        self.workers = workers or settings.INFERENCE_WORKERS / shares
+        self._rtf: Dict[str, Tuple[float, float]] = {}  # model -> decayed (compute, audio) seconds
+        self._lock = threading.Lock()
+        self._outstanding = 0.0  # Estimated compute seconds admitted and not yet finished
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+        self._background: Deque[asyncio.Future] = deque()  # Jobs waiting for room
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.reserved = 0
+
+    def rtf(self, model: str) -> float:
+        """Measured real-time factor of a model, or the default until it has run"""
+        with self._lock:
+            compute, audio = self._rtf.get(model, (0.0, 0.0))
+        return compute / audio if audio else self.default_rtf
+
+    def observe(self, model: str, audio_seconds: float, compute_seconds: float) -> None:
+        """Record an inference; called from inference threads"""
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            compute, audio = self._rtf.get(model, (0.0, 0.0))
+            # Decayed sums, so long recordings weigh in by their length
+            self._rtf[model] = (
+                compute * RTF_DECAY + compute_seconds,
+                audio * RTF_DECAY + audio_seconds,
+            )
+
+    def estimate(self, model: str, duration: Optional[float]) -> float:
+        """Expected inference seconds for audio of the given duration"""
+        return (duration or 0.0) * self.rtf(model)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget use, the line of waiting requests and decisions so far"""
+        with self._lock:
+            models = list(self._rtf)
+        return {
+            "budget_seconds": self.budget,
+            "outstanding_seconds": round(self._outstanding, 2),
+            "waiting": len(self._waiters),
+            "waiting_seconds": round(self._waiting(), 2),
+            "background_waiting": len(self._background),
+            "rtf": {model: round(self.rtf(model), 4) for model in models},
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "reserved": self.reserved,
+        }
+
+    def _waiting(self) -> float:
+        return sum(cost for cost, _ in self._waiters)
+
+    def _wait_for(self, cost: float) -> float:
+        """Seconds until the backlog, including the line ahead, leaves room for cost"""
+        excess = self._outstanding + self._waiting() + cost - self.budget
+        return max(excess, 0.0) / self.workers
+
+    @asynccontextmanager
+    async def admit(self, model: str, duration: Optional[float]) -> AsyncIterator[float]:
+        """
+        Hold a share of the compute budget while transcribing
+
+        Yields the estimated cost in compute seconds.
+
+        Raises:
+            AudioTooLongError: If the request alone exceeds the budget
+            AdmissionRejectedError: If it would wait longer than ADMISSION_MAX_WAIT_SECONDS
+        """
+        cost = self.estimate(model, duration)
+        if cost > self.budget:
+            self.rejected += 1
+            admission_decisions.inc(decision="too_long")
+            raise AudioTooLongError(
+                f"Audio of {duration:.0f}s needs about {cost:.0f}s of compute, more than this "
+                f"endpoint allows ({self.budget:.0f}s); submit it as a background job instead"
+            )
+
+        if not self._waiters and self._outstanding + cost <= self.budget:
+            self.admitted += 1
+            admission_decisions.inc(decision="admitted")
+            self._outstanding += cost
+        else:
+            await self._queue(cost)  # Holds the cost once admitted from the line
+
+        try:
+            yield cost
+        finally:
+            self._outstanding -= cost
+            self._wake()
+
+    @asynccontextmanager
+    async def reserve(self, model: str, duration: Optional[float]) -> AsyncIterator[float]:
+        """
+        Hold a share of the compute budget for background work
+
+        Waits without a limit, behind any interactive request in line, and
+        never rejects. Work costing more than the whole budget holds all of
+        it, so interactive requests see the workers as busy while it runs.
+        Yields the cost held.
+        """
+        cost = min(self.estimate(model, duration), self.budget)
+        while self._waiters or self._outstanding + cost > self.budget:
+            freed = asyncio.get_running_loop().create_future()
+            self._background.append(freed)
+            try:
+                with stage_latency.time(stage="admission_wait"):
+                    await freed
+            finally:
+                if freed in self._background:  # Cancelled while waiting
+                    self._background.remove(freed)
+
+        self.reserved += 1
+        admission_decisions.inc(decision="reserved")
+        self._outstanding += cost
+        try:
+            yield cost
+        finally:
+            self._outstanding -= cost
+            self._wake()
+
+    async def _queue(self, cost: float) -> None:
+        """Wait in line for room in the budget, or reject if that would take too long"""
+        wait = self._wait_for(cost)
+        if wait > self.max_wait:
+            self.rejected += 1
+            admission_decisions.inc(decision="rejected")
+            raise AdmissionRejectedError(max(math.ceil(wait), 1))
+
+        self.queued += 1
+        admission_decisions.inc(decision="queued")
+        admitted = asyncio.get_running_loop().create_future()
+        entry = (cost, admitted)
+        self._waiters.append(entry)
+        try:
+            with stage_latency.time(stage="admission_wait"):
+                # Estimates can be off; give up rather than wait without bound
+                await asyncio.wait_for(asyncio.shield(admitted), self.max_wait + 1)
+        except asyncio.TimeoutError:
+            if admitted.done():
+                return  # Admitted just as the wait ran out
+            self._waiters.remove(entry)
+            self._wake()
+            self.rejected += 1
+            admission_decisions.inc(decision="rejected")
+            raise AdmissionRejectedError(max(math.ceil(self._wait_for(cost)), 1))
+        except BaseException:
+            if admitted.done():
+                self._outstanding -= cost  # Admitted just as the caller went away
+            else:
+                self._waiters.remove(entry)
+            self._wake()
+            raise
+
+    def _wake(self) -> None:
+        """Admit waiting requests, in order, while they fit"""
+        while self._waiters:
+            cost, future = self._waiters[0]
+            if self._outstanding + cost > self.budget:
+                break
+            self._waiters.popleft()
+            self._outstanding += cost
+            future.set_result(None)
+        if not self._waiters:
+            # Background work goes once the line is empty; each re-checks whether it fits
+            while self._background:
+                freed = self._background.popleft()
+                if not freed.done():
+                    freed.set_result(None)
+
+
+def model_key(service: BaseSpeechService) -> str:
+    """The name real-time factors are tracked under for a service"""
+    return getattr(service, "model_name", None) or type(service).__name__
+
+
+def content_size(content: AudioSource) -> int:
+    """Size in bytes of an upload held as bytes or as a file"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return len(content)
+    position = content.tell()
+    size = content.seek(0, 2)
+    content.seek(position)
+    return size
+
+
+def estimate_duration(content: AudioSource) -> float:
+    """Audio seconds in an upload: probed, or estimated from its size if that fails"""
+    duration = probe_duration(content)
+    if duration is not None:
+        return duration
+    duration = content_size(content) / FALLBACK_BYTES_PER_SECOND
+    log.warning(f"Could not probe audio duration; estimating {duration:.0f}s from its size")
+    return duration
+
+
+async def transcribe_admitted(
+    service: BaseSpeechService, content: AudioSource, file_ext: str, **kwargs: Any
+) -> AudioTranscriptionResult:
+    """
+    Transcribe once the request is admitted against the compute budget
+
+    A transcript already in the cache is returned straight away: it costs
+    no inference, so it is neither probed nor held against the budget.
+
+    Raises:
+        AudioTooLongError: If the audio is too long for interactive transcription
+        AdmissionRejectedError: If the server is at capacity
+    """
+    if not settings.ADMISSION_ENABLED:
+        return await service.transcribe(content, file_ext, **kwargs)
+
+    cached = await service.cached(content, vad=kwargs.get("vad"))
+    if isinstance(cached, AudioTranscriptionResult):
+        progress = kwargs.get("progress")
+        if progress is not None:
+            progress(cached.duration, cached.duration)
+        return cached
+
+    with stage_latency.time(stage="duration_probe"):
+        duration = await asyncio.to_thread(estimate_duration, content)
+    async with admission_controller.admit(model_key(service), duration):
+        return await service.transcribe(content, file_ext, **kwargs)
+
+
+async def transcribe_reserved(
+    service: BaseSpeechService, content: AudioSource, file_ext: str, **kwargs: Any
+) -> AudioTranscriptionResult:
+    """Transcribe background work once it holds its share of the compute budget"""
+    if not settings.ADMISSION_ENABLED:
+        return await service.transcribe(content, file_ext, **kwargs)
+
+    duration = await asyncio.to_thread(estimate_duration, content)
+    async with admission_controller.reserve(model_key(service), duration):
+        return await service.transcribe(content, file_ext, **kwargs)
+
+
+# Compute budget for interactive and background transcription in this process
+admission_controller = AdmissionController()
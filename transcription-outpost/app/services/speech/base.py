@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, Callable, List, Optional
 from pathlib import Path
 from pydantic import BaseModel
 
+from ...core.audio import AudioSource
 from ...core.models import TranscriptionRequest
 
+# Called with (audio seconds processed, total audio seconds); may run on a worker thread
+ProgressCallback = Callable[[float, float], None]
+
+# Called with segments, in order, as soon as they are final; may run on a worker thread
+SegmentCallback = Callable[[List[dict]], None]
+
 
 class AudioTranscriptionResult(BaseModel):
     """Model for transcription results"""
@@ -13,30 +20,62 @@ class AudioTranscriptionResult(BaseModel):
     duration: Optional[float] = None
     language: Optional[str] = None
     model: str
+    is_final: bool = True  # False for interim results while streaming
+    segments: Optional[List[dict]] = None  # Time-aligned segments on the original timeline
+    silence_removed: float = 0.0  # Audio-seconds skipped by voice activity detection
 
 
 class BaseSpeechService(ABC):
     """Base class for speech-to-text services"""
 
+    retired = False  # Set once the factory has evicted the service
+
     @abstractmethod
     async def initialize(self) -> None:
         """Initialize the speech service and load models"""
         pass
 
+    async def warm_up(self) -> None:
+        """Run a throwaway inference so the first real request is not slowed by lazy setup"""
+        pass
+
     @abstractmethod
-    async def transcribe(self, content: bytes, file_ext: str) -> AudioTranscriptionResult:
+    async def transcribe(
+        self,
+        content: AudioSource,
+        file_ext: str,
+        vad: Optional[bool] = None,
+        progress: Optional[ProgressCallback] = None,
+        on_segments: Optional[SegmentCallback] = None,
+    ) -> AudioTranscriptionResult:
         """
         Transcribe audio content
         
         Args:
-            content: Raw audio bytes
+            content: Raw audio bytes, or a binary file of them (e.g. a spooled upload)
             file_ext: Audio file extension (e.g. 'wav', 'mp3')
+            vad: Strip non-speech before decoding; None uses settings.VAD_ENABLED
+            progress: Optional callback reporting audio seconds processed
+            on_segments: Optional callback receiving segments before the whole
+                file is done; providers may deliver none early
             
         Returns:
             AudioTranscriptionResult containing transcription and metadata
         """
         pass
 
+    async def cached(
+        self, content: AudioSource, vad: Optional[bool] = None
+    ) -> Optional[AudioTranscriptionResult]:
+        """
+        Transcript of an identical earlier upload, without decoding or inference
+
+        Lets callers skip work they would do before ``transcribe`` (duration
+        probing, admission) when the answer is already known. Providers
+        without a result cache return None.
+        """
+        return None
+
     @abstractmethod
     async def transcribe_stream(
         self, audio_stream: AsyncIterator[bytes], request: TranscriptionRequest
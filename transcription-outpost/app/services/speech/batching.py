@@ -0,0 +1,139 @@
+import asyncio
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from ...core.config import settings
+from ...core.logger import log
+from .executor import InferenceExecutor, InferenceQueueFullError, inference_executor
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batcher for concurrent inference requests
+
+    Requests are queued and grouped into batches: a batch starts with the
+    first waiting request and keeps collecting for up to ``window_ms`` or
+    until ``max_batch_size`` requests have arrived, whichever comes first.
+    While every inference worker is busy, new requests keep accumulating so
+    the next batch is as large as possible. The batch function receives the
+    list of inputs and must return one result per input, in order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[np.ndarray]], List[Any]],
+        window_ms: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        executor: Optional[InferenceExecutor] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.window_ms = settings.BATCH_WINDOW_MS if window_ms is None else window_ms
+        self.max_batch_size = max_batch_size or settings.BATCH_MAX_SIZE
+        self.executor = executor or inference_executor
+        # Bound waiting requests the same way the executor bounds waiting batches
+        self.max_pending = self.max_batch_size * (
+            self.executor.max_workers + self.executor.max_queue
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatches: set = set()
+        self.batches_run = 0
+        self.items_run = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def average_batch_size(self) -> float:
+        """Mean number of requests per executed batch"""
+        return self.items_run / self.batches_run if self.batches_run else 0.0
+
+    async def submit(self, item: np.ndarray) -> Any:
+        """
+        Queue one input and wait for its share of a batched result
+
+        Raises:
+            InferenceQueueFullError: If too many requests are already waiting
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise InferenceQueueFullError(settings.INFERENCE_RETRY_AFTER)
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Start (or restart, after an event loop change) the collector task"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._slots = asyncio.Semaphore(self.executor.max_workers)
+        self._worker = loop.create_task(self._collect())
+
+    async def _collect(self) -> None:
+        """Form batches from the queue for as long as the loop runs"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window_ms / 1000
+
+            # Wait for a free worker first; requests arriving meanwhile join this batch
+            await self._slots.acquire()
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = self._loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        """Run one batch on the inference executor and fan results back out"""
+        try:
+            results = await self.executor.run(self.batch_fn, [item for item, _ in batch])
+        except Exception as e:
+            log.error(f"Batched inference of {len(batch)} request(s) failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches_run += 1
+        self.items_run += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Stop the collector task"""
+        worker, self._worker = self._worker, None
+        if worker is None or worker.done() or self._loop.is_closed():
+            return
+        worker.cancel()
+        if self._loop is asyncio.get_running_loop():
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+
+from fastapi import UploadFile
+
+from ...core.audio import AudioSource
+from ...core.config import settings
+from ...core.logger import log
+from ...core.metrics import registry
+from .admission import transcribe_admitted
+from .base import BaseSpeechService
+from .executor import InferenceQueueFullError
+
+batch_items = registry.counter(
+    "batch_items_total", "Clips processed by the batch endpoint", ["status"]
+)
+
+# Longest pause between retries of a clip rejected by a full inference queue
+MAX_RETRY_DELAY = 1.0
+
+
+class BatchInputError(ValueError):
+    """A batch request that cannot be read at all (bad manifest, corrupt archive)"""
+
+
+class BatchItem:
+    """
+    One clip of a batch request
+
+    ``open`` returns the audio when the clip is scheduled, so archive
+    members and local files are not all read up front.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        open: Callable[[], AudioSource],
+        size: Optional[int] = None,
+        closes: bool = False,
+    ):
+        self.name = name
+        self.ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+        self.open = open
+        self.size = size
+        self.closes = closes  # Whether the opened file is ours to close
+
+
+async def detach_uploads(files: List[UploadFile]) -> List[UploadFile]:
+    """
+    Copies of a request's uploads that outlive the request handler
+
+    FastAPI closes the request's own UploadFiles once the endpoint returns,
+    which for a streamed response is before most clips have been read. The
+    copies are spooled like the uploads and are the caller's to close.
+    """
+    return [await asyncio.to_thread(_copy_upload, upload) for upload in files]
+
+
+def close_uploads(files: List[UploadFile]) -> None:
+    """Close copies made by ``detach_uploads``"""
+    for upload in files:
+        upload.file.close()
+
+
+def _copy_upload(upload: UploadFile) -> UploadFile:
+    copy = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MB * 1024 * 1024)
+    upload.file.seek(0)
+    shutil.copyfileobj(upload.file, copy)
+    copy.seek(0)
+    return UploadFile(copy, size=upload.size, filename=upload.filename, headers=upload.headers)
+
+
+def items_from_uploads(files: List[UploadFile]) -> Iterator[BatchItem]:
+    """Clips from a multipart file list; zip archives are expanded in place"""
+    for upload in files:
+        name = upload.filename or ""
+        if name.lower().endswith(".zip"):
+            yield from items_from_zip(upload.file, name)
+        else:
+            yield BatchItem(name, _rewound(upload.file), upload.size)
+
+
+def items_from_zip(archive: BinaryIO, name: str = "archive.zip") -> Iterator[BatchItem]:
+    """Clips from a zip archive, extracted one at a time as they are scheduled"""
+    try:
+        bundle = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile as e:
+        raise BatchInputError(f"{name}: {str(e)}")
+    for info in bundle.infolist():
+        if info.is_dir() or os.path.basename(info.filename).startswith("."):
+            continue  # Folders and macOS resource forks
+        yield BatchItem(info.filename, _member(bundle, info), info.file_size)
+
+
+def items_from_manifest(manifest: str) -> Iterator[BatchItem]:
+    """
+    Clips from a manifest of server-local paths
+
+    The manifest is a JSON array of paths or one path per line. Paths are
+    resolved against BATCH_LOCAL_ROOT and must stay inside it; manifests
+    are refused when it is not set.
+    """
+    if not settings.BATCH_LOCAL_ROOT:
+        raise BatchInputError("Manifests of local paths are disabled on this server")
+    root = os.path.realpath(settings.BATCH_LOCAL_ROOT)
+    text = manifest.strip()
+    try:
+        paths = json.loads(text) if text.startswith("[") else text.splitlines()
+    except json.JSONDecodeError as e:
+        raise BatchInputError(f"Invalid manifest: {str(e)}")
+    for entry in paths:
+        entry = str(entry).strip()
+        if not entry:
+            continue
+        path = os.path.realpath(os.path.join(root, entry))
+        if os.path.commonpath([root, path]) != root:
+            raise BatchInputError(f"Path outside BATCH_LOCAL_ROOT: {entry}")
+        yield BatchItem(entry, _local_file(path), _file_size(path), closes=True)
+
+
+def _rewound(file: BinaryIO) -> Callable[[], AudioSource]:
+    def open_file() -> AudioSource:
+        file.seek(0)
+        return file
+    return open_file
+
+
+def _member(bundle: zipfile.ZipFile, info: zipfile.ZipInfo) -> Callable[[], AudioSource]:
+    def read() -> AudioSource:
+        return bundle.read(info)  # Clips are small; the archive itself stays spooled
+    return read
+
+
+def _file_size(path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None  # Reported when the clip is opened
+
+
+def _local_file(path: str) -> Callable[[], AudioSource]:
+    def open_file() -> AudioSource:
+        return open(path, "rb")  # ffmpeg reads it through its descriptor
+    return open_file
+
+
+async def transcribe_batch(
+    service: BaseSpeechService,
+    items: Iterable[BatchItem],
+    vad: Optional[bool] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Transcribe many clips, yielding each outcome as soon as it is ready
+
+    Up to BATCH_CONCURRENCY clips are in flight at once, enough to fill the
+    micro-batcher for every inference worker, so short clips share forward
+    passes. A clip turned away by a full inference queue is retried for up
+    to BATCH_RETRY_SECONDS rather than failed straight away. Yields ``result`` or ``error`` records in completion
+    order, each with the clip's position in the request, then one
+    ``summary``.
+    """
+    concurrency = concurrency or settings.BATCH_CONCURRENCY
+    queue: asyncio.Queue = asyncio.Queue()
+    pending = enumerate(items)
+    started = time.perf_counter()
+    counts = {"result": 0, "error": 0}
+
+    async def worker() -> None:
+        try:
+            for index, item in pending:  # Shared iterator: each clip goes to one worker
+                await queue.put(await _transcribe_item(service, index, item, vad))
+        finally:
+            queue.put_nowait(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < len(workers):
+            record = await queue.get()
+            if record is None:
+                finished += 1
+                continue
+            counts[record["type"]] += 1
+            yield record
+    finally:
+        for task in workers:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "count": counts["result"] + counts["error"],
+        "failed": counts["error"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _transcribe_item(
+    service: BaseSpeechService, index: int, item: BatchItem, vad: Optional[bool]
+) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"index": index, "name": item.name}
+    if item.ext not in settings.SUPPORTED_AUDIO_FORMATS:
+        return _error(record, f"Unsupported audio format: {item.ext or 'none'}")
+    if item.size and item.size > settings.MAX_AUDIO_SIZE_MB * 1024 * 1024:
+        return _error(record, f"File size exceeds maximum of {settings.MAX_AUDIO_SIZE_MB}MB")
+
+    source = None
+    delay = 0.05
+    deadline = time.monotonic() + settings.BATCH_RETRY_SECONDS
+    try:
+        source = await asyncio.to_thread(item.open)
+        while True:
+            try:
+                result = await transcribe_admitted(service, source, item.ext, vad=vad)
+                break
+            except InferenceQueueFullError:
+                # Interactive traffic has the queue or the compute budget; back off
+                # instead of failing the clip, but not forever
+                if time.monotonic() + delay > deadline:
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        batch_items.inc(status="result")
+        return {"type": "result", **record, "result": result.model_dump()}
+    except Exception as e:
+        log.error(f"Batch item {item.name} failed: {str(e)}")
+        return _error(record, str(e))
+    finally:
+        if item.closes and source is not None:
+            source.close()
+
+
+def _error(record: Dict[str, Any], message: str) -> Dict[str, Any]:
+    batch_items.inc(status="error")
+    return {"type": "error", **record, "error": message}
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ...core.config import settings
+from ...core.logger import log
+from ...core.metrics import registry
+
+
+class InferenceQueueFullError(RuntimeError):
+    """Raised when the inference executor cannot accept more work"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full, please retry later")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for blocking model inference
+
+    PyTorch releases the GIL inside its kernels, so running inference on
+    worker threads keeps the event loop free to serve other requests. At most
+    ``max_workers`` jobs run at once and at most ``max_queue`` wait for a
+    worker; anything beyond that is rejected with InferenceQueueFullError
+    instead of piling up coroutines.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or settings.INFERENCE_WORKERS
+        self.max_queue = settings.INFERENCE_QUEUE_SIZE if max_queue is None else max_queue
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0  # Submitted and not yet finished (queued + running)
+        self._busy = 0  # Currently running on a worker thread
+
+    @property
+    def busy_workers(self) -> int:
+        """Number of workers currently running inference"""
+        return self._busy
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return self._pending - self._busy
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of executor utilisation"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "busy_workers": self._busy,
+                "queue_depth": self._pending - self._busy,
+                "queue_capacity": self.max_queue,
+            }
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the inference pool
+
+        Raises:
+            InferenceQueueFullError: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise InferenceQueueFullError(settings.INFERENCE_RETRY_AFTER)
+            self._pending += 1
+
+        try:
+            future = self._get_pool().submit(self._call, func, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        # Release the slot when the work really finishes (or is cancelled before
+        # starting), not when the awaiting coroutine goes away
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._busy += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    def _release(self, _: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            log.info(
+                f"Starting inference executor with {self.max_workers} worker(s), "
+                f"queue capacity {self.max_queue}"
+            )
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once running jobs complete"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+# Shared executor for all speech services in this process
+inference_executor = InferenceExecutor()
+
+registry.gauge(
+    "inference_busy_workers", "Inference workers currently running a job"
+).set_function(lambda: inference_executor.busy_workers)
+registry.gauge(
+    "inference_queue_depth", "Inference jobs waiting for a free worker"
+).set_function(lambda: inference_executor.queue_depth)
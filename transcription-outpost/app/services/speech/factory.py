@@ -1,8 +1,15 @@
+import asyncio
+from collections import OrderedDict
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
+import torch
+
+from ...core.config import settings
 from ...core.logger import log
+from ...core.metrics import registry
 from .base import BaseSpeechService
+from .providers.remote import RemoteWhisperService
 from .providers.whisper import WhisperService
 
 
@@ -12,50 +19,188 @@ class SpeechServiceType(str, Enum):
     # Add more service types here as we implement them
 
 
+# (provider, model size, precision)
+ServiceKey = Tuple[SpeechServiceType, str, str]
+
+
+def _model_bytes(service: BaseSpeechService) -> int:
+    """Resident size of a service's model weights and buffers, long-form copies included"""
+    model = getattr(service, "model", None)
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    size = sum(t.numel() * t.element_size() for t in tensors)
+    # Each long-form worker process loads its own copy of the model
+    longform = getattr(service, "longform", None)
+    copies = 1 + (longform.workers if longform is not None else 0)
+    return size * copies
+
+
 class SpeechServiceFactory:
-    """Factory for creating and managing speech services"""
-    
-    _instance: Optional[BaseSpeechService] = None
-    
+    """
+    Factory for creating and managing speech services
+
+    Services are kept in a registry keyed by (provider, model size,
+    precision) and loaded on first request, so several models can be
+    resident at once. Once their combined weights, including the copies
+    held by long-form worker processes, exceed MODEL_MEMORY_BUDGET_MB the
+    least recently used models are evicted; an evicted model finishes its
+    in-flight requests before it is released and its workers are stopped.
+    """
+
+    _instances: "OrderedDict[ServiceKey, BaseSpeechService]" = OrderedDict()
+    _sizes: Dict[ServiceKey, int] = {}
+    _locks: Dict[ServiceKey, asyncio.Lock] = {}
+    _retiring: set = set()
+    loads = 0
+    evictions = 0
+
     @classmethod
     async def get_service(
-        cls, service_type: SpeechServiceType = SpeechServiceType.WHISPER
+        cls,
+        service_type: SpeechServiceType = SpeechServiceType.WHISPER,
+        model_name: Optional[str] = None,
+        precision: Optional[str] = None,
     ) -> BaseSpeechService:
         """
         Get or create a speech service instance
-        
+
         Args:
             service_type: Type of speech service to create
-            
+            model_name: Model size, e.g. 'tiny' or 'small'; defaults to WHISPER_DEFAULT_MODEL
+            precision: 'fp32' or 'fp16'; defaults to WHISPER_PRECISION
+
         Returns:
             Speech service instance
         """
-        if cls._instance is None:
-            cls._instance = cls._create_service(service_type)
-            await cls._instance.initialize()
-            
-        return cls._instance
-    
+        key = cls._key(service_type, model_name, precision)
+        service = cls._instances.get(key)
+        if service is not None:
+            cls._instances.move_to_end(key)
+            return service
+
+        # One load per key even when several requests ask for it at once
+        lock = cls._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            service = cls._instances.get(key)
+            if service is None:
+                service = cls._create_service(*key)
+                await service.initialize()
+                # Register only once loaded, so a failed load can be retried
+                cls._instances[key] = service
+                cls._sizes[key] = _model_bytes(service)
+                cls.loads += 1
+                cls._enforce_budget(keep=key)
+            cls._instances.move_to_end(key)
+        return service
+
     @classmethod
-    def _create_service(cls, service_type: SpeechServiceType) -> BaseSpeechService:
+    def _key(
+        cls, service_type: SpeechServiceType, model_name: Optional[str], precision: Optional[str]
+    ) -> ServiceKey:
+        """Validate a request and normalise it to a registry key"""
+        service_type = SpeechServiceType(service_type)  # ValueError for unknown providers
+        model_name = model_name or settings.WHISPER_DEFAULT_MODEL
+        precision = precision or settings.WHISPER_PRECISION
+        if model_name not in settings.WHISPER_MODELS:
+            raise ValueError(
+                f"Unknown model size: {model_name}. Available: {settings.WHISPER_MODELS}"
+            )
+        if precision not in ("fp32", "fp16"):
+            raise ValueError(f"Unknown precision: {precision}")
+        return service_type, model_name, precision
+
+    @classmethod
+    def _create_service(
+        cls,
+        service_type: SpeechServiceType,
+        model_name: Optional[str] = None,
+        precision: Optional[str] = None,
+    ) -> BaseSpeechService:
         """Create a new speech service instance"""
+        if service_type == SpeechServiceType.WHISPER and settings.INFERENCE_REMOTE:
+            # The inference server holds the weights for every HTTP worker
+            log.info(f"Creating remote Whisper service: {model_name} ({precision})")
+            return RemoteWhisperService(model_name=model_name, precision=precision)
         if service_type == SpeechServiceType.WHISPER:
-            log.info("Creating Whisper service")
-            return WhisperService()
+            log.info(f"Creating Whisper service: {model_name} ({precision})")
+            return WhisperService(model_name=model_name, precision=precision)
         else:
             raise ValueError(f"Unknown speech service type: {service_type}")
-    
+
+    @classmethod
+    def resize(cls, service: BaseSpeechService) -> None:
+        """Re-measure a resident service, e.g. once it has started long-form workers"""
+        for key, resident in cls._instances.items():
+            if resident is service:
+                cls._sizes[key] = _model_bytes(service)
+                cls._enforce_budget(keep=key)
+                return
+
+    @classmethod
+    def _enforce_budget(cls, keep: ServiceKey) -> None:
+        """Evict least recently used models until the rest fit the memory budget"""
+        budget = settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        for key in list(cls._instances):
+            if sum(cls._sizes.values()) <= budget:
+                break
+            if key == keep:
+                continue  # Always keep the model that was just asked for
+            service = cls._instances.pop(key)
+            service.retired = True  # Callers still holding it are sent to the registry
+            size = cls._sizes.pop(key, 0)
+            cls.evictions += 1
+            log.info(f"Evicting {key[0].value}-{key[1]} ({key[2]}), {size / 2**20:.0f} MB")
+            task = asyncio.create_task(cls._retire(service))
+            cls._retiring.add(task)
+            task.add_done_callback(cls._retiring.discard)
+
+    @staticmethod
+    async def _retire(service: BaseSpeechService) -> None:
+        """Release an evicted service once its in-flight requests are done"""
+        while getattr(service, "active_requests", 0) > 0:
+            await asyncio.sleep(0.1)
+        await service.cleanup()
+        service.model = None  # Drop the weights
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Resident models, memory use and load/eviction counters"""
+        return {
+            "resident": [
+                {
+                    "model": f"{key[0].value}-{key[1]}",
+                    "precision": key[2],
+                    "memory_mb": round(cls._sizes.get(key, 0) / 2**20, 1),
+                }
+                for key in reversed(cls._instances)  # Most recently used first
+            ],
+            "memory_mb": round(sum(cls._sizes.values()) / 2**20, 1),
+            "budget_mb": settings.MODEL_MEMORY_BUDGET_MB,
+            "loads": cls.loads,
+            "evictions": cls.evictions,
+        }
+
     @classmethod
     async def cleanup(cls) -> None:
-        """Cleanup the current speech service instance"""
-        if cls._instance:
-            await cls._instance.cleanup()
-            cls._instance = None
+        """Cleanup every resident speech service"""
+        instances = list(cls._instances.values())
+        cls._instances.clear()
+        cls._sizes.clear()
+        for service in instances:
+            await service.cleanup()
+
+
+registry.gauge(
+    "model_memory_megabytes", "Weights of all resident speech models"
+).set_function(lambda: sum(SpeechServiceFactory._sizes.values()) / 2**20)
 
 
 # Expose factory method at module level
 async def get_transcription_service(
-    service_type: SpeechServiceType = SpeechServiceType.WHISPER
+    service_type: SpeechServiceType = SpeechServiceType.WHISPER,
+    model_name: Optional[str] = None,
+    precision: Optional[str] = None,
 ) -> BaseSpeechService:
     """Get a transcription service instance"""
-    return await SpeechServiceFactory.get_service(service_type) 
\ No newline at end of file
+    return await SpeechServiceFactory.get_service(service_type, model_name, precision)
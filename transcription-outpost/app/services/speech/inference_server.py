@@ -0,0 +1,173 @@
+import asyncio
+import os
+import signal
+from typing import Any, Dict, List, Optional
+
+from ...core.config import settings
+from ...core.logger import log
+from ...core.metrics import registry
+from .admission import admission_controller
+from .executor import InferenceQueueFullError, inference_executor
+from .factory import SpeechServiceFactory, SpeechServiceType, get_transcription_service
+from .ipc import decode_waveform, encode_header, error_frame, read_frame, write_frame
+from .warmup import model_warmup
+
+remote_requests = registry.counter(
+    "inference_server_requests_total", "Inference requests served over the socket", ["status"]
+)
+
+
+class InferenceServer:
+    """
+    Runs Whisper for every HTTP worker of a host
+
+    Listens on a Unix socket for decoded waveforms from HTTP workers
+    running with INFERENCE_REMOTE, and runs them through the usual
+    ``WhisperService._infer`` path: micro-batching, long-form splitting and
+    the bounded inference pool. Models are loaded once, here, however many
+    HTTP workers there are, and short clips from all of them share forward
+    passes.
+
+    Each connection carries one request. Progress and finished segments
+    are streamed back as they happen, followed by one result or error
+    frame.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or settings.INFERENCE_SERVER_SOCKET
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.served = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        """Listen on the socket, replacing one left behind by a previous run"""
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)  # Only the service's own user may connect
+        log.info(f"Inference server listening on {self.socket_path}")
+
+    async def stop(self) -> None:
+        """Stop accepting connections and remove the socket"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests served, failures and the models this process holds"""
+        return {
+            "socket": self.socket_path,
+            "served": self.served,
+            "failed": self.failed,
+            "models": SpeechServiceFactory.stats(),
+            "inference": inference_executor.stats(),
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            header, payload = await read_frame(reader)
+            if header.get("op") == "ping":
+                await write_frame(writer, {"type": "pong", "pid": os.getpid()})
+            elif header.get("op") == "infer":
+                await self._infer(header, payload, writer)
+            else:
+                await write_frame(writer, error_frame(ValueError(f"Unknown op: {header.get('op')}")))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # The HTTP worker went away
+        except Exception as e:
+            log.error(f"Inference server request failed: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _infer(
+        self, header: Dict[str, Any], payload: bytes, writer: asyncio.StreamWriter
+    ) -> None:
+        """Run one waveform and stream its progress, segments and result back"""
+        loop = asyncio.get_running_loop()
+
+        def send(frame: Dict[str, Any]) -> None:
+            data = encode_header(frame)
+            if _running_loop() is loop:
+                writer.write(data)
+            else:
+                # From an inference thread: written on the loop in call order, and
+                # before the result, whose completion is scheduled after them
+                loop.call_soon_threadsafe(writer.write, data)
+
+        def progress(seconds: float) -> None:
+            send({"type": "progress", "seconds": seconds})
+
+        def on_segments(segments: List[dict]) -> None:
+            send({"type": "segments", "segments": segments})
+
+        try:
+            service = await get_transcription_service(
+                SpeechServiceType.WHISPER, header.get("model"), header.get("precision")
+            )
+            service.active_requests += 1  # Keeps an LRU-evicted model alive until done
+            try:
+                result = await service._infer(
+                    decode_waveform(payload),
+                    header.get("language"),
+                    progress=progress if header.get("progress") else None,
+                    on_segments=on_segments if header.get("segments") else None,
+                )
+            finally:
+                service.active_requests -= 1
+        except InferenceQueueFullError as e:
+            remote_requests.inc(status="rejected")
+            await write_frame(writer, error_frame(e, e.retry_after))
+            return
+        except Exception as e:
+            self.failed += 1
+            remote_requests.inc(status="failed")
+            log.error(f"Remote inference failed: {str(e)}")
+            await write_frame(writer, error_frame(e))
+            return
+
+        self.served += 1
+        remote_requests.inc(status="served")
+        await write_frame(writer, {
+            "type": "result",
+            "result": result,
+            # HTTP workers price admission with the RTF measured here
+            "rtf": admission_controller.rtf(service.model_name),
+        })
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+async def serve(socket_path: Optional[str] = None) -> None:
+    """Run the inference server until SIGINT or SIGTERM"""
+    # This process runs the models itself, whatever the shared environment says
+    settings.INFERENCE_REMOTE = False
+    server = InferenceServer(socket_path)
+    await server.start()
+    model_warmup.start()  # Load the default model before the first request needs it
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    await stopped.wait()
+
+    log.info("Shutting down inference server")
+    await server.stop()
+    await model_warmup.stop()
+    await SpeechServiceFactory.cleanup()
+    inference_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
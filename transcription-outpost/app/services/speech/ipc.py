@@ -0,0 +1,81 @@
+import asyncio
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Big-endian length of the JSON header that starts every frame
+HEADER_LENGTH = struct.Struct(">I")
+
+# Frames larger than this are refused; an hour of 16 kHz audio is ~115 MB as PCM
+MAX_PAYLOAD_BYTES = 1024 * 1024 * 1024
+
+
+class InferenceServerError(RuntimeError):
+    """Raised when the inference server reports a failure or the connection breaks"""
+
+
+def encode_waveform(audio: np.ndarray) -> bytes:
+    """
+    Pack a float32 waveform as 16-bit PCM for the socket
+
+    ``decode_audio`` produces samples from 16-bit PCM, so this is exact
+    for decoded audio and halves what crosses the socket.
+    """
+    return np.clip(np.rint(audio * 32768.0), -32768, 32767).astype("<i2").tobytes()
+
+
+def decode_waveform(data: bytes) -> np.ndarray:
+    """Inverse of ``encode_waveform``"""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def encode_header(header: Dict[str, Any], payload_size: int = 0) -> bytes:
+    """Header length and JSON header of a frame, which the payload follows"""
+    encoded = json.dumps({**header, "size": payload_size}, default=_jsonable).encode()
+    return HEADER_LENGTH.pack(len(encoded)) + encoded
+
+
+async def write_frame(
+    writer: asyncio.StreamWriter, header: Dict[str, Any], payload: bytes = b""
+) -> None:
+    """Send one frame: header length, JSON header (with the payload size), payload"""
+    writer.write(encode_header(header, len(payload)))
+    if payload:
+        writer.write(payload)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Receive one frame
+
+    Raises:
+        asyncio.IncompleteReadError: If the peer closed the connection
+        InferenceServerError: If the frame is malformed or too large
+    """
+    (length,) = HEADER_LENGTH.unpack(await reader.readexactly(HEADER_LENGTH.size))
+    try:
+        header = json.loads(await reader.readexactly(length))
+    except ValueError as e:
+        raise InferenceServerError(f"Malformed frame header: {str(e)}")
+    size = header.pop("size", 0)
+    if size > MAX_PAYLOAD_BYTES:
+        raise InferenceServerError(f"Frame payload of {size} bytes is too large")
+    payload = await reader.readexactly(size) if size else b""
+    return header, payload
+
+
+def _jsonable(value: Any) -> Any:
+    """NumPy scalars and arrays that end up in Whisper results"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def error_frame(error: BaseException, retry_after: Optional[int] = None) -> Dict[str, Any]:
+    """The frame a server sends in place of a result"""
+    return {"type": "error", "error": str(error), "kind": type(error).__name__, "retry_after": retry_after}
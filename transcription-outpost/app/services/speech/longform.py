@@ -0,0 +1,186 @@
+import multiprocessing as mp
+import os
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from ...core.audio import find_quiet_point
+from ...core.config import settings
+from ...core.logger import log
+
+# Whisper model owned by a pool worker process, loaded once by _init_worker
+_model: Any = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """Load the model in a pool process and pin its intra-op thread count"""
+    global _model
+    import torch
+    import whisper
+
+    # Without this every worker would start one thread per core and thrash
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(audio: np.ndarray, language: Optional[str], fp16: bool = False) -> dict:
+    """Transcribe one chunk inside a pool worker"""
+    return _model.transcribe(audio, language=language, fp16=fp16)
+
+
+def split_at_silence(
+    audio: np.ndarray, chunk_samples: int, search_samples: int
+) -> List[Tuple[int, int]]:
+    """
+    Split audio into chunks of at most ``chunk_samples``
+
+    Each cut is placed at the quietest point in the last ``search_samples``
+    before the chunk limit, so words are not split across chunks.
+    """
+    chunks = []
+    start = 0
+    while len(audio) - start > chunk_samples:
+        limit = start + chunk_samples
+        cut = find_quiet_point(audio, limit - search_samples, limit)
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, len(audio)))
+    return chunks
+
+
+def offset_segments(segments: List[dict], offset: float) -> List[dict]:
+    """Copies of a chunk's segments shifted onto the full timeline"""
+    return [
+        {**segment, "start": segment["start"] + offset, "end": segment["end"] + offset}
+        for segment in segments
+    ]
+
+
+def stitch_results(results: List[dict], chunks: List[Tuple[int, int]], sample_rate: int) -> dict:
+    """
+    Merge per-chunk Whisper results into one result on the full timeline
+
+    Segment times are shifted by their chunk's offset. Confidence is the
+    per-chunk confidence (1 - mean no-speech probability) weighted by chunk
+    duration, and the language is the one covering the most audio.
+    """
+    segments = []
+    texts = []
+    languages: Counter = Counter()
+    weighted_confidence = 0.0
+    for result, (start, end) in zip(results, chunks):
+        duration = (end - start) / sample_rate
+        chunk_segments = result.get("segments", [])
+        segments.extend(offset_segments(chunk_segments, start / sample_rate))
+        if chunk_segments:
+            no_speech = [seg.get("no_speech_prob", 0.0) for seg in chunk_segments]
+            weighted_confidence += (1.0 - sum(no_speech) / len(no_speech)) * duration
+        if result["text"].strip():
+            texts.append(result["text"].strip())
+        if result.get("language"):
+            languages[result["language"]] += duration
+
+    total = chunks[-1][1] / sample_rate if chunks else 0.0
+    return {
+        "text": " ".join(texts),
+        "segments": segments,
+        "language": languages.most_common(1)[0][0] if languages else None,
+        "confidence": weighted_confidence / total if total else 0.0,
+    }
+
+
+class LongformTranscriber:
+    """
+    Parallel transcription of long recordings across a process pool
+
+    Audio is cut at low-energy points into chunks of LONGFORM_CHUNK_SECONDS
+    and the chunks are transcribed concurrently, one Whisper model per
+    worker process, then stitched back together. Each worker gets an equal
+    share of the CPU cores for PyTorch's intra-op threads. Every worker
+    holds a full model copy, so the pool is small (LONGFORM_WORKERS) and
+    its copies are charged to the model memory budget by the factory.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        fp16: bool = False,
+    ):
+        self.model_name = model_name
+        self.fp16 = fp16
+        self.workers = workers or settings.LONGFORM_WORKERS or 1
+        self.chunk_samples = settings.LONGFORM_CHUNK_SECONDS * settings.SAMPLE_RATE
+        self.search_samples = settings.LONGFORM_SEARCH_SECONDS * settings.SAMPLE_RATE
+        self._executor = executor
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            log.info(
+                f"Starting long-form pool: {self.workers} process(es) x {threads} thread(s), "
+                f"whisper-{self.model_name}"
+            )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # Fork would copy the parent's torch thread pools and locks
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, threads),
+            )
+        return self._executor
+
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        progress: Optional[Callable[[float], None]] = None,
+        on_segments: Optional[Callable[[List[dict]], None]] = None,
+    ) -> dict:
+        """
+        Transcribe a long waveform; blocks until every chunk is done
+
+        Args:
+            progress: Called with the audio seconds transcribed so far as chunks finish
+            on_segments: Called with each chunk's segments, on the full timeline
+                and in order, once it and every earlier chunk have finished
+
+        Returns:
+            A ``model.transcribe``-shaped dict plus a ``confidence`` key
+        """
+        chunks = split_at_silence(audio, self.chunk_samples, self.search_samples)
+        executor = self._get_executor()
+        futures = {
+            executor.submit(_transcribe_chunk, audio[start:end], language, self.fp16): index
+            for index, (start, end) in enumerate(chunks)
+        }
+        results: List[Optional[dict]] = [None] * len(chunks)
+        done_samples = 0
+        next_index = 0  # First chunk whose segments have not been handed out
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                start, end = chunks[index]
+                done_samples += end - start
+                if progress is not None:
+                    progress(done_samples / settings.SAMPLE_RATE)
+                while on_segments is not None and next_index < len(chunks) and results[next_index] is not None:
+                    offset = chunks[next_index][0] / settings.SAMPLE_RATE
+                    on_segments(offset_segments(results[next_index].get("segments", []), offset))
+                    next_index += 1
+        except BaseException:
+            # The result is lost; do not spend the workers on the rest of it
+            for future in futures:
+                future.cancel()
+            raise
+        return stitch_results(results, chunks, settings.SAMPLE_RATE)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
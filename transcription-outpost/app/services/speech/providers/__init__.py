@@ -1,6 +1,7 @@
 """Speech-to-text service providers"""
 
 from .whisper import WhisperService
+from .remote import RemoteWhisperService
 # from .paddle import PaddleSpeechService  # Disabled until paddlespeech is installed
 
-__all__ = ["WhisperService"] 
\ No newline at end of file
+__all__ = ["WhisperService", "RemoteWhisperService"] 
\ No newline at end of file
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ....core.config import settings
+from ....core.logger import log
+from ..admission import admission_controller
+from ..executor import InferenceQueueFullError
+from ..ipc import InferenceServerError, encode_waveform, read_frame, write_frame
+from .whisper import WhisperService
+
+# Pause between attempts to reach an inference server that is still starting
+CONNECT_RETRY_DELAY = 0.5
+
+
+class RemoteWhisperService(WhisperService):
+    """
+    Whisper run by the shared inference server
+
+    Used by HTTP workers when INFERENCE_REMOTE is set. Decoding, VAD,
+    caching and request coalescing happen here as usual; only the decoded
+    waveform crosses the Unix socket to the inference server, which owns
+    the model. No weights are loaded in this process, so adding HTTP
+    workers does not add model memory, and batching spans all workers.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        precision: Optional[str] = None,
+        socket_path: Optional[str] = None,
+    ):
+        super().__init__(model_name, precision)
+        self.batcher = None  # The server batches, across every HTTP worker
+        self.socket_path = socket_path or settings.INFERENCE_SERVER_SOCKET
+        self.connected = False
+
+    async def initialize(self) -> None:
+        """Wait until the inference server accepts connections"""
+        if self.connected:
+            return
+        deadline = time.monotonic() + settings.INFERENCE_SERVER_CONNECT_TIMEOUT
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            except (FileNotFoundError, ConnectionError) as e:
+                if time.monotonic() >= deadline:
+                    raise InferenceServerError(
+                        f"Inference server not reachable at {self.socket_path}: {str(e)}"
+                    )
+                await asyncio.sleep(CONNECT_RETRY_DELAY)
+                continue
+            try:
+                await write_frame(writer, {"op": "ping"})
+                header, _ = await read_frame(reader)
+            finally:
+                writer.close()
+            log.info(f"Using inference server at {self.socket_path} (pid {header.get('pid')})")
+            self.connected = True
+            return
+
+    async def _infer(
+        self,
+        audio: np.ndarray,
+        language: Optional[str],
+        progress: Optional[Callable[[float], None]] = None,
+        on_segments: Optional[Callable[[List[dict]], None]] = None,
+    ) -> dict:
+        """Send a decoded waveform to the inference server and wait for its result"""
+        request = {
+            "op": "infer",
+            "model": self.model_name,
+            "precision": self.precision,
+            "language": language,
+            "progress": progress is not None,
+            "segments": on_segments is not None,
+        }
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        except (FileNotFoundError, ConnectionError) as e:
+            raise InferenceServerError(f"Inference server not reachable: {str(e)}")
+        try:
+            await write_frame(writer, request, encode_waveform(audio))
+            while True:
+                header, _ = await read_frame(reader)
+                kind = header.get("type")
+                if kind == "progress" and progress is not None:
+                    progress(header["seconds"])
+                elif kind == "segments" and on_segments is not None:
+                    on_segments(header["segments"])
+                elif kind == "result":
+                    self._observe(len(audio) / settings.SAMPLE_RATE, header.get("rtf"))
+                    return header["result"]
+                elif kind == "error":
+                    raise self._error(header)
+        except asyncio.IncompleteReadError:
+            raise InferenceServerError("Inference server closed the connection")
+        finally:
+            writer.close()
+
+    def _observe(self, audio_seconds: float, rtf: Optional[float]) -> None:
+        """Feed the server's real-time factor into this worker's admission control"""
+        if rtf:
+            admission_controller.observe(self.model_name, audio_seconds, audio_seconds * rtf)
+
+    @staticmethod
+    def _error(header: Dict[str, Any]) -> Exception:
+        """Rebuild the exception the server reported"""
+        if header.get("retry_after") is not None:
+            return InferenceQueueFullError(header["retry_after"])
+        if header.get("kind") == "ValueError":
+            return ValueError(header["error"])
+        return InferenceServerError(header["error"])
+
+    async def cleanup(self) -> None:
+        """Nothing is held locally; the server keeps its models"""
+        self.connected = False
@@ -1,127 +1,513 @@
-import io
-import tempfile
-from pathlib import Path
-from typing import AsyncIterator, Optional
-import whisper
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 import numpy as np
-from pydub import AudioSegment
-import pydub.utils
-import os
+import torch
+import whisper
 
+from ....core.audio import AudioSource, StreamingDecoder, configure_ffmpeg, decode_audio, find_quiet_point
+from ....core.cache import content_key, transcription_cache
 from ....core.config import settings
+from ....core.decoding import decoder_pool
 from ....core.logger import log
+from ....core.metrics import stage_latency, stage_timer, transcriptions_in_flight
 from ....core.models import TranscriptionRequest
-from ..base import BaseSpeechService, AudioTranscriptionResult
+from ....core.singleflight import transcription_flights
+from ..admission import admission_controller
+from ..base import BaseSpeechService, AudioTranscriptionResult, ProgressCallback, SegmentCallback
+from ..batching import BatchScheduler
+from ..executor import inference_executor
+from ..longform import LongformTranscriber
+from ..vad import voice_activity_detector
+
+
+# model.transcribe's defaults: clips decoded too repetitively or too unsure are
+# decoded again at the next temperature, unless they are silence
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
 
+def needs_fallback(result: "whisper.DecodingResult") -> bool:
+    """Whether model.transcribe would retry this decode at a higher temperature"""
+    unsure = result.avg_logprob < LOGPROB_THRESHOLD
+    if unsure and result.no_speech_prob > NO_SPEECH_THRESHOLD:
+        return False  # Silence
+    return unsure or result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
 
-# Configure ffmpeg path for both pydub and whisper
-ffmpeg_dir = os.path.join(
-    os.environ.get('LOCALAPPDATA', ''),
-    'Microsoft',
-    'WinGet',
-    'Packages',
-    'Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe',
-    'ffmpeg-7.1.1-full_build',
-    'bin'
-)
-ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg.exe')
 
-if os.path.exists(ffmpeg_path):
-    # Configure pydub
-    pydub.AudioSegment.converter = ffmpeg_path
-    pydub.AudioSegment.ffmpeg = ffmpeg_path
-    pydub.AudioSegment.ffprobe = ffmpeg_path.replace('ffmpeg.exe', 'ffprobe.exe')
-    
-    # Add FFmpeg to PATH so Whisper can find it
-    if ffmpeg_dir not in os.environ.get('PATH', ''):
-        os.environ['PATH'] = ffmpeg_dir + os.pathsep + os.environ.get('PATH', '')
-        
-    # Also try to configure whisper directly if possible
-    try:
-        import whisper
-        if hasattr(whisper.audio, 'SAMPLE_RATE'):
-            # Set the ffmpeg command that whisper will use
-            os.environ['FFMPEG_PATH'] = ffmpeg_path
-    except:
-        pass
+# Whisper's own loader runs ffmpeg from PATH; startup re-checks and fails loudly
+try:
+    configure_ffmpeg()
+except FileNotFoundError as e:
+    log.warning(str(e))
+
+
+class _SharedCallbacks:
+    """
+    Progress and segment callbacks of every caller sharing one transcription
+
+    Callers that join a coalesced transcription late are first brought up
+    to date: the latest progress and every segment reported so far. Long
+    recordings report from inference threads, hence the lock.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callers: List[Tuple[Optional[ProgressCallback], Optional[SegmentCallback]]] = []
+        self._progress: Optional[Tuple[float, float]] = None
+        self._segments: List[dict] = []
+    
+    def join(self, progress: Optional[ProgressCallback], on_segments: Optional[SegmentCallback]) -> None:
+        with self._lock:
+            if progress is not None and self._progress is not None:
+                progress(*self._progress)
+            if on_segments is not None and self._segments:
+                on_segments([dict(segment) for segment in self._segments])
+            self._callers.append((progress, on_segments))
+    
+    def progress(self, done: float, total: float) -> None:
+        with self._lock:
+            self._progress = (done, total)
+            for progress, _ in self._callers:
+                if progress is not None:
+                    progress(done, total)
+    
+    def on_segments(self, segments: List[dict]) -> None:
+        with self._lock:
+            self._segments.extend(segments)
+            for _, on_segments in self._callers:
+                if on_segments is not None:
+                    on_segments([dict(segment) for segment in segments])
 
 
 class WhisperService(BaseSpeechService):
     """Whisper-based speech-to-text service"""
     
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None, precision: Optional[str] = None):
         self.model = None
-        self.model_name = "base"  # Can be tiny, base, small, medium, large
+        self.model_name = model_name or settings.WHISPER_DEFAULT_MODEL  # tiny, base, small, medium, large
+        self.precision = precision or settings.WHISPER_PRECISION
+        self.fp16 = self.precision == "fp16"  # Only takes effect on CUDA
+        self.active_requests = 0  # In-flight transcriptions, so eviction can wait for them
+        self._shared_callbacks: Dict[str, _SharedCallbacks] = {}  # Coalesced key -> its callers
+        # Short clips are micro-batched into a single encoder/decoder pass
+        self.batcher: Optional[BatchScheduler] = None
+        if settings.BATCH_MAX_SIZE > 1:
+            self.batcher = BatchScheduler(self._transcribe_batch)
+        # Process pool for long recordings, started on first use
+        self.longform: Optional[LongformTranscriber] = None
         
     async def initialize(self) -> None:
         """Initialize Whisper model"""
         if self.model is None:
-            log.info(f"Loading Whisper model: {self.model_name}")
-            self.model = whisper.load_model(self.model_name)
+            log.info(f"Loading Whisper model: {self.model_name} ({self.precision})")
+            self.model = await asyncio.to_thread(whisper.load_model, self.model_name)
+            if isinstance(self.model, whisper.model.Whisper):
+                # Forward hooks split inference time into encoder and decoder work
+                stage_timer.instrument(self.model.encoder, "whisper_encode")
+                stage_timer.instrument(self.model.decoder, "whisper_decode")
             log.info("Whisper model loaded successfully")
     
-    async def transcribe(self, content: bytes, file_ext: str) -> AudioTranscriptionResult:
-        """Transcribe audio content using Whisper"""
+    async def warm_up(self) -> None:
+        """Transcribe one second of silence to prime kernels and allocators"""
         await self.initialize()
+        # Same path real short clips take, including language detection
+        await self._infer(np.zeros(settings.SAMPLE_RATE, dtype=np.float32), language=None)
+    
+    async def transcribe(
+        self,
+        content: AudioSource,
+        file_ext: str,
+        vad: Optional[bool] = None,
+        progress: Optional[ProgressCallback] = None,
+        on_segments: Optional[SegmentCallback] = None,
+    ) -> AudioTranscriptionResult:
+        """Transcribe audio content using Whisper"""
+        if self.retired:
+            # Evicted while the caller held it, e.g. waiting for admission
+            current = await self._replacement()
+            return await current.transcribe(content, file_ext, vad, progress, on_segments)
+        # Counted before the first await, so eviction cannot release the model under us
+        self.active_requests += 1
+        try:
+            await self.initialize()
+            with transcriptions_in_flight.track(), stage_latency.time(stage="transcribe"):
+                use_vad = settings.VAD_ENABLED if vad is None else vad
+                if not (settings.CACHE_ENABLED or settings.SINGLEFLIGHT_ENABLED):
+                    return await self._transcribe(content, use_vad, None, progress, on_segments)
+                
+                key = await asyncio.to_thread(self._cache_key, content, use_vad)
+                if not settings.SINGLEFLIGHT_ENABLED:
+                    return await self._transcribe(content, use_vad, key, progress, on_segments)
+                
+                # Identical uploads in flight at once (double submits, several
+                # tabs) share one decode and inference; every caller gets the callbacks
+                shared = self._shared_callbacks.get(key)
+                if shared is None:
+                    shared = self._shared_callbacks[key] = _SharedCallbacks()
+                shared.join(progress, on_segments)
+                result = await transcription_flights.do(
+                    key, lambda: self._transcribe_shared(content, use_vad, key, shared)
+                )
+                return result.model_copy(deep=True)
+        finally:
+            self.active_requests -= 1
+    
+    async def _transcribe_shared(
+        self, content: AudioSource, use_vad: bool, key: str, shared: _SharedCallbacks
+    ) -> AudioTranscriptionResult:
+        """Coalesced ``_transcribe``, reporting to every caller that joined it"""
+        try:
+            return await self._transcribe(content, use_vad, key, shared.progress, shared.on_segments)
+        finally:
+            # Later callers start a new flight, with new callbacks
+            if self._shared_callbacks.get(key) is shared:
+                del self._shared_callbacks[key]
+    
+    async def cached(
+        self, content: AudioSource, vad: Optional[bool] = None
+    ) -> Optional[AudioTranscriptionResult]:
+        """Cached transcript of an identical upload, or None"""
+        if not settings.CACHE_ENABLED:
+            return None
+        use_vad = settings.VAD_ENABLED if vad is None else vad
+        key = await asyncio.to_thread(self._cache_key, content, use_vad)
+        cached = await transcription_cache.aget(key)
+        return AudioTranscriptionResult(**cached) if cached is not None else None
+    
+    def _cache_key(self, content: AudioSource, use_vad: bool) -> str:
+        """Key of an upload's transcript under this model's settings"""
+        return content_key(
+            content,
+            model=f"whisper-{self.model_name}",
+            language=None,
+            fp16=self.fp16,
+            batched=self.batcher is not None,
+            vad=use_vad
+        )
+    
+    async def _transcribe(
+        self,
+        content: AudioSource,
+        use_vad: bool,
+        key: Optional[str],
+        progress: Optional[ProgressCallback] = None,
+        on_segments: Optional[SegmentCallback] = None,
+    ) -> AudioTranscriptionResult:
+        """Cache lookup, decode, VAD and inference for one upload"""
+        # Identical uploads (retries, fan-out) are served from the result cache
+        cache_key = key if settings.CACHE_ENABLED else None
+        if cache_key is not None:
+            cached = await transcription_cache.aget(cache_key)
+            if cached is not None:
+                if progress is not None:
+                    progress(cached["duration"], cached["duration"])
+                return AudioTranscriptionResult(**cached)
         
-        # Convert audio to WAV format if needed
-        if file_ext != "wav":
-            audio = AudioSegment.from_file(io.BytesIO(content), format=file_ext)
-            wav_data = io.BytesIO()
-            audio.export(wav_data, format="wav")
-            content = wav_data.getvalue()
+        # Decode once, straight to the 16 kHz mono float32 array Whisper expects
+        with stage_latency.time(stage="audio_decode"):
+            audio = await decoder_pool.run(decode_audio, content)
+        total = len(audio) / settings.SAMPLE_RATE
+        if progress is not None:
+            progress(0.0, total)
         
-        # Create temporary file for Whisper with explicit deletion handling
-        import tempfile
-        import os
+        trimmed = None
+        speech = audio
+        if use_vad:
+            # Only speech regions reach Whisper; silence and hold music are cut
+            with stage_latency.time(stage="vad"):
+                trimmed = await asyncio.to_thread(voice_activity_detector.trim, audio)
+            speech = trimmed.audio
         
-        temp_file = None
-        try:
-            # Create temporary file with delete=False to ensure it exists during transcription
-            temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            temp_file.write(content)
-            temp_file.flush()
-            temp_file.close()  # Close the file so Whisper can access it
-            
-            # Perform transcription
-            result = self.model.transcribe(
-                temp_file.name,
-                language=None,  # Auto-detect language
-                fp16=False  # Use float32 for CPU-only setup
+        def speech_progress(seconds: float) -> None:
+            # Seconds of speech done, reported on the original recording's timeline
+            done = trimmed.to_original(seconds, is_end=True) if trimmed is not None else seconds
+            progress(done, total)
+        
+        def speech_segments(segments: List[dict]) -> None:
+            if trimmed is not None:
+                trimmed.remap_segments(segments)
+            on_segments(segments)
+        
+        if len(speech) == 0:
+            result = {"text": "", "segments": [], "language": None}
+        else:
+            result = await self._infer(  # Auto-detect language
+                speech,
+                language=None,
+                progress=speech_progress if progress is not None else None,
+                on_segments=speech_segments if on_segments is not None else None,
             )
-            
-            # Calculate average confidence from segments if available
-            segments = result.get("segments", [])
-            avg_confidence = 0.0
-            if segments:
-                confidences = [seg.get("no_speech_prob", 0.0) for seg in segments]
-                avg_confidence = 1.0 - (sum(confidences) / len(confidences)) if confidences else 0.0
-            
-            return AudioTranscriptionResult(
-                text=result["text"].strip(),
-                confidence=avg_confidence,
-                duration=float(result.get("duration", 0.0)),
-                language=result.get("language"),
-                model=f"whisper-{self.model_name}"
+        if progress is not None:
+            progress(total, total)
+        
+        if trimmed is not None:
+            trimmed.remap_segments(result.get("segments", []))
+        transcription = self._to_result(result, audio)
+        if trimmed is not None:
+            transcription.silence_removed = trimmed.removed_seconds
+        
+        if cache_key is not None:
+            await transcription_cache.aset(cache_key, transcription.model_dump())
+        return transcription
+    
+    async def _infer(
+        self,
+        audio: np.ndarray,
+        language: Optional[str],
+        progress: Optional[Callable[[float], None]] = None,
+        on_segments: Optional[Callable[[List[dict]], None]] = None,
+    ) -> dict:
+        """
+        Run Whisper on a decoded waveform, batching it when it fits one window
+        
+        ``progress`` receives the audio seconds done and ``on_segments`` the
+        finished segments; only long-form transcription reports before the
+        whole waveform is finished.
+        """
+        threshold = settings.LONGFORM_THRESHOLD_SECONDS * settings.SAMPLE_RATE
+        if threshold and len(audio) > threshold:
+            # Split at silence and fan chunks out over worker processes
+            if self.longform is None:
+                self.longform = LongformTranscriber(self.model_name, fp16=self.fp16)
+                # Its workers each load a model copy; charge them to the memory budget
+                from ..factory import SpeechServiceFactory
+                SpeechServiceFactory.resize(self)
+            with stage_latency.time(stage="longform"):
+                return await inference_executor.run(
+                    self._run_longform, audio, language, progress, on_segments
+                )
+        
+        if self.batcher is not None and len(audio) <= whisper.audio.N_SAMPLES:
+            # Fits in one 30 s window: share a forward pass with concurrent requests
+            return await self.batcher.submit((audio, language))
+        
+        # Perform transcription on the bounded inference pool
+        return await inference_executor.run(self._run_model, audio, language)
+    
+    def _run_model(self, audio: np.ndarray, language: Optional[str]) -> dict:
+        """Blocking model.transcribe call that records its stage timings"""
+        started = time.perf_counter()
+        try:
+            return self.model.transcribe(
+                audio,
+                language=language,
+                fp16=self.fp16  # float32 unless fp16 precision was requested
             )
         finally:
-            # Clean up temporary file
-            if temp_file and os.path.exists(temp_file.name):
-                try:
-                    os.unlink(temp_file.name)
-                except OSError:
-                    pass  # File might already be deleted
+            elapsed = time.perf_counter() - started
+            stage_timer.add("whisper_inference", elapsed)
+            stage_timer.flush()
+            admission_controller.observe(self.model_name, len(audio) / settings.SAMPLE_RATE, elapsed)
+    
+    def _run_longform(
+        self,
+        audio: np.ndarray,
+        language: Optional[str],
+        progress: Optional[Callable[[float], None]],
+        on_segments: Optional[Callable[[List[dict]], None]],
+    ) -> dict:
+        """Blocking long-form call; its wall time is what the worker slot is held for"""
+        started = time.perf_counter()
+        result = self.longform.transcribe(audio, language, progress, on_segments)
+        admission_controller.observe(
+            self.model_name, len(audio) / settings.SAMPLE_RATE, time.perf_counter() - started
+        )
+        return result
+    
+    def _to_result(
+        self, result: dict, audio: np.ndarray, is_final: bool = True, offset: float = 0.0
+    ) -> AudioTranscriptionResult:
+        """
+        Convert raw Whisper output into an AudioTranscriptionResult
+        
+        ``offset`` (seconds) shifts segment times, for audio that starts
+        partway through a stream.
+        """
+        # Calculate average confidence from segments if available
+        segments = result.get("segments", [])
+        avg_confidence = result.get("confidence", 0.0)  # Pre-computed for long-form results
+        if segments and "confidence" not in result:
+            confidences = [seg.get("no_speech_prob", 0.0) for seg in segments]
+            avg_confidence = 1.0 - (sum(confidences) / len(confidences)) if confidences else 0.0
+        
+        return AudioTranscriptionResult(
+            text=result["text"].strip(),
+            confidence=avg_confidence,
+            duration=float(result.get("duration", len(audio) / settings.SAMPLE_RATE)),
+            language=result.get("language"),
+            model=f"whisper-{self.model_name}",
+            is_final=is_final,
+            segments=[
+                {"start": seg["start"] + offset, "end": seg["end"] + offset, "text": seg.get("text", "").strip()}
+                for seg in segments
+            ]
+        )
+    
+    def _transcribe_batch(self, batch: List[Tuple[np.ndarray, Optional[str]]]) -> List[dict]:
+        """
+        Transcribe several (clip, language) pairs of at most 30 s in one pass
+        
+        The log-mel spectrograms are stacked so the encoder runs once per
+        requested language (once in total for auto-detection), followed by
+        batched greedy decoding. Clips whose decode fails model.transcribe's
+        compression-ratio or log-probability checks are decoded again, still
+        batched, at each fallback temperature in turn, as model.transcribe
+        would. Results use the same shape as ``model.transcribe`` output so
+        callers can treat both alike.
+        """
+        started = time.perf_counter()
+        try:
+            return self._decode_batch(batch)
+        finally:
+            elapsed = time.perf_counter() - started
+            stage_timer.add("whisper_inference", elapsed)
+            stage_timer.flush()
+            admission_controller.observe(
+                self.model_name, sum(len(audio) for audio, _ in batch) / settings.SAMPLE_RATE, elapsed
+            )
+    
+    def _decode_batch(self, batch: List[Tuple[np.ndarray, Optional[str]]]) -> List[dict]:
+        """Body of _transcribe_batch"""
+        by_language: Dict[Optional[str], List[int]] = {}
+        for index, (_, language) in enumerate(batch):
+            by_language.setdefault(language, []).append(index)
+        
+        decoded = [None] * len(batch)
+        for language, indices in by_language.items():
+            features_started = time.perf_counter()
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(batch[i][0]), self.model.dims.n_mels
+                )
+                for i in indices
+            ]).to(self.model.device)
+            stage_timer.add("features", time.perf_counter() - features_started)
+            pending = list(range(len(indices)))  # Rows of mel still to (re)decode
+            for temperature in FALLBACK_TEMPERATURES:
+                options = whisper.DecodingOptions(
+                    language=language,  # None auto-detects per clip
+                    without_timestamps=True,
+                    fp16=self.fp16,
+                    temperature=temperature,
+                )
+                for row, item in zip(pending, whisper.decode(self.model, mel[pending], options)):
+                    decoded[indices[row]] = item
+                pending = [row for row in pending if needs_fallback(decoded[indices[row]])]
+                if not pending:
+                    break
+        
+        results = []
+        for (audio, _), item in zip(batch, decoded):
+            # Same silence rule model.transcribe applies to each window
+            is_silence = item.no_speech_prob > 0.6 and item.avg_logprob < -1.0
+            text = "" if is_silence else item.text
+            results.append({
+                "text": text,
+                "language": item.language,
+                "segments": [{
+                    "start": 0.0,
+                    "end": len(audio) / settings.SAMPLE_RATE,
+                    "text": text,
+                    "avg_logprob": item.avg_logprob,
+                    "no_speech_prob": item.no_speech_prob,
+                }],
+            })
+        return results
     
     async def transcribe_stream(
         self, audio_stream: AsyncIterator[bytes], request: TranscriptionRequest
     ) -> AsyncIterator[AudioTranscriptionResult]:
         """
-        Stream transcription is not yet supported by Whisper
-        This is a placeholder for future implementation
+        Transcribe a live audio stream with a sliding window
+        
+        Decoded audio accumulates in a rolling buffer of not-yet-committed
+        speech. Every STREAM_STEP_MS of new audio the whole buffer is decoded
+        again and emitted as a partial result. Once the buffer reaches
+        STREAM_WINDOW_SECONDS it is cut at the quietest point of its last
+        second; the head is emitted as a final result and the tail carries
+        over into the next window. Remaining audio is finalised when the
+        stream ends.
+        
+        Args:
+            audio_stream: Async iterator of audio chunks (raw 16-bit PCM or
+                an ffmpeg-decodable stream such as Ogg/WebM Opus)
+            request: Transcription parameters; audio_format selects the decoder
+            
+        Returns:
+            Async iterator of partial and final AudioTranscriptionResult
+        """
+        if self.retired:
+            current = await self._replacement()
+            async for result in current.transcribe_stream(audio_stream, request):
+                yield result
+            return
+        self.active_requests += 1
+        try:
+            await self.initialize()
+        except BaseException:
+            self.active_requests -= 1
+            raise
+        
+        language = None if request.language == "auto" else request.language
+        sample_rate = settings.SAMPLE_RATE
+        step = settings.STREAM_STEP_MS * sample_rate // 1000
+        window = min(settings.STREAM_WINDOW_SECONDS * sample_rate, whisper.audio.N_SAMPLES)
+        
+        decoder = StreamingDecoder(request.audio_format)
+        buffer = np.empty(0, dtype=np.float32)
+        decoded_at = 0
+        committed = 0  # Samples already emitted as finals; where the buffer starts in the stream
+        try:
+            async for chunk in audio_stream:
+                buffer = np.concatenate([buffer, await decoder.feed(chunk)])
+                if len(buffer) - decoded_at < step:
+                    continue
+                
+                while len(buffer) >= window:
+                    cut = find_quiet_point(buffer, window - sample_rate, window)
+                    result = await self._infer(buffer[:cut], language)
+                    yield self._to_result(result, buffer[:cut], is_final=True, offset=committed / sample_rate)
+                    buffer = buffer[cut:]
+                    committed += cut
+                
+                if len(buffer) >= step:
+                    result = await self._infer(buffer, language)
+                    yield self._to_result(result, buffer, is_final=False, offset=committed / sample_rate)
+                decoded_at = len(buffer)
+            
+            buffer = np.concatenate([buffer, await decoder.finish()])
+            while len(buffer) > 0:
+                cut = len(buffer)
+                if cut > window:
+                    cut = find_quiet_point(buffer, window - sample_rate, window)
+                result = await self._infer(buffer[:cut], language)
+                yield self._to_result(result, buffer[:cut], is_final=True, offset=committed / sample_rate)
+                buffer = buffer[cut:]
+                committed += cut
+        finally:
+            self.active_requests -= 1
+            await decoder.close()
+    
+    async def _replacement(self) -> BaseSpeechService:
+        """
+        The registry's service for this model, after this one was evicted
+
+        Reloading weights here instead would put them outside the registry
+        and its memory budget.
         """
-        raise NotImplementedError("Streaming transcription not yet supported by Whisper")
+        from ..factory import SpeechServiceFactory, SpeechServiceType
+        return await SpeechServiceFactory.get_service(
+            SpeechServiceType.WHISPER, self.model_name, self.precision
+        )
     
     async def cleanup(self) -> None:
         """Cleanup resources"""
-        # Whisper doesn't require explicit cleanup
-        pass 
\ No newline at end of file
+        if self.batcher is not None:
+            await self.batcher.close()
+        if self.longform is not None:
+            await asyncio.to_thread(self.longform.shutdown)
+            self.longform = None
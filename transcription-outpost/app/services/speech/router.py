@@ -1,10 +1,22 @@
-from fastapi import APIRouter, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
-from typing import Optional
+import json
+from fastapi import APIRouter, UploadFile, HTTPException, BackgroundTasks, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional
 from ...core.config import settings
 from ...core.logger import log
-from .factory import get_transcription_service, SpeechServiceType
+from ...core.uploads import spooled_upload
+from .factory import get_transcription_service, SpeechServiceFactory
 from .base import AudioTranscriptionResult
+from .admission import AudioTooLongError, transcribe_admitted
+from .bulk import (
+    BatchInputError,
+    close_uploads,
+    detach_uploads,
+    items_from_manifest,
+    items_from_uploads,
+    transcribe_batch,
+)
+from .executor import InferenceQueueFullError
 
 router = APIRouter(prefix="/transcription", tags=["transcription"])
 
@@ -12,14 +24,16 @@ router = APIRouter(prefix="/transcription", tags=["transcription"])
 async def transcribe_audio(
     file: UploadFile,
     background_tasks: BackgroundTasks,
-    model: str = "whisper",  # default to whisper since we switched from paddle
+    model: str = "whisper",  # provider, optionally with a size: "whisper-small"
+    vad: Optional[bool] = None,
 ) -> AudioTranscriptionResult:
     """
     Transcribe an uploaded audio file
     
     Args:
         file: The audio file to transcribe
-        model: The model to use for transcription (currently only supports 'whisper')
+        model: Provider and optional size, e.g. 'whisper' or 'whisper-small'
+        vad: Strip silence before transcribing; defaults to settings.VAD_ENABLED
         background_tasks: FastAPI background tasks for cleanup
     
     Returns:
@@ -40,21 +54,38 @@ async def transcribe_audio(
             detail=f"Unsupported audio format. Supported formats: {settings.SUPPORTED_AUDIO_FORMATS}"
         )
     
+    # Resolve the requested model; loaded on first use, then kept resident
+    provider, _, model_size = model.partition("-")
+    try:
+        transcription_service = await get_transcription_service(provider, model_size or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"Failed to load model '{model}': {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Transcription failed. Please try again."
+        )
+    
     try:
-        # Get transcription service
-        transcription_service = await get_transcription_service(SpeechServiceType.WHISPER)
-        
-        # Read file content
-        content = await file.read()
-        
         # Add cleanup to background tasks
         background_tasks.add_task(file.close)
         
-        # Perform transcription
-        result = await transcription_service.transcribe(content, file_ext)
+        # Decoded straight from the spooled upload; never read into one bytes object.
+        # Admitted by its probed duration first, so hours of audio cannot crowd out short clips
+        result = await transcribe_admitted(transcription_service, spooled_upload(file), file_ext, vad=vad)
         
         return result
         
+    except AudioTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceQueueFullError as e:
+        log.warning(f"Transcription rejected: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         log.error(f"Transcription failed: {str(e)}")
         raise HTTPException(
@@ -62,10 +93,73 @@ async def transcribe_audio(
             detail="Transcription failed. Please try again."
         )
 
+@router.post("/batch")
+async def transcribe_batch_audio(
+    files: List[UploadFile] = File(default=[]),
+    manifest: Optional[str] = Form(None),
+    model: str = Form("whisper"),  # provider, optionally with a size: "whisper-small"
+    vad: Optional[bool] = Form(None),
+) -> StreamingResponse:
+    """
+    Transcribe many audio files in one request
+    
+    Results stream back as NDJSON, one line per file as soon as it is
+    done, in completion order; each line carries the file's ``index`` in
+    the request. A file that fails gets an ``error`` line instead and the
+    rest carry on. The last line is a ``summary``.
+    
+    Args:
+        files: Audio files and/or zip archives of audio files
+        manifest: Paths under BATCH_LOCAL_ROOT, as a JSON array or one per line
+        model: Provider and optional size, e.g. 'whisper' or 'whisper-small'
+        vad: Strip silence before transcribing; defaults to settings.VAD_ENABLED
+    """
+    # The request's uploads are closed before the response streams; read from copies
+    uploads = await detach_uploads(files)
+    try:
+        try:
+            # Only names and sizes; the audio itself is read when each file is scheduled
+            items = list(items_from_uploads(uploads))
+            if manifest:
+                items.extend(items_from_manifest(manifest))
+        except BatchInputError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not items:
+            raise HTTPException(status_code=400, detail="No audio files in the request")
+        
+        provider, _, model_size = model.partition("-")
+        try:
+            transcription_service = await get_transcription_service(provider, model_size or None)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            log.error(f"Failed to load model '{model}': {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail="Transcription failed. Please try again."
+            )
+    except BaseException:
+        close_uploads(uploads)
+        raise
+    
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for record in transcribe_batch(transcription_service, items, vad=vad):
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            # Headers are already sent; report it in-band
+            log.error(f"Batch transcription failed: {str(e)}")
+            yield json.dumps({"type": "error", "error": "Batch transcription failed"}) + "\n"
+        finally:
+            close_uploads(uploads)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/models")
 async def list_available_models() -> dict:
     """List available transcription models"""
     return {
-        "available_models": ["whisper"],
-        "default_model": "whisper"
+        "available_models": ["whisper"] + [f"whisper-{size}" for size in settings.WHISPER_MODELS],
+        "default_model": f"whisper-{settings.WHISPER_DEFAULT_MODEL}",
+        "resident_models": [entry["model"] for entry in SpeechServiceFactory.stats()["resident"]]
     } 
\ No newline at end of file
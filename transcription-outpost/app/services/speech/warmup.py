@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from ...core.logger import log
+from .factory import SpeechServiceType, get_transcription_service
+
+
+class ModelWarmup:
+    """
+    Background model loading and warm-up for a worker process
+
+    The app starts serving straight away while the default model is loaded
+    and run once on a short dummy clip, so kernels, allocators and lazy
+    imports are primed before real traffic arrives. ``ready`` flips once
+    that first inference completes; load balancers poll it via /ready.
+    """
+
+    def __init__(self):
+        self.state = "pending"  # pending -> loading -> warming -> ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self, service_type: SpeechServiceType = SpeechServiceType.WHISPER) -> None:
+        """Schedule warm-up on the running event loop without waiting for it"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(service_type))
+
+    async def run(self, service_type: SpeechServiceType = SpeechServiceType.WHISPER) -> None:
+        """Load the default model and run one dummy inference"""
+        try:
+            self.state = "loading"
+            started = time.perf_counter()
+            service = await get_transcription_service(service_type)
+            self.load_seconds = time.perf_counter() - started
+
+            self.state = "warming"
+            started = time.perf_counter()
+            await service.warm_up()
+            self.warmup_seconds = time.perf_counter() - started
+
+            self.state = "ready"
+            log.info(
+                f"Model ready: loaded in {self.load_seconds:.1f}s, "
+                f"warmed up in {self.warmup_seconds:.1f}s"
+            )
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            log.error(f"Model warm-up failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Readiness snapshot for /ready"""
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+        }
+
+    async def stop(self) -> None:
+        """Cancel warm-up if it is still running"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# Warm-up state for this worker process
+model_warmup = ModelWarmup()
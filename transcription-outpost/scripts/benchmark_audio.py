@@ -0,0 +1,183 @@
+"""Benchmark the audio decode path in front of WhisperService.transcribe.
+
+Compares the legacy pipeline (pydub -> WAV bytes -> temp file -> whisper's own
+ffmpeg load) with the in-memory ``decode_audio`` path for every format in
+settings.SUPPORTED_AUDIO_FORMATS and reports per-request latency and peak RSS.
+The ``subprocess`` pipeline is ``decode_audio`` with the native WAV/FLAC
+decoder switched off, so the wav and flac rows show what skipping ffmpeg saves.
+Every (pipeline, format) pair runs in a fresh process so that peak RSS is not
+inflated by earlier measurements.
+
+Usage:
+    python scripts/benchmark_audio.py --seconds 60 --repeat 5
+    python scripts/benchmark_audio.py --model tiny   # include Whisper inference
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+
+SOURCE_SAMPLE_RATE = 44100  # Typical phone/browser capture rate
+
+
+def legacy_pipeline(content: bytes, file_ext: str) -> np.ndarray:
+    """Decode path used before the in-memory rewrite"""
+    import whisper
+    from pydub import AudioSegment
+
+    if file_ext != "wav":
+        audio = AudioSegment.from_file(io.BytesIO(content), format=file_ext)
+        wav_data = io.BytesIO()
+        audio.export(wav_data, format="wav")
+        content = wav_data.getvalue()
+
+    temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    try:
+        temp_file.write(content)
+        temp_file.close()
+        return whisper.audio.load_audio(temp_file.name)
+    finally:
+        os.unlink(temp_file.name)
+
+
+def subprocess_pipeline(content: bytes, file_ext: str) -> np.ndarray:
+    """Single-decode path, always through an ffmpeg subprocess"""
+    from app.core.audio import decode_audio
+
+    settings.NATIVE_DECODE_ENABLED = False  # Each case runs in its own process
+    return decode_audio(content)
+
+
+def in_memory_pipeline(content: bytes, file_ext: str) -> np.ndarray:
+    """Current single-decode path; WAV and FLAC never start ffmpeg"""
+    from app.core.audio import decode_audio
+
+    return decode_audio(content)
+
+
+PIPELINES: Dict[str, Callable[[bytes, str], np.ndarray]] = {
+    "legacy": legacy_pipeline,
+    "subprocess": subprocess_pipeline,
+    "in-memory": in_memory_pipeline,
+}
+
+
+def generate_samples(seconds: float, workdir: Path) -> Dict[str, bytes]:
+    """Synthesize a speech-like stereo clip and encode it in every supported format"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SOURCE_SAMPLE_RATE)) / SOURCE_SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SOURCE_SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None)
+    mono = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(t.shape)
+    stereo = np.stack([mono, mono * 0.9], axis=1).astype(np.float32)
+
+    wav_path = workdir / "sample.wav"
+    sf.write(wav_path, stereo, SOURCE_SAMPLE_RATE, subtype="PCM_16")
+
+    samples = {}
+    for fmt in settings.SUPPORTED_AUDIO_FORMATS:
+        path = workdir / f"sample.{fmt}"
+        if fmt != "wav":
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-i", str(wav_path), str(path)],
+                check=True,
+            )
+        samples[fmt] = path.read_bytes()
+    return samples
+
+
+def _run_case(pipeline: str, content: bytes, file_ext: str, repeat: int,
+              model_name: Optional[str], queue: mp.Queue) -> None:
+    """Child-process body: time one pipeline and report peak RSS"""
+    try:
+        queue.put(_measure(pipeline, content, file_ext, repeat, model_name))
+    except Exception as e:
+        queue.put({"error": str(e).strip().splitlines()[-1]})
+
+
+def _measure(pipeline: str, content: bytes, file_ext: str, repeat: int,
+             model_name: Optional[str]) -> dict:
+    """Time one pipeline in the current process"""
+    import whisper  # Loaded by the service either way; keep RSS baselines comparable
+
+    model = whisper.load_model(model_name) if model_name else None
+
+    # Warm imports and caches so they are not counted against the first request
+    PIPELINES[pipeline](content, file_ext)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        audio = PIPELINES[pipeline](content, file_ext)
+        if model is not None:
+            model.transcribe(audio, language=None, fp16=False)
+        latencies.append(time.perf_counter() - start)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "latency_ms": statistics.median(latencies) * 1000,
+        "peak_rss_mb": peak_kb / 1024,
+        "rss_growth_mb": (peak_kb - baseline_kb) / 1024,
+    }
+
+
+def run_case(pipeline: str, content: bytes, file_ext: str, repeat: int,
+             model_name: Optional[str]) -> dict:
+    """Run a single benchmark case in a fresh interpreter"""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_run_case, args=(pipeline, content, file_ext, repeat, model_name, queue)
+    )
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0, help="Clip length")
+    parser.add_argument("--repeat", type=int, default=5, help="Requests per case")
+    parser.add_argument("--model", default=None, help="Whisper model to include, e.g. tiny")
+    parser.add_argument(
+        "--pipelines", nargs="+", default=list(PIPELINES), choices=list(PIPELINES)
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        samples = generate_samples(args.seconds, Path(workdir))
+
+    print(f"{args.seconds:.0f}s clip, {args.repeat} requests per case"
+          + (f", whisper-{args.model}" if args.model else ", decode only"))
+    print(f"{'format':<8}{'pipeline':<12}{'latency ms':>12}{'peak RSS MB':>14}{'RSS growth MB':>16}")
+    for fmt, content in samples.items():
+        for pipeline in args.pipelines:
+            result = run_case(pipeline, content, fmt, args.repeat, args.model)
+            if "error" in result:
+                print(f"{fmt:<8}{pipeline:<12}  failed: {result['error']}")
+                continue
+            print(f"{fmt:<8}{pipeline:<12}{result['latency_ms']:>12.1f}"
+                  f"{result['peak_rss_mb']:>14.1f}{result['rss_growth_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
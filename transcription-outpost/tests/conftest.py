@@ -1,10 +1,13 @@
 import os
+import tempfile
 import pytest
 from pathlib import Path
 
 # Set test environment variables
 os.environ["APP_NAME"] = "Transcription Outpost Test"
 os.environ["DEBUG"] = "true"
+os.environ["CACHE_ENABLED"] = "false"  # Keep results from leaking between tests
+os.environ["JOBS_DIR"] = tempfile.mkdtemp(prefix="outpost-jobs-")  # Not the working tree
 
 # Create test data directory
 @pytest.fixture
@@ -0,0 +1,211 @@
+import io
+import shutil
+import subprocess
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.core.audio import StreamingDecoder, _decode_native, decode_audio, find_quiet_point, probe_duration
+from app.core.config import settings
+
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is not installed"
+)
+requires_ffprobe = pytest.mark.skipif(
+    shutil.which("ffprobe") is None, reason="ffprobe is not installed"
+)
+
+
+@requires_ffmpeg
+class TestDecodeAudio:
+    """Test in-memory audio decoding"""
+    
+    def test_decode_wav_matches_source(self, test_data_dir):
+        """Test decoded samples match the WAV file contents"""
+        audio_path = test_data_dir / "simple.wav"
+        expected, _ = sf.read(audio_path, dtype="float32")
+        
+        audio = decode_audio(audio_path.read_bytes())
+        
+        assert audio.dtype == np.float32
+        assert audio.ndim == 1
+        assert len(audio) == len(expected)
+        assert np.allclose(audio, expected, atol=1e-4)
+    
+    def test_decode_resamples_to_target_rate(self, test_data_dir):
+        """Test output is resampled to the requested rate"""
+        audio_path = test_data_dir / "simple.wav"
+        
+        audio = decode_audio(audio_path.read_bytes(), sample_rate=8000)
+        
+        assert len(audio) == pytest.approx(sf.info(audio_path).frames / 2, abs=10)
+    
+    @pytest.mark.parametrize("spool_bytes", [10 ** 8, 1024], ids=["in_memory", "on_disk"])
+    def test_decode_spooled_file(self, test_data_dir, spool_bytes):
+        """Test an upload decodes the same whether it is still in memory or spooled to disk"""
+        from tempfile import SpooledTemporaryFile
+        
+        content = (test_data_dir / "simple.wav").read_bytes()
+        upload = SpooledTemporaryFile(max_size=spool_bytes)
+        upload.write(content)
+        upload.seek(0)
+        
+        audio = decode_audio(upload)
+        
+        assert np.array_equal(audio, decode_audio(content))
+        upload.write(b"still writable")  # No buffer export left behind
+    
+    def test_decode_invalid_payload(self):
+        """Test undecodable payloads raise RuntimeError"""
+        with pytest.raises(RuntimeError, match="Failed to decode audio"):
+            decode_audio(b"definitely not audio")
+
+
+class TestNativeDecode:
+    """Test WAV and FLAC decoding without ffmpeg"""
+    
+    @staticmethod
+    def encode(audio: np.ndarray, rate: int, fmt: str) -> bytes:
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, rate, format=fmt, subtype="PCM_16")
+        return buffer.getvalue()
+    
+    def test_wav_skips_ffmpeg(self, test_data_dir):
+        """Test 16 kHz PCM WAV is read in-process, sample for sample"""
+        audio_path = test_data_dir / "simple.wav"
+        expected, _ = sf.read(audio_path, dtype="float32")
+        
+        with patch("app.core.audio.subprocess.run", side_effect=AssertionError("ffmpeg spawned")):
+            audio = decode_audio(audio_path.read_bytes())
+        
+        assert audio.dtype == np.float32
+        assert np.array_equal(audio, expected)
+    
+    @requires_ffmpeg
+    @pytest.mark.parametrize("fmt", ["WAV", "FLAC"])
+    def test_matches_ffmpeg_when_resampling(self, fmt):
+        """Test stereo 44.1 kHz input is downmixed and resampled like ffmpeg does"""
+        t = np.arange(2 * 44100) / 44100
+        tone = 0.3 * np.sin(2 * np.pi * 440 * t)
+        content = self.encode(np.stack([tone, 0.5 * tone], axis=1), 44100, fmt)
+        
+        native = decode_audio(content)
+        with patch.object(settings, "NATIVE_DECODE_ENABLED", False):
+            reference = decode_audio(content)
+        
+        assert len(native) == len(reference) == 32000
+        assert np.abs(native[100:-100] - reference[100:-100]).max() < 1e-3
+    
+    @requires_ffmpeg
+    def test_compressed_formats_still_use_ffmpeg(self, tmp_path):
+        """Test anything that is not WAV or FLAC goes to ffmpeg"""
+        ogg_path = tmp_path / "tone.ogg"
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+             "-i", "sine=frequency=440:duration=1", str(ogg_path)],
+            check=True,
+        )
+        
+        content = ogg_path.read_bytes()
+        
+        assert _decode_native(content, 16000) is None
+        assert len(decode_audio(content)) == pytest.approx(16000, abs=400)
+    
+    def test_unreadable_wav_falls_back(self):
+        """Test a WAV header libsndfile rejects is handed to ffmpeg"""
+        content = b"RIFF\x00\x00\x00\x00WAVEjunk"
+        assert _decode_native(content, 16000) is None
+    
+    @pytest.mark.parametrize("fmt", ["WAV", "FLAC"])
+    def test_probe_skips_ffprobe(self, fmt):
+        """Test WAV and FLAC durations are read from the header in-process"""
+        content = self.encode(np.zeros(44100 * 3, dtype=np.float32), 44100, fmt)
+        
+        with patch("app.core.audio.subprocess.run", side_effect=AssertionError("ffprobe spawned")):
+            assert probe_duration(content) == pytest.approx(3.0)
+
+
+@requires_ffprobe
+class TestProbeDuration:
+    """Test reading durations without decoding"""
+    
+    def test_probe_matches_wav_length(self, test_data_dir):
+        """Test the probed duration of a WAV file matches its frame count"""
+        audio_path = test_data_dir / "simple.wav"
+        info = sf.info(audio_path)
+        
+        duration = probe_duration(audio_path.read_bytes())
+        
+        assert duration == pytest.approx(info.frames / info.samplerate, abs=0.01)
+    
+    @pytest.mark.parametrize("spool_bytes", [10 ** 8, 1024], ids=["in_memory", "on_disk"])
+    def test_probe_spooled_file(self, test_data_dir, spool_bytes):
+        """Test spooled uploads are probed in place and left readable"""
+        from tempfile import SpooledTemporaryFile
+        
+        content = (test_data_dir / "simple.wav").read_bytes()
+        upload = SpooledTemporaryFile(max_size=spool_bytes)
+        upload.write(content)
+        upload.seek(0)
+        
+        assert probe_duration(upload) == pytest.approx(probe_duration(content))
+        assert upload.read() == content
+    
+    def test_probe_invalid_payload(self):
+        """Test unreadable payloads have no duration"""
+        assert probe_duration(b"definitely not audio") is None
+
+
+@pytest.mark.asyncio
+class TestStreamingDecoder:
+    """Test incremental stream decoding"""
+    
+    async def test_pcm_handles_split_samples(self):
+        """Test PCM frames split mid-sample are reassembled"""
+        decoder = StreamingDecoder("pcm")
+        data = np.array([1000, -2000, 3000], dtype=np.int16).tobytes()
+        
+        first = await decoder.feed(data[:3])
+        second = await decoder.feed(data[3:])
+        rest = await decoder.finish()
+        
+        samples = np.concatenate([first, second, rest])
+        assert np.allclose(samples * 32768, [1000, -2000, 3000])
+    
+    @requires_ffmpeg
+    async def test_compressed_stream_decodes_incrementally(self, tmp_path):
+        """Test an Ogg stream fed in chunks decodes to the full duration"""
+        ogg_path = tmp_path / "tone.ogg"
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi",
+             "-i", "sine=frequency=440:duration=2", str(ogg_path)],
+            check=True,
+        )
+        data = ogg_path.read_bytes()
+        decoder = StreamingDecoder("ogg")
+        
+        chunks = []
+        try:
+            for i in range(0, len(data), 2048):
+                chunks.append(await decoder.feed(data[i:i + 2048]))
+            chunks.append(await decoder.finish())
+        finally:
+            await decoder.close()
+        
+        assert sum(len(c) for c in chunks) == pytest.approx(32000, abs=800)
+
+
+class TestFindQuietPoint:
+    """Test low-energy split point search"""
+    
+    def test_finds_gap_between_tones(self):
+        """Test the split lands inside the silent gap"""
+        tone = np.sin(np.arange(16000) / 5).astype(np.float32)
+        audio = np.concatenate([tone, np.zeros(1600, dtype=np.float32), tone])
+        
+        point = find_quiet_point(audio, 8000, 24000)
+        
+        assert 16000 <= point < 17600
@@ -0,0 +1,172 @@
+import pytest
+
+from app.core.cache import TieredCache, content_key
+
+
+class TestContentKey:
+    """Test cache key derivation"""
+    
+    def test_same_content_and_params_match(self):
+        """Test keys are stable and independent of parameter order"""
+        assert content_key(b"audio", model="a", language=None) == \
+            content_key(b"audio", language=None, model="a")
+    
+    def test_content_and_params_change_key(self):
+        """Test any difference in content or parameters changes the key"""
+        base = content_key(b"audio", model="a")
+        assert content_key(b"audio!", model="a") != base
+        assert content_key(b"audio", model="b") != base
+    
+    def test_file_matches_its_bytes(self):
+        """Test a spooled upload hashes like its contents and is left rewound"""
+        from tempfile import SpooledTemporaryFile
+        
+        upload = SpooledTemporaryFile(max_size=4)
+        upload.write(b"audio" * 10)
+        
+        assert content_key(upload, model="a") == content_key(b"audio" * 10, model="a")
+        assert upload.tell() == 0
+
+
+class TestTieredCache:
+    """Test memory + SQLite tiered cache"""
+    
+    def test_memory_hit_and_miss(self, tmp_path):
+        """Test values round-trip and counters track lookups"""
+        cache = TieredCache("t", db_path=str(tmp_path / "c.db"))
+        
+        assert cache.get("k") is None
+        cache.set("k", {"text": "hello"})
+        assert cache.get("k") == {"text": "hello"}
+        
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+    
+    def test_memory_budget_evicts_lru(self, tmp_path):
+        """Test the least recently used entry is evicted past the byte budget"""
+        # Each value encodes to 12 bytes of JSON, so only two fit
+        cache = TieredCache("t", max_memory_bytes=30, max_disk_bytes=0,
+                            db_path=str(tmp_path / "c.db"))
+        
+        cache.set("a", "x" * 10)
+        cache.set("b", "y" * 10)
+        cache.get("a")  # Make "b" the least recently used
+        cache.set("c", "z" * 10)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == "x" * 10
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["memory_bytes"] <= 30
+    
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test a fresh instance (new process/worker) reads from disk"""
+        db_path = str(tmp_path / "c.db")
+        TieredCache("t", db_path=db_path).set("k", [1, 2, 3])
+        
+        cache = TieredCache("t", db_path=db_path)
+        assert cache.get("k") == [1, 2, 3]
+        assert cache.get("k") == [1, 2, 3]  # Promoted into memory
+        
+        stats = cache.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+    
+    def test_disk_budget_evicts_oldest(self, tmp_path):
+        """Test disk entries are dropped least recently used first"""
+        cache = TieredCache("t", max_memory_bytes=0, max_disk_bytes=30,
+                            db_path=str(tmp_path / "c.db"))
+        
+        for key in ("a", "b", "c"):
+            cache.set(key, "v" * 10)
+        
+        assert cache.get("a") is None
+        assert cache.get("c") == "v" * 10
+        assert cache.stats()["disk_evictions"] >= 1
+    
+    @pytest.mark.asyncio
+    async def test_async_access(self, tmp_path):
+        """Test async wrappers share the same tiers"""
+        cache = TieredCache("t", db_path=str(tmp_path / "c.db"))
+        
+        await cache.aset("k", {"n": 1})
+        
+        assert await cache.aget("k") == {"n": 1}
+        assert cache.get("k") == {"n": 1}
+    
+    def test_ttl_expires_both_tiers(self, tmp_path, monkeypatch):
+        """Test expired entries are misses in memory and on disk"""
+        now = [1000.0]
+        monkeypatch.setattr("app.core.cache.time.time", lambda: now[0])
+        db_path = str(tmp_path / "c.db")
+        cache = TieredCache("t", db_path=db_path, ttl=60)
+        
+        cache.set("k", "v")
+        now[0] += 30
+        assert cache.get("k") == "v"
+        assert TieredCache("t", db_path=db_path, ttl=60).get("k") == "v"
+        
+        now[0] += 31
+        assert cache.get("k") is None
+        assert TieredCache("t", db_path=db_path, ttl=60).get("k") is None
+        assert cache.stats()["expirations"] >= 1
+    
+    def test_expiration_counted_once_per_lookup(self, tmp_path, monkeypatch):
+        """Test an entry expired in both tiers is one expiration"""
+        now = [1000.0]
+        monkeypatch.setattr("app.core.cache.time.time", lambda: now[0])
+        cache = TieredCache("t", db_path=str(tmp_path / "c.db"), ttl=60)
+        
+        cache.set("k", "v")
+        now[0] += 61
+        
+        assert cache.get("k") is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_disk_total_follows_writes_and_deletes(self, tmp_path):
+        """Test the kept disk total matches the rows through replace, evict and clear"""
+        import sqlite3
+        db_path = str(tmp_path / "c.db")
+        cache = TieredCache("t", max_memory_bytes=0, max_disk_bytes=40, db_path=db_path)
+        
+        def totals():
+            conn = sqlite3.connect(db_path)
+            kept = conn.execute('SELECT total FROM "t_size"').fetchone()[0]
+            actual = conn.execute('SELECT COALESCE(SUM(size), 0) FROM "t"').fetchone()[0]
+            conn.close()
+            return kept, actual
+        
+        cache.set("a", "v" * 10)
+        cache.set("a", "v" * 5)  # Replaced, not added
+        assert totals() == (7, 7)
+        for key in ("b", "c", "d"):
+            cache.set(key, "v" * 10)
+        kept, actual = totals()
+        assert kept == actual <= 40
+        assert cache.stats()["disk_evictions"] >= 1
+        
+        cache.clear()
+        assert totals() == (0, 0)
+    
+    def test_existing_table_gains_expiry_column(self, tmp_path):
+        """Test a cache file from before TTL support keeps working"""
+        import sqlite3
+        db_path = str(tmp_path / "c.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            'CREATE TABLE "t" (key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("""INSERT INTO "t" VALUES ('old', '"kept"', 6, 0)""")
+        conn.commit()
+        conn.close()
+        
+        cache = TieredCache("t", db_path=db_path, ttl=60)
+        assert cache.get("old") == "kept"
+        cache.set("new", "value")
+        assert TieredCache("t", db_path=db_path).get("new") == "value"
+        
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT total FROM "t_size"').fetchone()[0] == 6 + len(b'"value"')
+        conn.close()
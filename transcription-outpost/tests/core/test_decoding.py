@@ -0,0 +1,167 @@
+import asyncio
+import os
+import subprocess
+import threading
+import time
+from unittest.mock import patch
+
+import pydub
+import pytest
+
+from app.core.audio import DecodeTimeoutError, configure_ffmpeg, decode_audio, find_tool
+from app.core.config import settings
+from app.core.decoding import DecoderPool, parse_cpus
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Executable ffmpeg and ffprobe stand-ins in their own directory"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("ffmpeg", "ffprobe"):
+        tool = bin_dir / name
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+    find_tool.cache_clear()
+    yield bin_dir
+    find_tool.cache_clear()
+
+
+class TestFindTool:
+    """Test locating ffmpeg and ffprobe"""
+
+    def test_setting_as_directory(self, fake_ffmpeg):
+        """Test FFMPEG_PATH may name the directory holding both tools"""
+        with patch.object(settings, "FFMPEG_PATH", str(fake_ffmpeg)):
+            assert find_tool("ffmpeg") == str(fake_ffmpeg / "ffmpeg")
+            assert find_tool("ffprobe") == str(fake_ffmpeg / "ffprobe")
+
+    def test_setting_as_binary(self, fake_ffmpeg):
+        """Test ffprobe is looked up beside an FFMPEG_PATH binary"""
+        with patch.object(settings, "FFMPEG_PATH", str(fake_ffmpeg / "ffmpeg")):
+            assert find_tool("ffmpeg") == str(fake_ffmpeg / "ffmpeg")
+            assert find_tool("ffprobe") == str(fake_ffmpeg / "ffprobe")
+
+    def test_path_search(self, fake_ffmpeg):
+        """Test PATH is searched when no location is configured"""
+        with patch.object(settings, "FFMPEG_PATH", None), \
+             patch.dict(os.environ, {"PATH": str(fake_ffmpeg)}):
+            assert find_tool("ffmpeg") == str(fake_ffmpeg / "ffmpeg")
+
+    def test_missing(self, tmp_path, fake_ffmpeg):
+        """Test a missing tool raises FileNotFoundError"""
+        with patch.object(settings, "FFMPEG_PATH", None), \
+             patch.dict(os.environ, {"PATH": str(tmp_path)}):
+            with pytest.raises(FileNotFoundError):
+                find_tool("ffmpeg")
+
+    def test_configure_puts_directory_on_path(self, fake_ffmpeg):
+        """Test whisper's loader can run a configured ffmpeg by name"""
+        with patch.object(settings, "FFMPEG_PATH", str(fake_ffmpeg)), \
+             patch.dict(os.environ, {"PATH": "/usr/bin"}), \
+             patch.multiple(pydub.AudioSegment, create=True, converter="ffmpeg", ffmpeg="ffmpeg", ffprobe="ffprobe"):
+            assert configure_ffmpeg() == str(fake_ffmpeg / "ffmpeg")
+            assert os.environ["PATH"].split(os.pathsep)[0] == str(fake_ffmpeg)
+            assert pydub.AudioSegment.converter == str(fake_ffmpeg / "ffmpeg")
+
+
+class TestDecodeTimeout:
+    """Test ffmpeg is bounded in time"""
+
+    def test_timeout_raises(self):
+        """Test a stuck ffmpeg is reported as a decode timeout"""
+        stuck = subprocess.TimeoutExpired(["ffmpeg"], 5)
+        with patch.object(settings, "NATIVE_DECODE_ENABLED", False), \
+             patch("app.core.audio.find_tool", return_value="ffmpeg"), \
+             patch("app.core.audio.subprocess.run", side_effect=stuck) as run:
+            with pytest.raises(DecodeTimeoutError):
+                decode_audio(b"audio", timeout=5)
+
+        assert run.call_args.kwargs["timeout"] == 5
+
+    def test_default_timeout_from_settings(self):
+        """Test callers that pass no timeout get DECODE_TIMEOUT_SECONDS"""
+        done = subprocess.CompletedProcess([], 0, stdout=b"\x00\x00", stderr=b"")
+        with patch.object(settings, "NATIVE_DECODE_ENABLED", False), \
+             patch.object(settings, "DECODE_TIMEOUT_SECONDS", 7), \
+             patch("app.core.audio.find_tool", return_value="ffmpeg"), \
+             patch("app.core.audio.subprocess.run", return_value=done) as run:
+            decode_audio(b"audio")
+
+        assert run.call_args.kwargs["timeout"] == 7
+
+    def test_thread_limit(self):
+        """Test ffmpeg is held to DECODE_THREADS threads"""
+        done = subprocess.CompletedProcess([], 0, stdout=b"", stderr=b"")
+        with patch.object(settings, "NATIVE_DECODE_ENABLED", False), \
+             patch.object(settings, "DECODE_THREADS", 1), \
+             patch("app.core.audio.find_tool", return_value="ffmpeg"), \
+             patch("app.core.audio.subprocess.run", return_value=done) as run:
+            decode_audio(b"audio")
+
+        cmd = run.call_args.args[0]
+        assert cmd[cmd.index("-threads") + 1] == "1"
+
+
+def test_parse_cpus():
+    """Test CPU lists accept ranges and single CPUs"""
+    assert parse_cpus("0-2,5") == {0, 1, 2, 5}
+    assert parse_cpus(None) is None
+    with pytest.raises(ValueError):
+        parse_cpus("a-b")
+
+
+@pytest.mark.asyncio
+class TestDecoderPool:
+    """Test the dedicated decode workers"""
+
+    async def test_concurrency_is_bounded(self):
+        """Test no more than max_workers decodes run at once and the rest wait"""
+        pool = DecoderPool(max_workers=2)
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def decode(i):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return i
+
+        try:
+            results = await asyncio.gather(*(pool.run(decode, i) for i in range(6)))
+        finally:
+            pool.shutdown()
+
+        assert results == list(range(6))
+        assert peak == 2
+        assert pool.stats()["queue_depth"] == 0
+
+    async def test_timeouts_are_counted(self):
+        """Test decode timeouts propagate and show up in stats"""
+        pool = DecoderPool(max_workers=1)
+
+        def stuck():
+            raise DecodeTimeoutError("timed out")
+
+        try:
+            with pytest.raises(DecodeTimeoutError):
+                await pool.run(stuck)
+        finally:
+            pool.shutdown()
+
+        assert pool.stats()["timed_out"] == 1
+
+    @pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="No CPU affinity on this platform")
+    async def test_workers_are_pinned(self):
+        """Test worker threads run on DECODE_CPUS only"""
+        cpu = min(os.sched_getaffinity(0))
+        pool = DecoderPool(max_workers=1, cpus=str(cpu))
+        try:
+            assert await pool.run(os.sched_getaffinity, 0) == {cpu}
+        finally:
+            pool.shutdown()
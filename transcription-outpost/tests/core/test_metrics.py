@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+import torch
+
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry, StageTimer, format_uptime
+
+
+class TestMetricTypes:
+    """Test counters, gauges and histograms"""
+    
+    def test_counter_by_label(self):
+        """Test counters accumulate per label set"""
+        counter = Counter("requests_total", "Requests", ["status"])
+        counter.inc(status="200")
+        counter.inc(2, status="500")
+        
+        assert counter.total() == 3
+        assert counter.values() == {("200",): 1.0, ("500",): 2.0}
+    
+    def test_gauge_track_and_function(self):
+        """Test in-flight tracking and computed gauges"""
+        gauge = Gauge("in_flight", "In flight")
+        with gauge.track():
+            assert gauge.value() == 1
+        assert gauge.value() == 0
+        
+        gauge.set_function(lambda: 42)
+        assert gauge.value() == 42
+    
+    def test_histogram_summary(self):
+        """Test count, mean and bucket-based percentiles"""
+        histogram = Histogram("latency", "Latency", ["stage"], buckets=(0.1, 1.0, 10.0))
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value, stage="decode")
+        
+        summary = histogram.summary()[("decode",)]
+        assert summary["count"] == 4
+        assert summary["avg_ms"] == pytest.approx(1400.0)
+        assert summary["p50_ms"] == pytest.approx(100.0)
+        assert summary["p95_ms"] == pytest.approx(10000.0)
+
+
+class TestPrometheusRendering:
+    """Test Prometheus text exposition"""
+    
+    def test_renders_all_types(self):
+        """Test help/type lines, labels and cumulative buckets"""
+        registry = MetricsRegistry()
+        registry.counter("hits_total", "Hits", ["path"]).inc(path='/a"b')
+        registry.gauge("uptime_seconds", "Uptime").set_function(lambda: 1.5)
+        histogram = registry.histogram("stage_seconds", "Stages", ["stage"], buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="decode")
+        histogram.observe(0.5, stage="decode")
+        
+        text = registry.render_prometheus()
+        
+        assert "# TYPE hits_total counter" in text
+        assert 'hits_total{path="/a\\"b"} 1' in text
+        assert "uptime_seconds 1.5" in text
+        assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="decode",le="1.0"} 2' in text
+        assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 2' in text
+        assert 'stage_seconds_count{stage="decode"} 2' in text
+    
+    def test_registering_twice_returns_same_metric(self):
+        """Test re-registration shares the existing series"""
+        registry = MetricsRegistry()
+        assert registry.counter("x_total", "X") is registry.counter("x_total", "X")
+
+
+class TestStageTimer:
+    """Test per-thread accumulation of module forward time"""
+    
+    def test_module_hooks_accumulate_until_flush(self):
+        """Test many forward calls become one observation per flush"""
+        histogram = Histogram("stage_seconds", "Stages", ["stage"])
+        timer = StageTimer(histogram)
+        module = torch.nn.Linear(4, 4)
+        timer.instrument(module, "decode")
+        
+        for _ in range(10):
+            module(torch.zeros(1, 4))
+        timer.flush()
+        
+        assert histogram.summary()[("decode",)]["count"] == 1
+    
+    def test_threads_do_not_mix(self):
+        """Test totals from another thread are flushed by that thread only"""
+        histogram = Histogram("stage_seconds", "Stages", ["stage"])
+        timer = StageTimer(histogram)
+        
+        worker = threading.Thread(target=lambda: timer.add("encode", 1.0))
+        worker.start()
+        worker.join()
+        timer.flush()
+        
+        assert histogram.summary() == {}
+
+
+def test_format_uptime():
+    """Test uptime rendering"""
+    assert format_uptime(90061) == "1d 1h 1m"
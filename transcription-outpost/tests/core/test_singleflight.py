@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test coalescing of identical in-flight work"""
+    
+    async def test_concurrent_callers_share_one_run(self):
+        """Test one computation per key while it is in flight"""
+        flights = SingleFlight("test")
+        runs = 0
+        
+        async def work():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return "result"
+        
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        
+        assert results == ["result"] * 5
+        assert runs == 1
+        assert flights.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+    
+    async def test_finished_work_is_not_reused(self):
+        """Test a later call after completion runs again"""
+        flights = SingleFlight("test")
+        runs = 0
+        
+        async def work():
+            nonlocal runs
+            runs += 1
+            return runs
+        
+        assert await flights.do("k", work) == 1
+        assert await flights.do("k", work) == 2
+    
+    async def test_error_is_shared(self):
+        """Test every waiting caller sees the same failure"""
+        flights = SingleFlight("test")
+        
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+        
+        results = await asyncio.gather(
+            *(flights.do("k", work) for _ in range(3)), return_exceptions=True
+        )
+        
+        assert all(isinstance(result, RuntimeError) for result in results)
+    
+    async def test_leader_cancel_does_not_cancel_followers(self):
+        """Test a caller that gives up leaves the work running for the rest"""
+        flights = SingleFlight("test")
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+        
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        
+        assert await follower == "done"
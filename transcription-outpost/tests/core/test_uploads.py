@@ -0,0 +1,96 @@
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request, UploadFile
+from httpx import ASGITransport, AsyncClient
+
+from app.core.metrics import registry
+from app.core.uploads import FORM_OVERHEAD_BYTES, BodySizeLimitMiddleware, spooled_upload
+
+LIMIT = 1024 * 1024
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=LIMIT, overrides={"/big": 4 * LIMIT})
+    
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"received": len(await request.body())}
+    
+    @app.post("/big")
+    async def big(request: Request):
+        return {"received": len(await request.body())}
+    
+    @app.post("/big/upload")
+    async def upload(file: UploadFile):
+        source = spooled_upload(file)
+        return {"received": len(source.read())}
+    
+    return app
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as client:
+        yield client
+
+
+def _chunks(total: int, size: int = 64 * 1024):
+    async def body():
+        sent = 0
+        while sent < total:
+            chunk = min(size, total - sent)
+            sent += chunk
+            yield b"x" * chunk
+    return body()
+
+
+@pytest.mark.asyncio
+class TestBodySizeLimit:
+    """Test upload limits enforced while the body arrives"""
+    
+    async def test_content_length_over_limit_is_refused(self, client):
+        """Test a declared oversized body is rejected before it is read"""
+        response = await client.post("/echo", content=b"x" * (LIMIT + FORM_OVERHEAD_BYTES + 1))
+        
+        assert response.status_code == 413
+    
+    async def test_chunked_body_is_cut_off(self, client):
+        """Test a body without Content-Length is stopped once it passes the limit"""
+        response = await client.post("/echo", content=_chunks(2 * LIMIT))
+        
+        assert response.status_code == 413
+    
+    async def test_within_limit_passes(self, client):
+        """Test bodies under the limit reach the route, chunked or not"""
+        response = await client.post("/echo", content=_chunks(LIMIT // 2))
+        
+        assert response.status_code == 200
+        assert response.json() == {"received": LIMIT // 2}
+    
+    async def test_path_override(self, client):
+        """Test routes with their own limit accept larger bodies"""
+        response = await client.post("/big", content=_chunks(2 * LIMIT))
+        
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+class TestSpooledUpload:
+    """Test upload memory accounting"""
+    
+    async def test_memory_is_bounded_by_spool_size(self, client):
+        """Test uploads past the spool threshold are held on disk, not in memory"""
+        memory = registry.histogram("upload_memory_bytes", "")
+        before = memory.summary().get((), {}).get("count", 0)
+        
+        small = await client.post("/big/upload", files={"file": ("a.wav", b"x" * 1000)})
+        large = await client.post("/big/upload", files={"file": ("b.wav", b"x" * (3 * LIMIT // 2))})
+        
+        assert small.json() == {"received": 1000}
+        assert large.json() == {"received": 3 * LIMIT // 2}
+        assert memory.summary()[()]["count"] == before + 2
+        lines = [line for line in registry.render_prometheus().splitlines()
+                 if line.startswith("upload_memory_bytes_bucket")]
+        within_spool = [line for line in lines if f'le="{LIMIT}"' in line]
+        assert int(within_spool[0].split()[-1]) >= before + 2  # Both held at most UPLOAD_SPOOL_MB
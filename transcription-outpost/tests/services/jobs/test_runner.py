@@ -0,0 +1,155 @@
+import asyncio
+import os
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.jobs.runner import JobRunner
+from app.services.jobs.store import JobStore
+from app.services.speech.admission import AdmissionController
+from app.services.speech.base import AudioTranscriptionResult
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs"))
+
+
+def queue(store: JobStore, **params) -> str:
+    job_id = store.new_id()
+    os.makedirs(store.audio_dir, exist_ok=True)
+    with open(store.audio_path(job_id, "wav"), "wb") as f:
+        f.write(b"audio")
+    store.create(job_id, "wav", {"provider": "whisper", "model_size": None, **params})
+    return job_id
+
+
+def speech_service(transcribe) -> MagicMock:
+    service = MagicMock()
+    service.transcribe = transcribe
+    return service
+
+
+async def wait_for_status(store: JobStore, job_id: str, status: str) -> dict:
+    for _ in range(200):
+        job = store.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+@pytest.mark.asyncio
+class TestJobRunner:
+    """Test background job workers"""
+    
+    async def test_runs_job_to_completion(self, store):
+        """Test a queued job is transcribed, stored and its audio removed"""
+        async def transcribe(content, file_ext, vad=None, progress=None):
+            assert content.read() == b"audio"
+            progress(0.0, 4.0)
+            return AudioTranscriptionResult(text="hello", confidence=0.9, duration=4.0, model="whisper-base")
+        
+        job_id = queue(store, vad=False)
+        runner = JobRunner(store, workers=1)
+        with patch("app.services.jobs.runner.get_transcription_service",
+                   AsyncMock(return_value=speech_service(transcribe))):
+            runner.start()
+            job = await wait_for_status(store, job_id, "completed")
+            await runner.stop()
+        
+        assert job["result"]["text"] == "hello"
+        assert job["progress_seconds"] == 4.0
+        assert not os.path.exists(store.audio_path(job_id, "wav"))
+        assert runner.completed == 1
+    
+    async def test_job_is_charged_to_admission(self, store):
+        """Test a running job holds compute budget interactive requests can see"""
+        admission = AdmissionController(budget=100.0, max_wait=0.0, default_rtf=1.0, workers=1)
+        held = []
+        
+        async def transcribe(content, file_ext, vad=None, progress=None):
+            held.append(admission.stats()["outstanding_seconds"])
+            return AudioTranscriptionResult(text="hello", confidence=0.9, model="whisper-base")
+        
+        job_id = queue(store)
+        runner = JobRunner(store, workers=1)
+        with patch("app.services.jobs.runner.get_transcription_service",
+                   AsyncMock(return_value=speech_service(transcribe))), \
+             patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration", return_value=40.0):
+            runner.start()
+            await wait_for_status(store, job_id, "completed")
+            await runner.stop()
+        
+        assert held == [40.0]
+        assert admission.stats()["outstanding_seconds"] == 0.0
+    
+    async def test_failure_is_recorded(self, store):
+        """Test a transcription error fails the job with its message"""
+        job_id = queue(store)
+        runner = JobRunner(store, workers=1)
+        with patch("app.services.jobs.runner.get_transcription_service",
+                   AsyncMock(return_value=speech_service(AsyncMock(side_effect=RuntimeError("bad audio"))))):
+            runner.start()
+            job = await wait_for_status(store, job_id, "failed")
+            await runner.stop()
+        
+        assert job["error"] == "bad audio"
+        assert runner.failed == 1
+    
+    async def test_enhancement_failure_keeps_transcript(self, store):
+        """Test an unavailable LLM does not throw away the transcription"""
+        transcribe = AsyncMock(return_value=AudioTranscriptionResult(text="hello", confidence=0.9, model="whisper-base"))
+        job_id = queue(store, enhance=True)
+        runner = JobRunner(store, workers=1)
+        with patch("app.services.jobs.runner.get_transcription_service",
+                   AsyncMock(return_value=speech_service(transcribe))), \
+             patch("app.services.jobs.runner.get_llm_service",
+                   AsyncMock(side_effect=RuntimeError("ollama down"))):
+            runner.start()
+            job = await wait_for_status(store, job_id, "completed")
+            await runner.stop()
+        
+        assert job["result"]["text"] == "hello"
+        assert job["result"]["enhancement_error"] == "ollama down"
+    
+    async def test_stop_requeues_running_job(self, store):
+        """Test a shutdown mid-job hands the job back without spending an attempt"""
+        started = asyncio.Event()
+        
+        async def transcribe(content, file_ext, vad=None, progress=None):
+            started.set()
+            await asyncio.sleep(60)
+        
+        job_id = queue(store)
+        runner = JobRunner(store, workers=1)
+        with patch("app.services.jobs.runner.get_transcription_service",
+                   AsyncMock(return_value=speech_service(transcribe))):
+            runner.start()
+            await asyncio.wait_for(started.wait(), 2)
+            assert runner.progress(job_id) is not None
+            await runner.stop()
+        
+        job = store.get(job_id)
+        assert job["status"] == "queued"
+        assert job["attempts"] == 0
+        assert os.path.exists(store.audio_path(job_id, "wav"))
+    
+    async def test_stats_count_off_the_event_loop(self, store):
+        """Test the queue totals are read on a worker thread"""
+        queue(store)
+        loop_thread = threading.get_ident()
+        counted_on = []
+        counts = store.counts
+        
+        def record_thread():
+            counted_on.append(threading.get_ident())
+            return counts()
+        
+        with patch.object(store, "counts", record_thread):
+            stats = await JobRunner(store, workers=1).stats()
+        
+        assert stats["queue"]["queued"] == 1
+        assert counted_on and counted_on[0] != loop_thread
@@ -0,0 +1,119 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.jobs.store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs"))
+
+
+def queue(store: JobStore, **params) -> str:
+    job_id = store.new_id()
+    os.makedirs(store.audio_dir, exist_ok=True)
+    with open(store.audio_path(job_id, "wav"), "wb") as f:
+        f.write(b"audio")
+    store.create(job_id, "wav", {"provider": "whisper", **params})
+    return job_id
+
+
+class TestJobStore:
+    """Test the SQLite job queue"""
+    
+    def test_create_and_get(self, store):
+        """Test a new job is queued with its parameters"""
+        job_id = queue(store, enhance=True)
+        
+        job = store.get(job_id)
+        
+        assert job["status"] == "queued"
+        assert job["params"] == {"provider": "whisper", "enhance": True}
+        assert job["attempts"] == 0
+        assert store.get("missing") is None
+    
+    def test_claims_oldest_first_once(self, store):
+        """Test each queued job is handed to exactly one claimer, oldest first"""
+        first = queue(store)
+        second = queue(store)
+        
+        claimed = [store.claim(), store.claim(), store.claim()]
+        
+        assert [job["id"] for job in claimed[:2]] == [first, second]
+        assert claimed[2] is None
+        assert store.get(first)["status"] == "running"
+        assert claimed[0]["attempts"] == 1
+    
+    def test_complete_stores_result(self, store):
+        """Test completion records the result and full progress"""
+        job_id = queue(store)
+        job = store.claim()
+        
+        assert store.complete(job_id, job["attempts"], {"text": "hi", "duration": 12.5})
+        
+        stored = store.get(job_id)
+        assert stored["status"] == "completed"
+        assert stored["result"] == {"text": "hi", "duration": 12.5}
+        assert stored["progress_seconds"] == 12.5
+        assert stored["finished_at"] is not None
+    
+    def test_heartbeat_records_progress(self, store):
+        """Test heartbeats persist progress for pollers"""
+        job_id = queue(store)
+        job = store.claim()
+        
+        assert store.heartbeat(job_id, job["attempts"], 30.0, 120.0)
+        
+        stored = store.get(job_id)
+        assert (stored["progress_seconds"], stored["duration"]) == (30.0, 120.0)
+    
+    def test_expired_lease_is_reclaimed(self, store):
+        """Test a job whose worker died is claimed again and the old worker is fenced off"""
+        job_id = queue(store)
+        stale = store.claim(lease_seconds=0.01)
+        time.sleep(0.02)
+        
+        fresh = store.claim()
+        
+        assert fresh["id"] == job_id
+        assert fresh["attempts"] == 2
+        assert not store.complete(job_id, stale["attempts"], {"text": "late"})
+        assert not store.heartbeat(job_id, stale["attempts"], 1.0, 2.0)
+        assert store.complete(job_id, fresh["attempts"], {"text": "ok"})
+    
+    def test_gives_up_after_max_attempts(self, store):
+        """Test a job that keeps losing its worker is eventually failed"""
+        job_id = queue(store)
+        
+        with patch.object(settings, "JOBS_MAX_ATTEMPTS", 2):
+            for _ in range(2):
+                assert store.claim(lease_seconds=0.01)["id"] == job_id
+                time.sleep(0.02)
+            assert store.claim() is None
+        
+        stored = store.get(job_id)
+        assert stored["status"] == "failed"
+        assert "2 attempts" in stored["error"]
+    
+    def test_release_does_not_count_attempt(self, store):
+        """Test a job handed back on shutdown is queued again with its attempts intact"""
+        job_id = queue(store)
+        job = store.claim()
+        
+        assert store.release(job_id, job["attempts"])
+        
+        assert store.get(job_id)["status"] == "queued"
+        assert store.claim()["attempts"] == 1
+    
+    def test_survives_restart(self, store):
+        """Test a new store on the same directory sees the queue"""
+        job_id = queue(store)
+        
+        restarted = JobStore(store.directory)
+        
+        assert restarted.claim()["id"] == job_id
+        assert restarted.counts()["running"] == 1
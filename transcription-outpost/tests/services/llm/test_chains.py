@@ -1,7 +1,11 @@
+import asyncio
+
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from app.core.config import settings
+from app.services.llm.dag import ChainStep
 from app.services.llm.chains.transcription import (
     TranscriptionChain,
     LlamaLLM,
@@ -76,6 +80,60 @@ class TestTranscriptionChain:
         with pytest.raises(Exception, match="Chain processing error"):
             await chain.process_transcription("hello world")
     
+    async def test_chains_run_concurrently(self, mock_llama_service):
+        """Test the process and summary prompts are in flight together"""
+        chain = TranscriptionChain()
+        in_flight, peak = 0, 0
+        
+        async def mock_response(prompt, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            return "text"
+        
+        mock_llama_service.generate_response.side_effect = mock_response
+        
+        await chain.process_transcription("hello world")
+        
+        assert peak == 2
+    
+    async def test_added_step_in_result(self, mock_llama_service):
+        """Test extra steps are run and returned by name"""
+        chain = TranscriptionChain()
+        
+        async def keywords(transcription):
+            return transcription.split()
+        
+        chain.add_step(ChainStep("keywords", keywords))
+        result = await chain.process_transcription("hello world")
+        
+        assert result["keywords"] == ["hello", "world"]
+        assert result["summary"] == "Enhanced transcription text"
+    
+    async def test_long_transcription_map_reduce(self, mock_llama_service):
+        """Test long input is corrected per chunk and summarised map-reduce style"""
+        chain = TranscriptionChain()
+        chain.summarizer.chunk_tokens = 40
+        transcription = " ".join(f"Point {i} was discussed at length." for i in range(40))
+        
+        async def mock_response(prompt, **kwargs):
+            if "correcting any obvious errors" in prompt:
+                return "Fixed."
+            elif "Combine them" in prompt:
+                return "Combined summary"
+            return "Part summary"
+        
+        mock_llama_service.generate_response.side_effect = mock_response
+        
+        result = await chain.process_transcription(transcription)
+        
+        assert result["summary"] == "Combined summary"
+        assert result["processed_text"].startswith("Fixed. Fixed.")
+        prompts = [call.args[0] for call in mock_llama_service.generate_response.call_args_list]
+        assert all(transcription not in prompt for prompt in prompts)
+    
     async def test_llama_llm_async_call(self, mock_llama_service):
         """Test LlamaLLM async call"""
         llm = LlamaLLM()
@@ -83,7 +141,9 @@ class TestTranscriptionChain:
         result = await llm._acall("test prompt")
         
         assert result == "Enhanced transcription text"
-        mock_llama_service.generate_response.assert_called_once_with("test prompt")
+        mock_llama_service.generate_response.assert_called_once_with(
+            "test prompt", temperature=settings.LLM_ENHANCE_TEMPERATURE
+        )
     
     async def test_global_transcription_chain(self):
         """Test global transcription chain instance"""
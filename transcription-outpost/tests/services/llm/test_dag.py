@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm.dag import ChainGraph, ChainStep, ChainStepError
+
+
+def _sleeper(seconds: float, value: str):
+    async def run(**inputs):
+        await asyncio.sleep(seconds)
+        return value
+    return run
+
+
+@pytest.mark.asyncio
+class TestChainGraph:
+    """Test dependency-ordered concurrent chain execution"""
+    
+    async def test_independent_steps_run_concurrently(self):
+        """Test total latency is the slowest step, not the sum"""
+        graph = ChainGraph([
+            ChainStep(name, _sleeper(0.2, name)) for name in ("summary", "keywords", "actions")
+        ])
+        
+        started = time.perf_counter()
+        result = await graph.run(transcription="hello")
+        
+        assert time.perf_counter() - started < 0.45
+        assert result == {"summary": "summary", "keywords": "keywords", "actions": "actions"}
+    
+    async def test_dependent_steps_receive_outputs(self):
+        """Test a step reads the outputs it declares"""
+        async def title(summary, transcription):
+            return f"{summary}|{transcription}"
+        
+        graph = ChainGraph([
+            ChainStep("title", title, inputs=("summary", "transcription")),
+            ChainStep("summary", _sleeper(0.01, "short")),
+        ])
+        
+        result = await graph.run(transcription="hello")
+        
+        assert result["title"] == "short|hello"
+    
+    async def test_concurrency_cap(self):
+        """Test no more than max_concurrency steps run at once"""
+        running, peak = 0, 0
+        
+        async def step(**inputs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+        
+        graph = ChainGraph([ChainStep(f"s{i}", step) for i in range(6)], max_concurrency=2)
+        await graph.run(transcription="hello")
+        
+        assert peak == 2
+    
+    async def test_step_timeout(self):
+        """Test a slow step fails the run with its name"""
+        graph = ChainGraph(
+            [ChainStep("slow", _sleeper(1.0, "late")), ChainStep("fast", _sleeper(0, "ok"))],
+            step_timeout=0.05,
+        )
+        
+        with pytest.raises(ChainStepError, match="'slow' failed: timed out") as error:
+            await graph.run(transcription="hello")
+        assert error.value.step == "slow"
+    
+    async def test_failure_cancels_running_steps(self):
+        """Test the first failure cancels steps still in flight"""
+        cancelled = asyncio.Event()
+        
+        async def slow(**inputs):
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        async def broken(**inputs):
+            raise RuntimeError("backend down")
+        
+        graph = ChainGraph([ChainStep("slow", slow), ChainStep("broken", broken)])
+        
+        with pytest.raises(ChainStepError, match="backend down"):
+            await graph.run(transcription="hello")
+        assert cancelled.is_set()
+    
+    async def test_invalid_graphs(self):
+        """Test cycles, duplicates and missing inputs are rejected"""
+        with pytest.raises(ValueError, match="cycle"):
+            ChainGraph([
+                ChainStep("a", _sleeper(0, "a"), inputs=("b",)),
+                ChainStep("b", _sleeper(0, "b"), inputs=("a",)),
+            ])
+        with pytest.raises(ValueError, match="Duplicate"):
+            ChainGraph([ChainStep("a", _sleeper(0, "a")), ChainStep("a", _sleeper(0, "a"))])
+        with pytest.raises(ValueError, match="missing inputs"):
+            await ChainGraph([ChainStep("a", _sleeper(0, "a"))]).run()
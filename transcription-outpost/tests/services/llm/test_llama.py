@@ -0,0 +1,346 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.services.llm.providers.llama import LlamaService
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    """Minimal Ollama API that keeps connections alive"""
+    
+    protocol_version = "HTTP/1.1"
+    requests: list = []
+    
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        self._reply({"models": [{"name": "llama2:13b-chat"}]})
+    
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(request)
+        if not request.get("stream"):
+            self._reply({
+                "response": " generated text ",
+                "context": [1, 2, 3],
+                "prompt_eval_count": 12,
+                "prompt_eval_duration": 40_000_000,
+            })
+            return
+        
+        chunks = [{"response": token, "done": False} for token in ("Hello", " there", "!")]
+        chunks.append({"response": "", "done": True})
+        body = "".join(json.dumps(chunk) + "\n" for chunk in chunks).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama_url():
+    """Local Ollama stand-in on a free port"""
+    _OllamaHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture
+async def service(ollama_url):
+    """LLaMA service pointed at the local stand-in"""
+    service = LlamaService()
+    service.base_url = ollama_url
+    yield service
+    await service.cleanup()
+
+
+@pytest.mark.asyncio
+class TestPooledClient:
+    """Test the shared keep-alive HTTP client"""
+    
+    async def test_requests_reuse_one_connection(self, service):
+        """Test sequential prompts share a single pooled connection"""
+        await service.initialize()
+        for _ in range(3):
+            assert await service.generate_response("Hello") == "generated text"
+        
+        assert service.stats() == {
+            "requests": 4,
+            "connections_opened": 1,
+            "connections_reused": 3,
+        }
+    
+    async def test_client_is_reused_and_closed(self, service):
+        """Test one client per service, closed by cleanup"""
+        client = service.client
+        assert service.client is client
+        
+        await service.cleanup()
+        
+        assert client.is_closed
+        assert service.client is not client
+    
+    async def test_missing_model_fails_initialize(self, service):
+        """Test the async health check rejects an unpulled model"""
+        service.model = "missing:7b"
+        with pytest.raises(RuntimeError, match="not found"):
+            await service.initialize()
+    
+    async def test_http_errors_are_raised(self):
+        """Test a backend error surfaces instead of a missing key"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(500))
+        service = LlamaService(transport=transport)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.generate_response("Hello")
+        await service.cleanup()
+    
+    async def test_process_transcription_runs_prompts_concurrently(self):
+        """Test correction and summary are requested side by side"""
+        service = LlamaService()
+        
+        async def slow_response(prompt, **kwargs):
+            await asyncio.sleep(0.2)
+            return "summary" if "summary" in prompt else "corrected"
+        
+        async def context(transcription):
+            return [1, 2, 3]
+        
+        service.generate_response = slow_response
+        service.prime_context = context
+        started = time.perf_counter()
+        result = await service.process_transcription("hello")
+        
+        assert time.perf_counter() - started < 0.35
+        assert result == {"processed_text": "corrected", "summary": "summary"}
+
+
+
+@pytest.mark.asyncio
+class TestStreaming:
+    """Test token streaming from Ollama"""
+    
+    async def test_stream_response_yields_tokens(self, service):
+        """Test NDJSON chunks become individual tokens"""
+        tokens = [token async for token in service.stream_response("Hello")]
+        
+        assert tokens == ["Hello", " there", "!"]
+    
+    async def test_stream_error_chunk_raises(self):
+        """Test an in-stream Ollama error is raised"""
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=b'{"error": "model not loaded"}\n')
+        )
+        service = LlamaService(transport=transport)
+        
+        with pytest.raises(RuntimeError, match="model not loaded"):
+            async for _ in service.stream_response("Hello"):
+                pass
+        await service.cleanup()
+    
+    async def test_stream_transcription_interleaves_fields(self):
+        """Test both fields stream concurrently"""
+        service = LlamaService()
+        
+        async def fake_stream(prompt, **kwargs):
+            delay = 0.01 if "summary" in prompt else 0.015
+            for token in ("a", "b", "c"):
+                await asyncio.sleep(delay)
+                yield token
+        
+        service.stream_response = fake_stream
+        service.prime_context = AsyncMock(return_value=[1, 2, 3])
+        pairs = [pair async for pair in service.stream_transcription("hello")]
+        
+        fields = [field for field, _ in pairs]
+        assert sorted(fields) == ["processed_text"] * 3 + ["summary"] * 3
+        assert fields != sorted(fields) and fields != sorted(fields, reverse=True)
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    """Enabled LLM cache backed by a temporary database"""
+    cache = TieredCache("llm_responses", db_path=str(tmp_path / "llm.db"), ttl=60)
+    with patch.object(settings, "CACHE_ENABLED", True), \
+            patch("app.services.llm.providers.llama.llm_cache", cache):
+        yield cache
+
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    """Test caching of identical prompts"""
+    
+    async def test_repeated_prompt_served_from_cache(self, service, response_cache):
+        """Test only the first identical prompt reaches Ollama"""
+        for _ in range(3):
+            assert await service.generate_response("Summarise this", temperature=0.0) == "generated text"
+        
+        assert service.stats()["requests"] == 1
+        assert response_cache.stats()["memory_hits"] == 2
+        assert response_cache.stats()["misses"] == 1
+    
+    async def test_sampling_parameters_change_key(self, service, response_cache):
+        """Test a different temperature is a different cache entry"""
+        await service.generate_response("Summarise this", temperature=0.0)
+        await service.generate_response("Summarise this", temperature=0.9, cache=True)
+        await service.generate_response("Summarise this", temperature=0.9, cache=True)
+        
+        assert service.stats()["requests"] == 2
+    
+    async def test_sampled_responses_not_cached_by_default(self, service, response_cache):
+        """Test output sampled at a non-zero temperature is drawn afresh each time"""
+        for _ in range(2):
+            await service.generate_response("Write a poem", temperature=0.7)
+        
+        assert service.stats()["requests"] == 2
+        assert response_cache.stats()["memory_entries"] == 0
+    
+    async def test_bypass_flag(self, service, response_cache):
+        """Test cache=False always calls Ollama and stores nothing"""
+        for _ in range(2):
+            await service.generate_response("Write a poem", cache=False)
+        
+        assert service.stats()["requests"] == 2
+        assert response_cache.stats()["memory_entries"] == 0
+    
+    async def test_completed_stream_is_cached(self, service, response_cache):
+        """Test a finished stream is replayed from cache as one chunk"""
+        first = [token async for token in service.stream_response("Hello", temperature=0.0)]
+        second = [token async for token in service.stream_response("Hello", temperature=0.0)]
+        
+        assert first == ["Hello", " there", "!"]
+        assert second == ["Hello there!"]
+        assert service.stats()["requests"] == 1
+    
+    async def test_repeated_enhancement_served_from_cache(self, service, response_cache):
+        """Test processing the same transcript twice reaches Ollama only the first time"""
+        transcription = "we agreed to ship the release on friday"
+        first = await service.process_transcription(transcription)
+        sent = service.stats()["requests"]
+        
+        second = await service.process_transcription(transcription)
+        
+        assert second == first
+        assert service.stats()["requests"] == sent
+        assert response_cache.stats()["memory_hits"] >= 2
+    
+    async def test_streamed_enhancement_served_from_cache(self, service, response_cache):
+        """Test streaming the same transcript twice reaches Ollama only the first time"""
+        first = [pair async for pair in service.stream_transcription("hello")]
+        sent = service.stats()["requests"]
+        
+        second = [pair async for pair in service.stream_transcription("hello")]
+        
+        assert service.stats()["requests"] == sent
+        assert sorted(second) == [("processed_text", "Hello there!"), ("summary", "Hello there!")]
+    
+    async def test_appended_transcript_resummarizes_only_the_tail(self, service, response_cache):
+        """Test earlier chunk summaries of a growing transcript come from the cache"""
+        service.summarizer.chunk_tokens = 40
+        # Four sentences per chunk: the appended four are exactly one new chunk
+        sentences = [f"Point {letter} was discussed at length." for letter in "ABCDEFGHIJKL"]
+        await service._summarize(" ".join(sentences[:8]))
+        _OllamaHandler.requests = []
+        
+        await service._summarize(" ".join(sentences))
+        
+        prompts = [request["prompt"] for request in _OllamaHandler.requests]
+        assert len(prompts) == 2
+        assert "Point I " in prompts[0] and "Point H " not in prompts[0]
+        assert "summaries of consecutive parts" in prompts[1]
+    
+    async def test_cache_hits_are_stripped_on_both_paths(self, service, response_cache):
+        """Test streamed and whole responses replay the same text from one entry"""
+        await response_cache.aset(service._request_key("Hi", 0.0, 0.95), " Hi there\n")
+        
+        streamed = [token async for token in service.stream_response("Hi", temperature=0.0)]
+        
+        assert streamed == ["Hi there"]
+        assert await service.generate_response("Hi", temperature=0.0) == "Hi there"
+        assert service.stats()["requests"] == 0
+
+
+
+@pytest.mark.asyncio
+class TestSharedContext:
+    """Test transcript context reuse and keep-alive"""
+    
+    async def test_requests_carry_keep_alive_and_options(self, service):
+        """Test every call pins the model and passes sampling as options"""
+        await service.generate_response("Hello", temperature=0.2)
+        
+        request = _OllamaHandler.requests[-1]
+        assert request["keep_alive"] == settings.OLLAMA_KEEP_ALIVE
+        assert request["options"] == {"temperature": 0.2, "top_p": 0.95}
+    
+    async def test_instructions_branch_from_primed_context(self, service):
+        """Test the transcript is sent once and both instructions reuse its context"""
+        transcription = "we agreed to ship the release on friday"
+        
+        result = await service.process_transcription(transcription)
+        
+        assert result == {"processed_text": "generated text", "summary": "generated text"}
+        prompts = [request["prompt"] for request in _OllamaHandler.requests]
+        assert sum(transcription in prompt for prompt in prompts) == 1
+        branches = [request for request in _OllamaHandler.requests if "context" in request]
+        assert len(branches) == 2
+        assert all(request["context"] == [1, 2, 3] for request in branches)
+    
+    async def test_prompt_eval_is_recorded(self, service):
+        """Test Ollama's prompt-eval timing is reported per call"""
+        from app.core.metrics import stage_latency
+        before = stage_latency.summary().get(("llm_prompt_eval",), {}).get("count", 0)
+        
+        await service.generate_response("Hello")
+        
+        assert stage_latency.summary()[("llm_prompt_eval",)]["count"] == before + 1
+    
+    async def test_falls_back_to_full_prompts(self, service):
+        """Test a failed prime sends the transcript with each instruction"""
+        service.prime_context = AsyncMock(side_effect=KeyError("context"))
+        
+        await service.process_transcription("short meeting")
+        
+        assert all("short meeting" in request["prompt"] for request in _OllamaHandler.requests)
+        assert len(_OllamaHandler.requests) == 2
+
+
+@pytest.mark.asyncio
+class TestCoalescing:
+    """Test identical in-flight prompts are sent once"""
+    
+    async def test_concurrent_identical_prompts_share_one_request(self, service):
+        """Test simultaneous identical prompts reach Ollama once"""
+        results = await asyncio.gather(*(service.generate_response("Same") for _ in range(3)))
+        
+        assert results == ["generated text"] * 3
+        assert service.stats()["requests"] == 1
+    
+    async def test_bypass_flag_is_not_coalesced(self, service):
+        """Test cache=False callers each get their own sample"""
+        await asyncio.gather(*(service.generate_response("Same", cache=False) for _ in range(3)))
+        
+        assert service.stats()["requests"] == 3
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.services.llm.mapreduce import MapReduceSummarizer, estimate_tokens, split_by_tokens
+
+
+def _transcript(sentences: int) -> str:
+    return " ".join(f"Sentence number {i} of the meeting." for i in range(sentences))
+
+
+class TestSplitByTokens:
+    """Test token-budget chunking"""
+    
+    def test_chunks_fit_budget_at_sentence_ends(self):
+        """Test every chunk is within budget and ends a sentence"""
+        chunks = split_by_tokens(_transcript(50), budget=40)
+        
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks) == _transcript(50)
+    
+    def test_appending_keeps_earlier_chunks(self):
+        """Test new audio only changes the tail chunk"""
+        before = split_by_tokens(_transcript(50), budget=40)
+        after = split_by_tokens(_transcript(60), budget=40)
+        
+        assert after[:len(before) - 1] == before[:-1]
+    
+    def test_unpunctuated_text_splits_between_words(self):
+        """Test run-on text is still cut to budget"""
+        chunks = split_by_tokens("word " * 200, budget=20)
+        
+        assert all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+        assert sum(len(chunk.split()) for chunk in chunks) == 200
+
+
+@pytest.mark.asyncio
+class TestMapReduceSummarizer:
+    """Test concurrent map and hierarchical reduce"""
+    
+    async def test_short_text_is_one_call(self):
+        """Test text within budget is summarised directly"""
+        calls = []
+        
+        async def summarize(text):
+            calls.append(text)
+            return "summary"
+        
+        summarizer = MapReduceSummarizer(summarize, summarize, chunk_tokens=1000)
+        
+        assert await summarizer.summarize("Short text.") == "summary"
+        assert calls == ["Short text."]
+    
+    async def test_long_text_reduces_to_one_summary(self):
+        """Test chunks are summarised then combined level by level"""
+        combined = []
+        
+        async def summarize(text):
+            return "S" * 40
+        
+        async def combine(text):
+            combined.append(text.count("\n\n") + 1)
+            return "C" * 40
+        
+        summarizer = MapReduceSummarizer(summarize, combine, chunk_tokens=40)
+        result = await summarizer.summarize(_transcript(100))
+        
+        assert result == "C" * 40
+        assert len(combined) > 1  # More than one reduce level
+        assert all(size >= 2 for size in combined)
+    
+    async def test_concurrency_limit(self):
+        """Test chunk summaries run concurrently but within the cap"""
+        running, peak = 0, 0
+        
+        async def summarize(text):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "s"
+        
+        summarizer = MapReduceSummarizer(summarize, summarize, chunk_tokens=40, max_concurrency=3)
+        await summarizer.map(_transcript(100), summarize)
+        
+        assert peak == 3
+    
+    async def test_appended_audio_reuses_chunk_prompts(self):
+        """Test a longer transcript repeats the earlier chunk prompts verbatim"""
+        prompts = []
+        
+        async def summarize(text):
+            prompts.append(text)
+            return "s"
+        
+        summarizer = MapReduceSummarizer(summarize, summarize, chunk_tokens=40)
+        await summarizer.summarize(_transcript(50))
+        first = set(prompts)
+        prompts.clear()
+        await summarizer.summarize(_transcript(55))
+        
+        assert len(set(prompts) - first) <= 3  # New tail chunk plus the combines above it
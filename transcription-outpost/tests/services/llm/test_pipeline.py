@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.llm.mapreduce import MapReduceSummarizer
+from app.services.llm.pipeline import EnhancementPipeline
+
+
+def _segments(*texts: str) -> list:
+    return [{"start": float(i), "end": float(i + 1), "text": f" {text}"} for i, text in enumerate(texts)]
+
+
+def _pipeline(calls: list, batch_tokens: int = 5) -> EnhancementPipeline:
+    async def correct(text: str) -> str:
+        calls.append(("correct", text))
+        return text.upper()
+    
+    async def summarize(text: str) -> str:
+        calls.append(("summarize", text))
+        return f"<{text}>"
+    
+    async def combine(text: str) -> str:
+        calls.append(("combine", text))
+        return "combined"
+    
+    return EnhancementPipeline(
+        correct, MapReduceSummarizer(summarize, combine, chunk_tokens=1000), batch_tokens=batch_tokens
+    )
+
+
+@pytest.mark.asyncio
+class TestEnhancementPipeline:
+    """Test enhancement overlapping transcription"""
+    
+    async def test_batches_start_before_finish(self):
+        """Test a full batch is sent to the LLM while transcription is still running"""
+        calls = []
+        pipeline = _pipeline(calls)
+        
+        pipeline.feed(_segments("first part of the talk"))
+        await asyncio.sleep(0.01)
+        
+        assert ("correct", "first part of the talk") in calls
+        
+        segments = _segments("first part of the talk", "the end")
+        result = await pipeline.finish(segments, "first part of the talk the end")
+        
+        assert result["processed_text"] == "FIRST PART OF THE TALK THE END"
+        assert result["summary"] == "combined"
+        assert ("correct", "the end") in calls  # Only the unfed tail was sent at the end
+    
+    async def test_whole_transcript_when_nothing_was_fed(self):
+        """Test providers without early segments still get enhanced"""
+        calls = []
+        pipeline = _pipeline(calls, batch_tokens=1000)
+        
+        result = await pipeline.finish(_segments("hello", "world"), "hello world")
+        
+        assert result == {"processed_text": "HELLO WORLD", "summary": "<hello world>"}
+        assert [name for name, _ in calls] == ["correct", "summarize"]
+    
+    async def test_text_without_segments(self):
+        """Test the plain text is used when a result has no segments"""
+        result = await _pipeline([], batch_tokens=1000).finish(None, "just text")
+        
+        assert result["processed_text"] == "JUST TEXT"
+    
+    async def test_empty_transcript(self):
+        """Test silence produces no LLM calls"""
+        calls = []
+        
+        result = await _pipeline(calls).finish([], "")
+        
+        assert result == {"processed_text": "", "summary": ""}
+        assert calls == []
+    
+    async def test_feed_from_worker_thread(self):
+        """Test segments can be fed from the inference thread"""
+        calls = []
+        pipeline = _pipeline(calls)
+        
+        thread = threading.Thread(target=pipeline.feed, args=(_segments("spoken in a worker thread"),))
+        thread.start()
+        thread.join()
+        result = await pipeline.finish(_segments("spoken in a worker thread"), "")
+        
+        assert result["processed_text"] == "SPOKEN IN A WORKER THREAD"
+        assert len([name for name, _ in calls if name == "correct"]) == 1
+    
+    async def test_timings(self):
+        """Test per-stage timings are reported once finished"""
+        pipeline = _pipeline([])
+        pipeline.feed(_segments("enough text for one batch"))
+        await pipeline.finish(_segments("enough text for one batch"), "")
+        
+        timings = pipeline.timings()
+        
+        assert set(timings) == {"transcribe_ms", "enhance_ms", "enhance_after_transcribe_ms", "total_ms"}
+        assert all(value is not None and value >= 0 for value in timings.values())
+    
+    async def test_failure_cancels_other_batches(self):
+        """Test a failed batch cancels the rest and propagates"""
+        started = asyncio.Event()
+        
+        async def slow(text: str) -> str:
+            started.set()
+            await asyncio.sleep(10)
+            return text
+        
+        async def broken(text: str) -> str:
+            await started.wait()
+            raise RuntimeError("ollama down")
+        
+        pipeline = EnhancementPipeline(
+            slow, MapReduceSummarizer(broken, broken, chunk_tokens=1000), batch_tokens=1000
+        )
+        
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pipeline.finish(None, "some text"), 2)
@@ -0,0 +1,248 @@
+import asyncio
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.audio import decode_audio
+from app.core.config import settings
+from app.services.speech.admission import (
+    FALLBACK_BYTES_PER_SECOND,
+    AdmissionController,
+    AdmissionRejectedError,
+    AudioTooLongError,
+    transcribe_admitted,
+)
+from app.services.speech.base import AudioTranscriptionResult
+from app.services.speech.executor import InferenceQueueFullError
+
+
+def controller(**kwargs) -> AdmissionController:
+    options = {"budget": 100.0, "max_wait": 5.0, "default_rtf": 1.0, "workers": 1}
+    return AdmissionController(**{**options, **kwargs})
+
+
+def speech_service(**kwargs) -> MagicMock:
+    """Speech service with nothing in its result cache"""
+    return MagicMock(model_name="base", cached=AsyncMock(return_value=None), **kwargs)
+
+
+class TestCostEstimate:
+    """Test estimating compute from audio duration"""
+    
+    def test_default_until_measured(self):
+        """Test the default real-time factor is used before any inference"""
+        admission = controller(default_rtf=0.5)
+        assert admission.estimate("base", 60.0) == 30.0
+        assert admission.estimate("base", None) == 0.0
+    
+    def test_measured_rtf_weights_by_audio_length(self):
+        """Test measurements replace the default and long audio counts for more"""
+        admission = controller()
+        admission.observe("base", 600.0, 60.0)
+        admission.observe("base", 2.0, 2.0)  # Padded short clip
+        
+        assert admission.rtf("base") == pytest.approx(0.1, abs=0.01)
+        assert admission.rtf("small") == 1.0  # Tracked per model
+    
+    def test_remote_workers_share_the_budget(self):
+        """Test HTTP workers of one inference server each admit their share"""
+        with patch.object(settings, "ADMISSION_BUDGET_SECONDS", 600.0), \
+             patch.object(settings, "INFERENCE_WORKERS", 2), \
+             patch.object(settings, "WEB_CONCURRENCY", 4):
+            with patch.object(settings, "INFERENCE_REMOTE", False):
+                local = AdmissionController()
+            with patch.object(settings, "INFERENCE_REMOTE", True):
+                remote = AdmissionController()
+        
+        assert (local.budget, local.workers) == (600.0, 2)
+        assert (remote.budget, remote.workers) == (150.0, 0.5)
+
+
+@pytest.mark.asyncio
+class TestAdmission:
+    """Test admit, queue and reject decisions"""
+    
+    async def test_admits_within_budget(self):
+        """Test requests that fit are admitted and release their cost"""
+        admission = controller()
+        async with admission.admit("base", 40.0) as cost:
+            assert cost == 40.0
+            async with admission.admit("base", 60.0):
+                assert admission.stats()["outstanding_seconds"] == 100.0
+        assert admission.stats()["outstanding_seconds"] == 0.0
+        assert admission.admitted == 2
+    
+    async def test_rejects_with_drain_time(self):
+        """Test Retry-After is the time for the backlog to make room"""
+        admission = controller(workers=2)
+        async with admission.admit("base", 90.0):
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                async with admission.admit("base", 50.0):
+                    pass
+        
+        # 40 compute-seconds over budget, drained by two workers
+        assert rejected.value.retry_after == 20
+        assert isinstance(rejected.value, InferenceQueueFullError)
+        assert admission.rejected == 1
+    
+    async def test_queues_short_wait(self):
+        """Test a request that will fit soon waits in line instead of failing"""
+        admission = controller()
+        order = []
+        
+        async def short_clip():
+            async with admission.admit("base", 3.0):
+                order.append("clip")
+        
+        async with admission.admit("base", 99.0):
+            waiting = asyncio.create_task(short_clip())
+            await asyncio.sleep(0.01)
+            assert admission.stats()["waiting"] == 1
+            order.append("long done")
+        await waiting
+        
+        assert order == ["long done", "clip"]
+        assert admission.queued == 1
+        assert admission.stats()["outstanding_seconds"] == 0.0
+    
+    async def test_too_long_for_budget(self):
+        """Test audio costing more than the whole budget is refused outright"""
+        admission = controller()
+        with pytest.raises(AudioTooLongError):
+            async with admission.admit("base", 3 * 3600.0):
+                pass
+    
+    async def test_cancelled_waiter_leaves_line(self):
+        """Test a client that goes away while queued frees its place"""
+        admission = controller()
+        async with admission.admit("base", 99.0):
+            waiting = asyncio.create_task(admission.admit("base", 3.0).__aenter__())
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            assert admission.stats()["waiting"] == 0
+        assert admission.stats()["outstanding_seconds"] == 0.0
+    
+    async def test_background_work_holds_budget_after_the_line(self):
+        """Test jobs wait behind interactive requests and are charged while they run"""
+        admission = controller()
+        order = []
+        
+        async def job():
+            async with admission.reserve("base", 50.0) as cost:
+                order.append(("job", cost, admission.stats()["waiting"]))
+                # Interactive requests now see the job's share as taken
+                with pytest.raises(AdmissionRejectedError):
+                    async with admission.admit("base", 60.0):
+                        pass
+        
+        async def clip():
+            async with admission.admit("base", 25.0):
+                order.append(("clip", 25.0))
+        
+        async with admission.admit("base", 80.0):
+            background = asyncio.create_task(job())
+            await asyncio.sleep(0.01)
+            interactive = asyncio.create_task(clip())
+            await asyncio.sleep(0.01)
+            assert admission.stats()["background_waiting"] == 1
+            assert admission.stats()["waiting"] == 1
+        await asyncio.gather(interactive, background)
+        
+        # Started only once the clip that arrived later had left the line
+        assert sorted(order) == [("clip", 25.0), ("job", 50.0, 0)]
+        assert admission.stats()["outstanding_seconds"] == 0.0
+        assert admission.reserved == 1
+    
+    async def test_background_work_longer_than_budget_holds_all_of_it(self):
+        """Test a job is never refused and at most takes the whole budget"""
+        admission = controller()
+        async with admission.reserve("base", 3 * 3600.0) as cost:
+            assert cost == 100.0
+            with pytest.raises(AdmissionRejectedError):
+                async with admission.admit("base", 10.0):
+                    pass
+
+
+@pytest.mark.asyncio
+class TestTranscribeAdmitted:
+    """Test probing and admitting around a transcription"""
+    
+    async def test_probes_before_transcribing(self):
+        """Test the probed duration is charged while the service runs"""
+        admission = controller()
+        service = speech_service()
+        
+        async def transcribe(content, file_ext, vad=None):
+            assert admission.stats()["outstanding_seconds"] == 42.0
+            return "result"
+        
+        service.transcribe = AsyncMock(side_effect=transcribe)
+        with patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration", return_value=42.0):
+            assert await transcribe_admitted(service, b"audio", "wav", vad=False) == "result"
+        
+        service.transcribe.assert_awaited_once_with(b"audio", "wav", vad=False)
+    
+    async def test_wav_request_spawns_no_subprocess(self, test_data_dir):
+        """Test a WAV upload is probed and decoded without ffprobe or ffmpeg"""
+        content = (test_data_dir / "simple.wav").read_bytes()
+        service = speech_service()
+        
+        async def transcribe(content, file_ext, vad=None):
+            return len(decode_audio(content))
+        
+        service.transcribe = AsyncMock(side_effect=transcribe)
+        spawned = AssertionError("subprocess spawned")
+        with patch("app.services.speech.admission.admission_controller", controller()), \
+             patch("subprocess.Popen", side_effect=spawned), \
+             patch("asyncio.create_subprocess_exec", side_effect=spawned):
+            assert await transcribe_admitted(service, content, "wav") > 0
+    
+    async def test_cached_transcript_skips_probe_and_budget(self):
+        """Test a cache hit is served even when the budget is exhausted"""
+        admission = controller(max_wait=0.0)
+        admission._outstanding = 100.0
+        cached = AudioTranscriptionResult(text="cached", confidence=0.9, duration=4.0, model="whisper")
+        service = speech_service(transcribe=AsyncMock())
+        service.cached = AsyncMock(return_value=cached)
+        progress = MagicMock()
+        
+        with patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration") as probe:
+            result = await transcribe_admitted(service, b"audio", "wav", vad=True, progress=progress)
+        
+        assert result is cached
+        service.cached.assert_awaited_once_with(b"audio", vad=True)
+        probe.assert_not_called()
+        service.transcribe.assert_not_awaited()
+        progress.assert_called_once_with(4.0, 4.0)
+    
+    async def test_unprobeable_audio_is_priced_by_size(self):
+        """Test audio without a readable duration is charged by its size, not admitted free"""
+        admission = controller()
+        service = speech_service()
+        
+        async def transcribe(content, file_ext):
+            assert admission.stats()["outstanding_seconds"] == pytest.approx(10.0)
+            return "result"
+        
+        service.transcribe = AsyncMock(side_effect=transcribe)
+        content = b"\0" * (FALLBACK_BYTES_PER_SECOND * 10)
+        with patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration", return_value=None):
+            assert await transcribe_admitted(service, io.BytesIO(content), "mp3") == "result"
+    
+    async def test_rejected_before_decoding(self):
+        """Test an over-budget request never reaches the service"""
+        admission = controller()
+        service = speech_service(transcribe=AsyncMock())
+        
+        with patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration", return_value=3 * 3600.0):
+            with pytest.raises(AudioTooLongError):
+                await transcribe_admitted(service, b"audio", "wav")
+        
+        service.transcribe.assert_not_awaited()
@@ -0,0 +1,210 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from whisper.model import ModelDimensions, Whisper
+
+from app.services.speech.batching import BatchScheduler
+from app.services.speech.executor import InferenceExecutor, InferenceQueueFullError
+from app.services.speech.providers.whisper import WhisperService
+
+
+def tiny_whisper() -> Whisper:
+    """Randomly initialised single-layer Whisper, enough to exercise real tensors"""
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1,
+    )
+    model = Whisper(dims).eval()
+    # Some parameters are allocated with torch.empty; give them defined values
+    with torch.no_grad():
+        for param in model.parameters():
+            param.normal_(std=0.02)
+    return model
+
+
+@pytest.mark.asyncio
+class TestBatchScheduler:
+    """Test dynamic micro-batching"""
+
+    async def test_concurrent_requests_share_a_batch(self):
+        """Test requests arriving within the window run as one batch"""
+        batches = []
+
+        def batch_fn(items):
+            batches.append(len(items))
+            return [item * 2 for item in items]
+
+        scheduler = BatchScheduler(
+            batch_fn, window_ms=50, max_batch_size=8, executor=InferenceExecutor(1, 4)
+        )
+
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [5]
+        assert scheduler.average_batch_size == 5.0
+        await scheduler.close()
+
+    async def test_max_batch_size_splits_batches(self):
+        """Test batches never exceed the configured size"""
+        batches = []
+
+        def batch_fn(items):
+            batches.append(len(items))
+            return items
+
+        scheduler = BatchScheduler(
+            batch_fn, window_ms=50, max_batch_size=3, executor=InferenceExecutor(1, 4)
+        )
+
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(7)))
+
+        assert results == list(range(7))
+        assert max(batches) <= 3
+        assert sum(batches) == 7
+        await scheduler.close()
+
+    async def test_zero_window_runs_immediately(self):
+        """Test a zero window dispatches without waiting for company"""
+        scheduler = BatchScheduler(
+            lambda items: items, window_ms=0, max_batch_size=8, executor=InferenceExecutor(1, 4)
+        )
+
+        assert await asyncio.wait_for(scheduler.submit("solo"), timeout=1) == "solo"
+        await scheduler.close()
+
+    async def test_batch_errors_reach_every_caller(self):
+        """Test a failing batch raises for each request in it"""
+        def batch_fn(items):
+            raise RuntimeError("model exploded")
+
+        scheduler = BatchScheduler(
+            batch_fn, window_ms=20, max_batch_size=4, executor=InferenceExecutor(1, 4)
+        )
+
+        results = await asyncio.gather(
+            scheduler.submit(1), scheduler.submit(2), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        await scheduler.close()
+
+    async def test_rejects_when_backlog_full(self):
+        """Test submissions beyond the pending bound are rejected"""
+        release = threading.Event()
+
+        def batch_fn(items):
+            release.wait()
+            return items
+
+        scheduler = BatchScheduler(
+            batch_fn, window_ms=0, max_batch_size=1, executor=InferenceExecutor(1, 0)
+        )
+        waiting = []
+        for i in range(3):
+            # Running on the worker, held by the collector, waiting in the queue
+            waiting.append(asyncio.create_task(scheduler.submit(i)))
+            await asyncio.sleep(0.05)
+
+        with pytest.raises(InferenceQueueFullError):
+            await scheduler.submit(99)
+
+        release.set()
+        assert await asyncio.gather(*waiting) == [0, 1, 2]
+        await scheduler.close()
+
+
+@pytest.mark.asyncio
+class TestWhisperBatching:
+    """Test Whisper's batched transcription path"""
+
+    async def test_transcribe_batch_returns_one_result_per_clip(self):
+        """Test stacked mel batches decode into per-clip results"""
+        service = WhisperService()
+        service.model = tiny_whisper()
+        clips = [np.zeros(16000 * n, dtype=np.float32) for n in (1, 2, 3)]
+
+        results = service._transcribe_batch([(clip, None) for clip in clips])
+
+        assert len(results) == 3
+        for clip, result in zip(clips, results):
+            assert isinstance(result["text"], str)
+            assert result["language"]
+            assert result["segments"][0]["end"] == pytest.approx(len(clip) / 16000)
+            assert 0.0 <= result["segments"][0]["no_speech_prob"] <= 1.0
+
+    async def test_transcribe_batch_honours_language(self):
+        """Test clips with a fixed language are decoded in that language"""
+        service = WhisperService()
+        service.model = tiny_whisper()
+        clip = np.zeros(16000, dtype=np.float32)
+
+        results = service._transcribe_batch([(clip, "de"), (clip, None), (clip, "de")])
+
+        assert results[0]["language"] == "de"
+        assert results[2]["language"] == "de"
+
+    async def test_failed_decodes_retry_at_fallback_temperatures(self):
+        """Test only clips failing model.transcribe's checks are decoded again, hotter"""
+        service = WhisperService()
+        service.model = tiny_whisper()
+        clips = [np.zeros(16000, dtype=np.float32) for _ in range(3)]
+        calls = []
+        
+        def decode(model, mel, options):
+            calls.append((options.temperature, mel.shape[0]))
+            quality = {
+                0.0: [(-0.3, 1.5), (-1.5, 1.5), (-0.3, 3.0)],  # Fine, unsure, repetitive
+                0.2: [(-1.2, 1.5), (-0.4, 1.5)],
+                0.4: [(-0.5, 1.5)],
+            }[options.temperature]
+            return [
+                MagicMock(text=f"t={options.temperature}", language="en", avg_logprob=logprob,
+                          compression_ratio=ratio, no_speech_prob=0.1)
+                for logprob, ratio in quality
+            ]
+        
+        with patch("app.services.speech.providers.whisper.whisper.decode", side_effect=decode):
+            results = service._transcribe_batch([(clip, "en") for clip in clips])
+        
+        assert calls == [(0.0, 3), (0.2, 2), (0.4, 1)]
+        assert [result["text"] for result in results] == ["t=0.0", "t=0.4", "t=0.2"]
+    
+    async def test_short_clips_use_batcher(self):
+        """Test clips under 30 s go through the batch scheduler"""
+        service = WhisperService()
+        service.model = MagicMock()
+        service.batcher = MagicMock()
+        service.batcher.submit = AsyncMock(return_value={
+            "text": " batched",
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "no_speech_prob": 0.2}],
+        })
+
+        with patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(16000, dtype=np.float32)):
+            result = await service.transcribe(b"audio", "wav", vad=False)
+
+        assert result.text == "batched"
+        assert result.confidence == pytest.approx(0.8)
+        service.model.transcribe.assert_not_called()
+
+    async def test_long_clips_bypass_batcher(self):
+        """Test clips over 30 s use sequential long-form transcription"""
+        service = WhisperService()
+        service.model = MagicMock()
+        service.model.transcribe.return_value = {"text": "long", "segments": [], "language": "en"}
+        service.batcher = MagicMock()
+        service.batcher.submit = AsyncMock()
+
+        with patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(16000 * 31, dtype=np.float32)):
+            result = await service.transcribe(b"audio", "wav", vad=False)
+
+        assert result.text == "long"
+        service.batcher.submit.assert_not_called()
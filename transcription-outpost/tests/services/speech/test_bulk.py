@@ -0,0 +1,201 @@
+import asyncio
+import io
+import zipfile
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.speech.base import AudioTranscriptionResult
+from app.services.speech.bulk import (
+    BatchInputError,
+    BatchItem,
+    items_from_manifest,
+    items_from_zip,
+    transcribe_batch,
+)
+from app.services.speech.executor import InferenceQueueFullError
+
+
+def speech_service(transcribe) -> MagicMock:
+    service = MagicMock()
+    service.transcribe = transcribe
+    service.cached = AsyncMock(return_value=None)
+    return service
+
+
+def clip(name: str, content: bytes = b"audio") -> BatchItem:
+    return BatchItem(name, lambda: content, len(content))
+
+
+def zip_archive(members: dict) -> io.BytesIO:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as bundle:
+        for name, content in members.items():
+            bundle.writestr(name, content)
+    archive.seek(0)
+    return archive
+
+
+async def collect(records) -> list:
+    return [record async for record in records]
+
+
+class TestBatchInputs:
+    """Test reading the clips of a batch request"""
+
+    def test_zip_members(self):
+        """Test audio members are listed and folders and dotfiles skipped"""
+        archive = zip_archive({"a.wav": b"one", "calls/b.mp3": b"two", "__MACOSX/._a.wav": b"x"})
+        items = list(items_from_zip(archive))
+
+        assert [item.name for item in items] == ["a.wav", "calls/b.mp3"]
+        assert items[1].ext == "mp3"
+        assert items[1].open() == b"two"
+
+    def test_corrupt_zip(self):
+        """Test an unreadable archive rejects the request"""
+        with pytest.raises(BatchInputError):
+            list(items_from_zip(io.BytesIO(b"not a zip")))
+
+    def test_manifest_paths(self, tmp_path):
+        """Test JSON and line-per-path manifests resolve under the local root"""
+        (tmp_path / "a.wav").write_bytes(b"one")
+        (tmp_path / "b.wav").write_bytes(b"two")
+
+        with patch.object(settings, "BATCH_LOCAL_ROOT", str(tmp_path)):
+            assert [item.name for item in items_from_manifest('["a.wav", "b.wav"]')] == ["a.wav", "b.wav"]
+            items = list(items_from_manifest("a.wav\n\nb.wav\n"))
+
+        assert len(items) == 2
+        with items[1].open() as f:
+            assert f.read() == b"two"
+
+    def test_manifest_files_are_size_checked(self, tmp_path):
+        """Test local files get the same size limit as uploads"""
+        (tmp_path / "big.wav").write_bytes(b"\0" * (2 * 1024 * 1024))
+        
+        async def transcribe(content, file_ext, vad=None):
+            raise AssertionError("oversized file was transcribed")
+        
+        with patch.object(settings, "BATCH_LOCAL_ROOT", str(tmp_path)), \
+             patch.object(settings, "MAX_AUDIO_SIZE_MB", 1):
+            items = list(items_from_manifest("big.wav"))
+            records = asyncio.run(collect(transcribe_batch(speech_service(transcribe), items)))
+        
+        assert items[0].size == 2 * 1024 * 1024
+        assert "exceeds maximum" in records[0]["error"]
+    
+    def test_manifest_cannot_escape_root(self, tmp_path):
+        """Test paths outside BATCH_LOCAL_ROOT are refused"""
+        with patch.object(settings, "BATCH_LOCAL_ROOT", str(tmp_path)):
+            with pytest.raises(BatchInputError):
+                list(items_from_manifest("../../etc/passwd"))
+            with pytest.raises(BatchInputError):
+                list(items_from_manifest('["/etc/passwd"]'))
+
+    def test_manifest_disabled_without_root(self):
+        """Test manifests are refused unless a local root is configured"""
+        with patch.object(settings, "BATCH_LOCAL_ROOT", None):
+            with pytest.raises(BatchInputError):
+                list(items_from_manifest("a.wav"))
+
+
+@pytest.mark.asyncio
+class TestTranscribeBatch:
+    """Test scheduling a batch across the inference workers"""
+
+    async def test_results_then_summary(self):
+        """Test every clip gets a record with its index, then a summary"""
+        async def transcribe(content, file_ext, vad=None):
+            return AudioTranscriptionResult(text=content.decode(), confidence=0.9, model="whisper")
+
+        items = [clip("a.wav", b"one"), clip("notes.txt"), clip("b.wav", b"two")]
+        records = await collect(transcribe_batch(speech_service(transcribe), items, concurrency=2))
+
+        by_index = {record["index"]: record for record in records[:-1]}
+        assert by_index[0]["result"]["text"] == "one"
+        assert by_index[1]["type"] == "error"
+        assert "Unsupported audio format" in by_index[1]["error"]
+        assert by_index[2]["name"] == "b.wav"
+        assert records[-1]["type"] == "summary"
+        assert records[-1]["count"] == 3
+        assert records[-1]["failed"] == 1
+
+    async def test_clips_run_concurrently_and_stream_in_completion_order(self):
+        """Test clips are in flight together and each is yielded when it finishes"""
+        in_flight = 0
+        peak = 0
+
+        async def transcribe(content, file_ext, vad=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05 if content == b"slow" else 0.01)
+            in_flight -= 1
+            return AudioTranscriptionResult(text=content.decode(), confidence=0.9, model="whisper")
+
+        items = [clip("slow.wav", b"slow")] + [clip(f"{i}.wav", b"fast") for i in range(5)]
+        records = await collect(transcribe_batch(speech_service(transcribe), items, concurrency=4))
+
+        assert peak == 4
+        assert records[-2]["name"] == "slow.wav"  # Did not hold back the others
+
+    async def test_full_queue_is_retried(self):
+        """Test a clip turned away by a saturated inference queue is retried"""
+        calls = []
+
+        async def transcribe(content, file_ext, vad=None):
+            calls.append(content)
+            if len(calls) < 3:
+                raise InferenceQueueFullError(retry_after=1)
+            return AudioTranscriptionResult(text="ok", confidence=0.9, model="whisper")
+
+        records = await collect(transcribe_batch(speech_service(transcribe), [clip("a.wav")], concurrency=1))
+
+        assert len(calls) == 3
+        assert records[0]["type"] == "result"
+        assert records[-1]["failed"] == 0
+
+    async def test_retries_give_up_at_the_deadline(self):
+        """Test a clip is failed, not retried forever, while the server stays saturated"""
+        async def transcribe(content, file_ext, vad=None):
+            raise InferenceQueueFullError(retry_after=1)
+        
+        with patch.object(settings, "BATCH_RETRY_SECONDS", 0.2):
+            records = await asyncio.wait_for(
+                collect(transcribe_batch(speech_service(transcribe), [clip("a.wav")], concurrency=1)), 5
+            )
+        
+        assert records[0]["type"] == "error"
+        assert "retry" in records[0]["error"]
+        assert records[-1]["failed"] == 1
+    
+    async def test_failure_does_not_stop_the_batch(self):
+        """Test one clip's error is reported and the rest still run"""
+        async def transcribe(content, file_ext, vad=None):
+            if content == b"bad":
+                raise RuntimeError("decode failed")
+            return AudioTranscriptionResult(text="ok", confidence=0.9, model="whisper")
+
+        items = [clip("a.wav", b"bad"), clip("b.wav")]
+        records = await collect(transcribe_batch(speech_service(transcribe), items, concurrency=1))
+
+        assert records[0] == {"type": "error", "index": 0, "name": "a.wav", "error": "decode failed"}
+        assert records[1]["type"] == "result"
+
+    async def test_local_files_are_closed(self, tmp_path):
+        """Test files opened from a manifest are closed once transcribed"""
+        (tmp_path / "a.wav").write_bytes(b"one")
+        opened = []
+
+        async def transcribe(content, file_ext, vad=None):
+            opened.append(content)
+            return AudioTranscriptionResult(text=content.read().decode(), confidence=0.9, model="whisper")
+
+        with patch.object(settings, "BATCH_LOCAL_ROOT", str(tmp_path)):
+            items = list(items_from_manifest("a.wav"))
+        records = await collect(transcribe_batch(speech_service(transcribe), items))
+
+        assert records[0]["result"]["text"] == "one"
+        assert opened[0].closed
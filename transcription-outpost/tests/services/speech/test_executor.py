@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.speech.executor import InferenceExecutor, InferenceQueueFullError
+
+
+@pytest.mark.asyncio
+class TestInferenceExecutor:
+    """Test bounded inference executor"""
+
+    async def test_runs_off_event_loop_thread(self):
+        """Test work runs on a worker thread, not the event loop"""
+        executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+
+        assert thread_name.startswith("inference")
+        executor.shutdown()
+
+    async def test_passes_arguments_and_errors(self):
+        """Test arguments are forwarded and exceptions propagate"""
+        executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+        assert await executor.run(lambda a, b=0: a + b, 2, b=3) == 5
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            await executor.run(fail)
+
+        assert executor.stats()["queue_depth"] == 0
+        assert executor.stats()["busy_workers"] == 0
+        executor.shutdown()
+
+    async def test_rejects_when_queue_full(self):
+        """Test submissions beyond workers + queue are rejected"""
+        executor = InferenceExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        running = asyncio.create_task(executor.run(release.wait))
+        queued = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        stats = executor.stats()
+        assert stats["busy_workers"] == 1
+        assert stats["queue_depth"] == 1
+
+        with pytest.raises(InferenceQueueFullError) as exc_info:
+            await executor.run(release.wait)
+        assert exc_info.value.retry_after > 0
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+        # Capacity is released once the work finishes
+        assert executor.stats()["queue_depth"] == 0
+        assert await executor.run(lambda: "ok") == "ok"
+        executor.shutdown()
+
+    async def test_event_loop_stays_responsive(self):
+        """Test the loop keeps serving while inference blocks a worker"""
+        executor = InferenceExecutor(max_workers=1, max_queue=0)
+        release = threading.Event()
+
+        task = asyncio.create_task(executor.run(release.wait))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+        assert ticks == 5
+        assert not task.done()
+
+        release.set()
+        await task
+        executor.shutdown()
@@ -0,0 +1,100 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.services.speech.executor import InferenceQueueFullError
+from app.services.speech.factory import SpeechServiceFactory, SpeechServiceType
+from app.services.speech.inference_server import InferenceServer
+from app.services.speech.ipc import InferenceServerError, decode_waveform, encode_waveform
+from app.services.speech.providers.remote import RemoteWhisperService
+
+
+def test_waveform_round_trip_is_exact_for_decoded_audio():
+    """Test 16-bit PCM on the wire loses nothing from ffmpeg-decoded samples"""
+    audio = np.array([0, 1, -1, 32767, -32768], dtype=np.int16).astype(np.float32) / 32768.0
+    assert np.array_equal(decode_waveform(encode_waveform(audio)), audio)
+
+
+@pytest_asyncio.fixture
+async def server(tmp_path):
+    """Inference server on a throwaway socket, backed by a fake local service"""
+    local = MagicMock(model_name="base", active_requests=0)
+    server = InferenceServer(str(tmp_path / "inference.sock"))
+    with patch("app.services.speech.inference_server.get_transcription_service",
+               AsyncMock(return_value=local)) as get_service:
+        await server.start()
+        server.local, server.get_service = local, get_service
+        yield server
+        await server.stop()
+
+
+@pytest.mark.asyncio
+class TestInferenceServer:
+    """Test HTTP workers forwarding inference to the shared server"""
+    
+    async def test_forwards_waveform_and_streams_callbacks(self, server):
+        """Test audio, progress, segments and the result cross the socket in order"""
+        async def infer(audio, language, progress=None, on_segments=None):
+            assert len(audio) == 16000
+            assert language == "en"
+            progress(0.5)
+            on_segments([{"start": 0.0, "end": 0.5, "text": "hi"}])
+            return {"text": "hi", "segments": [], "language": np.str_("en")}
+        
+        server.local._infer = infer
+        remote = RemoteWhisperService("small", socket_path=server.socket_path)
+        events = []
+        
+        result = await remote._infer(
+            np.zeros(16000, dtype=np.float32),
+            "en",
+            progress=lambda seconds: events.append(("progress", seconds)),
+            on_segments=lambda segments: events.append(("segments", segments[0]["text"])),
+        )
+        
+        assert result == {"text": "hi", "segments": [], "language": "en"}
+        assert events == [("progress", 0.5), ("segments", "hi")]
+        server.get_service.assert_awaited_once_with(SpeechServiceType.WHISPER, "small", remote.precision)
+        assert server.local.active_requests == 0
+        assert server.served == 1
+    
+    async def test_queue_full_is_passed_on(self, server):
+        """Test a saturated server surfaces as InferenceQueueFullError in the worker"""
+        server.local._infer = AsyncMock(side_effect=InferenceQueueFullError(retry_after=9))
+        remote = RemoteWhisperService(socket_path=server.socket_path)
+        
+        with pytest.raises(InferenceQueueFullError) as rejected:
+            await remote._infer(np.zeros(100, dtype=np.float32), None)
+        assert rejected.value.retry_after == 9
+    
+    async def test_failure_is_passed_on(self, server):
+        """Test inference errors come back as errors, not hangs"""
+        server.local._infer = AsyncMock(side_effect=RuntimeError("CUDA out of memory"))
+        remote = RemoteWhisperService(socket_path=server.socket_path)
+        
+        with pytest.raises(InferenceServerError, match="CUDA out of memory"):
+            await remote._infer(np.zeros(100, dtype=np.float32), None)
+        assert server.failed == 1
+    
+    async def test_initialize_waits_for_server(self, server):
+        """Test workers started before the server connect once it listens"""
+        remote = RemoteWhisperService(socket_path=server.socket_path)
+        await remote.initialize()
+        assert remote.connected
+        assert remote.model is None  # No weights in the HTTP worker
+        
+        missing = RemoteWhisperService(socket_path=server.socket_path + ".missing")
+        with patch.object(settings, "INFERENCE_SERVER_CONNECT_TIMEOUT", 0):
+            with pytest.raises(InferenceServerError):
+                await missing.initialize()
+
+
+def test_factory_creates_remote_services():
+    """Test INFERENCE_REMOTE switches HTTP workers to the shared server"""
+    with patch.object(settings, "INFERENCE_REMOTE", True):
+        service = SpeechServiceFactory._create_service(SpeechServiceType.WHISPER, "base", "fp32")
+    assert isinstance(service, RemoteWhisperService)
+    assert service.batcher is None
@@ -0,0 +1,221 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.speech import longform
+from app.services.speech.longform import LongformTranscriber, split_at_silence, stitch_results
+from app.services.speech.providers.whisper import WhisperService
+
+SR = 16000
+
+
+def tone_with_gaps(seconds: int, gap_every: int) -> np.ndarray:
+    """Continuous tone with a 0.2 s silent gap every ``gap_every`` seconds"""
+    audio = np.sin(np.arange(seconds * SR) / 5).astype(np.float32)
+    for t in range(gap_every, seconds, gap_every):
+        audio[t * SR - SR // 10:t * SR + SR // 10] = 0.0
+    return audio
+
+
+class TestSplitAtSilence:
+    """Test chunking long audio at quiet points"""
+    
+    def test_chunks_cover_audio_and_respect_limit(self):
+        """Test chunks are contiguous, bounded and cut inside silent gaps"""
+        audio = tone_with_gaps(95, gap_every=9)
+        
+        chunks = split_at_silence(audio, chunk_samples=20 * SR, search_samples=5 * SR)
+        
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == len(audio)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert end == start
+            assert np.all(audio[end - 80:end + 80] == 0.0)  # Cut lands in a gap
+        assert all(end - start <= 20 * SR for start, end in chunks)
+    
+    def test_short_audio_is_one_chunk(self):
+        """Test audio under the chunk size is not split"""
+        audio = np.zeros(5 * SR, dtype=np.float32)
+        
+        assert split_at_silence(audio, 20 * SR, 5 * SR) == [(0, 5 * SR)]
+
+
+class TestStitchResults:
+    """Test merging per-chunk results"""
+    
+    def test_offsets_confidence_and_language(self):
+        """Test segments shift by chunk offset and confidence is duration-weighted"""
+        chunks = [(0, 30 * SR), (30 * SR, 40 * SR)]
+        results = [
+            {"text": " first", "language": "en",
+             "segments": [{"start": 0.0, "end": 30.0, "text": " first", "no_speech_prob": 0.2}]},
+            {"text": " second ", "language": "de",
+             "segments": [{"start": 1.0, "end": 9.0, "text": " second", "no_speech_prob": 0.6}]},
+        ]
+        
+        stitched = stitch_results(results, chunks, SR)
+        
+        assert stitched["text"] == "first second"
+        assert stitched["language"] == "en"
+        assert [(s["start"], s["end"]) for s in stitched["segments"]] == [(0.0, 30.0), (31.0, 39.0)]
+        assert stitched["confidence"] == pytest.approx((0.8 * 30 + 0.4 * 10) / 40)
+
+
+class TestLongformTranscriber:
+    """Test chunk fan-out"""
+    
+    def test_transcribes_every_chunk_concurrently(self):
+        """Test each chunk is sent to the pool and results come back in order"""
+        model = MagicMock()
+        model.transcribe.side_effect = lambda audio, **kwargs: {
+            "text": f"{len(audio) // SR}s",
+            "language": "en",
+            "segments": [{"start": 0.0, "end": len(audio) / SR, "text": "x", "no_speech_prob": 0.0}],
+        }
+        audio = tone_with_gaps(50, gap_every=9)
+        
+        with patch.object(longform, "_model", model), \
+             patch.object(settings, "LONGFORM_CHUNK_SECONDS", 20), \
+             patch.object(settings, "LONGFORM_SEARCH_SECONDS", 5):
+            transcriber = LongformTranscriber("tiny", workers=4, executor=ThreadPoolExecutor(4))
+            result = transcriber.transcribe(audio, language="en")
+            transcriber.shutdown()
+        
+        assert model.transcribe.call_count == 3
+        assert result["segments"][-1]["end"] == pytest.approx(50.0)
+        assert result["confidence"] == pytest.approx(1.0)
+        assert all(call.kwargs["language"] == "en" for call in model.transcribe.call_args_list)
+    
+    def test_reports_progress_per_chunk(self):
+        """Test progress grows with each finished chunk and ends at the full length"""
+        model = MagicMock()
+        model.transcribe.return_value = {"text": "x", "language": "en", "segments": []}
+        audio = tone_with_gaps(50, gap_every=9)
+        reported = []
+        
+        with patch.object(longform, "_model", model), \
+             patch.object(settings, "LONGFORM_CHUNK_SECONDS", 20), \
+             patch.object(settings, "LONGFORM_SEARCH_SECONDS", 5):
+            transcriber = LongformTranscriber("tiny", workers=4, executor=ThreadPoolExecutor(4))
+            transcriber.transcribe(audio, language="en", progress=reported.append)
+            transcriber.shutdown()
+        
+        assert len(reported) == 3
+        assert reported == sorted(reported)
+        assert reported[-1] == pytest.approx(50.0)
+    
+    def test_hands_out_segments_in_order(self):
+        """Test each chunk's segments arrive once, shifted, after every earlier chunk's"""
+        model = MagicMock()
+        model.transcribe.side_effect = lambda audio, **kwargs: {
+            "text": "x", "language": "en",
+            "segments": [{"start": 0.0, "end": len(audio) / SR, "text": "x"}],
+        }
+        audio = tone_with_gaps(50, gap_every=9)
+        batches = []
+        
+        with patch.object(longform, "_model", model), \
+             patch.object(settings, "LONGFORM_CHUNK_SECONDS", 20), \
+             patch.object(settings, "LONGFORM_SEARCH_SECONDS", 5):
+            transcriber = LongformTranscriber("tiny", workers=4, executor=ThreadPoolExecutor(4))
+            result = transcriber.transcribe(audio, language="en", on_segments=batches.append)
+            transcriber.shutdown()
+        
+        assert [segments for segments in batches] == [[s] for s in result["segments"]]
+
+
+    def test_failure_cancels_remaining_chunks(self):
+        """Test chunks still queued are dropped once one chunk fails"""
+        release = threading.Event()
+        calls = []
+        
+        def transcribe(audio, **kwargs):
+            calls.append(audio)
+            if len(calls) == 1:
+                raise RuntimeError("chunk failed")
+            release.wait(5)  # Holds the only worker until the failure is handled
+            return {"text": "x", "language": "en", "segments": []}
+        
+        model = MagicMock()
+        model.transcribe.side_effect = transcribe
+        audio = tone_with_gaps(50, gap_every=9)
+        
+        with patch.object(longform, "_model", model), \
+             patch.object(settings, "LONGFORM_CHUNK_SECONDS", 20), \
+             patch.object(settings, "LONGFORM_SEARCH_SECONDS", 5):
+            executor = ThreadPoolExecutor(1)
+            transcriber = LongformTranscriber("tiny", workers=1, executor=executor)
+            try:
+                with pytest.raises(RuntimeError, match="chunk failed"):
+                    transcriber.transcribe(audio, language="en")
+            finally:
+                release.set()
+                executor.shutdown(wait=True)  # Runs whatever is still queued
+        
+        assert len(calls) < 3  # The last chunk never ran
+
+
+@pytest.mark.asyncio
+class TestWhisperLongform:
+    """Test WhisperService switches to long-form mode"""
+    
+    async def test_long_audio_uses_longform(self):
+        """Test audio over the threshold goes to the process pool"""
+        service = WhisperService()
+        service.model = MagicMock()
+        service.longform = MagicMock()
+        service.longform.transcribe.return_value = {
+            "text": "stitched", "language": "en", "confidence": 0.7,
+            "segments": [{"start": 0.0, "end": 20.0, "text": "stitched"}],
+        }
+        
+        with patch.object(settings, "LONGFORM_THRESHOLD_SECONDS", 10), \
+             patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(20 * SR, dtype=np.float32)):
+            result = await service.transcribe(b"audio", "wav", vad=False)
+        
+        service.model.transcribe.assert_not_called()
+        assert result.text == "stitched"
+        assert result.confidence == pytest.approx(0.7)
+        assert result.duration == pytest.approx(20.0)
+    
+    async def test_progress_spans_the_recording(self):
+        """Test progress starts at zero once decoded and ends at the full duration"""
+        service = WhisperService()
+        service.model = MagicMock()
+        service.longform = MagicMock()
+        
+        def transcribe(audio, language, progress, on_segments):
+            progress(12.0)
+            return {"text": "stitched", "language": "en", "confidence": 0.7, "segments": []}
+        
+        service.longform.transcribe.side_effect = transcribe
+        reported = []
+        
+        with patch.object(settings, "LONGFORM_THRESHOLD_SECONDS", 10), \
+             patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(20 * SR, dtype=np.float32)):
+            await service.transcribe(
+                b"audio", "wav", vad=False, progress=lambda done, total: reported.append((done, total))
+            )
+        
+        assert reported == [(0.0, 20.0), (12.0, 20.0), (20.0, 20.0)]
+    
+    async def test_short_audio_skips_longform(self):
+        """Test audio under the threshold runs in-process"""
+        service = WhisperService()
+        service.batcher = None
+        service.model = MagicMock()
+        service.model.transcribe.return_value = {"text": "short", "segments": []}
+        
+        with patch.object(settings, "LONGFORM_THRESHOLD_SECONDS", 10), \
+             patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(5 * SR, dtype=np.float32)):
+            await service.transcribe(b"audio", "wav", vad=False)
+        
+        assert service.longform is None
+        service.model.transcribe.assert_called_once()
@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 import pytest_asyncio
+import torch
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.services.speech.factory import (
@@ -7,7 +10,8 @@ from app.services.speech.factory import (
     SpeechServiceType, 
     get_transcription_service
 )
-from app.services.speech.base import BaseSpeechService
+from app.core.config import settings
+from app.services.speech.base import AudioTranscriptionResult, BaseSpeechService
 from app.services.speech.providers.whisper import WhisperService
 
 
@@ -68,7 +72,7 @@ class TestSpeechServiceFactory:
             mock_instance.cleanup.assert_called_once()
             
             # Instance should be reset
-            assert SpeechServiceFactory._instance is None
+            assert not SpeechServiceFactory._instances
     
     async def test_get_transcription_service_function(self):
         """Test convenience function for getting transcription service"""
@@ -93,6 +97,128 @@ class TestSpeechServiceFactory:
             mock_instance.initialize.assert_called_once()
 
 
+def fake_model(megabytes: int) -> torch.nn.Module:
+    """Module whose float32 weights take the given number of megabytes"""
+    return torch.nn.Linear(megabytes * 2**18, 1, bias=False)
+
+
+@pytest.mark.asyncio
+class TestModelRegistry:
+    """Test multi-model registry with memory budget"""
+    
+    async def test_sizes_are_separate_and_reused(self):
+        """Test each model size loads once and stays resident"""
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(1)) as load:
+            tiny = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+            small = await get_transcription_service(SpeechServiceType.WHISPER, "small")
+            tiny_again = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+        
+        assert tiny is tiny_again
+        assert tiny is not small
+        assert (tiny.model_name, small.model_name) == ("tiny", "small")
+        assert load.call_count == 2
+        assert [m["model"] for m in SpeechServiceFactory.stats()["resident"]] == [
+            "whisper-tiny", "whisper-small"
+        ]
+    
+    async def test_rejects_unknown_model_and_precision(self):
+        """Test invalid requests fail before anything is loaded"""
+        with pytest.raises(ValueError, match="Unknown model size"):
+            await get_transcription_service(SpeechServiceType.WHISPER, "gigantic")
+        with pytest.raises(ValueError, match="Unknown precision"):
+            await get_transcription_service(SpeechServiceType.WHISPER, "tiny", "int3")
+        with pytest.raises(ValueError):
+            await get_transcription_service("unknown")
+    
+    async def test_failed_load_is_not_registered(self):
+        """Test a model that fails to load is retried on the next request"""
+        with patch("whisper.load_model", side_effect=RuntimeError("download failed")):
+            with pytest.raises(RuntimeError):
+                await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+        
+        assert not SpeechServiceFactory._instances
+    
+    async def test_evicts_least_recently_used_over_budget(self):
+        """Test the LRU model is evicted and released when the budget is exceeded"""
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(3)), \
+             patch.object(settings, "MODEL_MEMORY_BUDGET_MB", 7):
+            tiny = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+            base = await get_transcription_service(SpeechServiceType.WHISPER, "base")
+            await get_transcription_service(SpeechServiceType.WHISPER, "tiny")  # base is now LRU
+            await get_transcription_service(SpeechServiceType.WHISPER, "small")
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+        
+        resident = [m["model"] for m in SpeechServiceFactory.stats()["resident"]]
+        assert resident == ["whisper-small", "whisper-tiny"]
+        assert base.model is None
+        assert tiny.model is not None
+        assert SpeechServiceFactory.stats()["evictions"] >= 1
+    
+    async def test_eviction_waits_for_in_flight_requests(self):
+        """Test an evicted model keeps its weights until its requests finish"""
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(3)), \
+             patch.object(settings, "MODEL_MEMORY_BUDGET_MB", 4):
+            tiny = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+            tiny.active_requests = 1
+            await get_transcription_service(SpeechServiceType.WHISPER, "base")
+            
+            await asyncio.sleep(0.15)
+            assert tiny.model is not None
+            
+            tiny.active_requests = 0
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+            assert tiny.model is None
+    
+    async def test_evicted_service_hands_requests_to_the_registry(self):
+        """Test a service evicted before its request starts does not reload outside the budget"""
+        transcribed = []
+        
+        async def transcribe(self, content, use_vad, key, progress=None, on_segments=None):
+            transcribed.append(self)
+            return AudioTranscriptionResult(text="result", confidence=0.9, model="whisper")
+        
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(3)) as load, \
+             patch.object(settings, "MODEL_MEMORY_BUDGET_MB", 4), \
+             patch.object(WhisperService, "_transcribe", transcribe):
+            tiny = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+            await get_transcription_service(SpeechServiceType.WHISPER, "base")  # Evicts tiny
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+            
+            assert (await tiny.transcribe(b"audio", "wav")).text == "result"
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+        
+        assert tiny.model is None  # Never reloaded outside the registry
+        assert transcribed[0] is not tiny
+        assert transcribed[0] is SpeechServiceFactory._instances[(SpeechServiceType.WHISPER, "tiny", "fp32")]
+        assert [m["model"] for m in SpeechServiceFactory.stats()["resident"]] == ["whisper-tiny"]
+        assert load.call_count == 3
+    
+    async def test_longform_copies_count_against_budget(self):
+        """Test long-form worker copies are charged and stopped when their model is evicted"""
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(2)), \
+             patch.object(settings, "MODEL_MEMORY_BUDGET_MB", 7):
+            tiny = await get_transcription_service(SpeechServiceType.WHISPER, "tiny")
+            base = await get_transcription_service(SpeechServiceType.WHISPER, "base")
+            longform = MagicMock(workers=2)
+            tiny.longform = longform
+            
+            SpeechServiceFactory.resize(tiny)  # 2 MB + two 2 MB copies
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+        
+        assert SpeechServiceFactory.stats()["resident"] == [
+            {"model": "whisper-tiny", "precision": "fp32", "memory_mb": 6.0}
+        ]
+        assert base.model is None
+        
+        with patch("whisper.load_model", side_effect=lambda name: fake_model(2)), \
+             patch.object(settings, "MODEL_MEMORY_BUDGET_MB", 7):
+            await get_transcription_service(SpeechServiceType.WHISPER, "small")
+            await asyncio.gather(*SpeechServiceFactory._retiring)
+        
+        longform.shutdown.assert_called_once()
+        assert tiny.model is None
+
+
 @pytest.mark.asyncio
 class TestSpeechServiceTypes:
     """Test speech service type enumeration"""
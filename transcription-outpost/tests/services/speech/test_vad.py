@@ -0,0 +1,161 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.speech.providers.whisper import WhisperService
+from app.services.speech.vad import TrimmedAudio, VoiceActivityDetector
+
+SR = 16000
+
+
+def voiced(seconds: float, f0: float = 180.0) -> np.ndarray:
+    """Harmonic signal with most of its energy in the speech band"""
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(2, 8))).astype(np.float32)
+
+
+def quiet(seconds: float) -> np.ndarray:
+    """Low-level background noise"""
+    rng = np.random.default_rng(0)
+    return (0.001 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+class TestVoiceActivityDetector:
+    """Test speech region detection"""
+    
+    def test_finds_speech_between_silence(self):
+        """Test a voiced region is found with padding around it"""
+        vad = VoiceActivityDetector(padding_ms=100, sample_rate=SR)
+        audio = np.concatenate([quiet(2), voiced(1), quiet(2)])
+        
+        regions = vad.detect(audio)
+        
+        assert len(regions) == 1
+        start, end = regions[0]
+        assert start == pytest.approx(1.9 * SR, abs=0.05 * SR)
+        assert end == pytest.approx(3.1 * SR, abs=0.05 * SR)
+    
+    def test_ignores_silence_and_rumble(self):
+        """Test pure silence and loud low-frequency hum are not speech"""
+        vad = VoiceActivityDetector(sample_rate=SR)
+        t = np.arange(3 * SR) / SR
+        hum = (0.5 * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+        
+        assert vad.detect(np.zeros(3 * SR, dtype=np.float32)) == []
+        assert vad.detect(np.concatenate([quiet(1), hum])) == []
+    
+    def test_bridges_short_pauses_and_drops_clicks(self):
+        """Test brief gaps stay inside one region and brief bursts are dropped"""
+        vad = VoiceActivityDetector(min_speech_ms=250, min_silence_ms=500,
+                                    padding_ms=0, sample_rate=SR)
+        audio = np.concatenate([
+            quiet(1), voiced(0.5), quiet(0.2), voiced(0.5),  # Pause shorter than min_silence
+            quiet(1), voiced(0.06),  # Click shorter than min_speech
+            quiet(1),
+        ])
+        
+        regions = vad.detect(audio)
+        
+        assert len(regions) == 1
+        assert (regions[0][1] - regions[0][0]) / SR == pytest.approx(1.2, abs=0.06)
+    
+    def test_blocked_spectra_match_whole_recording(self):
+        """Test frames analysed across several FFT blocks get the same decisions"""
+        audio = np.concatenate([quiet(2), voiced(1), quiet(1), voiced(2), quiet(2)])
+        whole = VoiceActivityDetector(sample_rate=SR)
+        blocked = VoiceActivityDetector(sample_rate=SR)
+        blocked.BLOCK_FRAMES = 7  # Blocks that split the recording unevenly
+        
+        assert np.array_equal(blocked.speech_frames(audio), whole.speech_frames(audio))
+        assert blocked.detect(audio) == whole.detect(audio)
+    
+    def test_trim_reports_removed_seconds(self):
+        """Test trimming keeps only speech and counts what was cut"""
+        vad = VoiceActivityDetector(padding_ms=0, sample_rate=SR)
+        audio = np.concatenate([quiet(3), voiced(1), quiet(3), voiced(1), quiet(2)])
+        
+        trimmed = vad.trim(audio)
+        
+        assert len(trimmed.regions) == 2
+        assert len(trimmed.audio) / SR == pytest.approx(2.0, abs=0.1)
+        assert trimmed.removed_seconds == pytest.approx(8.0, abs=0.1)
+        assert vad.stats()["removed_seconds"] == pytest.approx(8.0, abs=0.1)
+
+
+class TestTrimmedAudio:
+    """Test timestamp remapping onto the original timeline"""
+    
+    def test_maps_times_across_regions(self):
+        """Test times in the trimmed audio map into the matching region"""
+        trimmed = TrimmedAudio(np.zeros(3 * SR, dtype=np.float32),
+                               [(2 * SR, 3 * SR), (10 * SR, 12 * SR)], 20 * SR, SR)
+        
+        assert trimmed.to_original(0.0) == 2.0
+        assert trimmed.to_original(0.5) == 2.5
+        assert trimmed.to_original(1.0) == 10.0  # Start of the second region
+        assert trimmed.to_original(1.0, is_end=True) == 3.0  # End of the first
+        assert trimmed.to_original(2.5) == 11.5
+    
+    def test_remap_segments(self):
+        """Test segment start/end are rewritten in place"""
+        trimmed = TrimmedAudio(np.zeros(2 * SR, dtype=np.float32),
+                               [(5 * SR, 6 * SR), (8 * SR, 9 * SR)], 10 * SR, SR)
+        segments = [{"start": 0.0, "end": 1.0, "text": "a"}, {"start": 1.0, "end": 2.0, "text": "b"}]
+        
+        trimmed.remap_segments(segments)
+        
+        assert segments == [
+            {"start": 5.0, "end": 6.0, "text": "a"},
+            {"start": 8.0, "end": 9.0, "text": "b"},
+        ]
+
+
+@pytest.mark.asyncio
+class TestWhisperVAD:
+    """Test the VAD stage in front of Whisper"""
+    
+    @pytest.fixture
+    def service(self):
+        service = WhisperService()
+        service.batcher = None
+        service.model = MagicMock()
+        service.model.transcribe.return_value = {
+            "text": " hello",
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "text": " hello", "no_speech_prob": 0.1}],
+        }
+        return service
+    
+    async def test_transcribes_only_speech(self, service):
+        """Test Whisper sees the trimmed audio and segments use original times"""
+        audio = np.concatenate([quiet(10), voiced(1), quiet(10)])
+        
+        with patch("app.services.speech.providers.whisper.decode_audio", return_value=audio):
+            result = await service.transcribe(b"audio", "wav", vad=True)
+        
+        sent = service.model.transcribe.call_args[0][0]
+        assert len(sent) / SR < 2.0
+        assert result.duration == pytest.approx(21.0)
+        assert result.silence_removed > 19.0
+        assert result.segments[0]["start"] > 9.0
+        assert result.segments[0]["text"] == "hello"
+    
+    async def test_silent_audio_skips_whisper(self, service):
+        """Test audio without speech never reaches the model"""
+        with patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(5 * SR, dtype=np.float32)):
+            result = await service.transcribe(b"audio", "wav", vad=True)
+        
+        service.model.transcribe.assert_not_called()
+        assert result.text == ""
+        assert result.silence_removed == pytest.approx(5.0)
+    
+    async def test_vad_can_be_disabled_per_request(self, service):
+        """Test vad=False sends the full recording"""
+        with patch("app.services.speech.providers.whisper.decode_audio",
+                   return_value=np.zeros(5 * SR, dtype=np.float32)):
+            result = await service.transcribe(b"audio", "wav", vad=False)
+        
+        assert len(service.model.transcribe.call_args[0][0]) == 5 * SR
+        assert result.silence_removed == 0.0
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.services.speech.providers.whisper import WhisperService
+from app.services.speech.warmup import ModelWarmup
+
+
+@pytest.mark.asyncio
+class TestModelWarmup:
+    """Test background model warm-up"""
+    
+    async def test_loads_then_warms_up(self):
+        """Test state moves to ready after load and dummy inference"""
+        service = AsyncMock()
+        warmup = ModelWarmup()
+        
+        with patch("app.services.speech.warmup.get_transcription_service",
+                   AsyncMock(return_value=service)):
+            await warmup.run()
+        
+        service.warm_up.assert_awaited_once()
+        stats = warmup.stats()
+        assert stats["ready"] is True
+        assert stats["state"] == "ready"
+        assert stats["load_seconds"] is not None
+        assert stats["warmup_seconds"] is not None
+    
+    async def test_start_does_not_block(self):
+        """Test start returns while the model is still loading"""
+        loaded = asyncio.Event()
+        
+        async def slow_load(*args):
+            await loaded.wait()
+            return AsyncMock()
+        
+        warmup = ModelWarmup()
+        with patch("app.services.speech.warmup.get_transcription_service", slow_load):
+            warmup.start()
+            await asyncio.sleep(0)
+            assert warmup.state == "loading"
+            assert not warmup.ready
+            
+            loaded.set()
+            await warmup._task
+        
+        assert warmup.ready
+    
+    async def test_failure_is_reported(self):
+        """Test a failed load leaves the worker not ready with the error"""
+        warmup = ModelWarmup()
+        
+        with patch("app.services.speech.warmup.get_transcription_service",
+                   AsyncMock(side_effect=RuntimeError("no model"))):
+            await warmup.run()
+        
+        assert warmup.stats()["state"] == "failed"
+        assert warmup.stats()["error"] == "no model"
+        assert not warmup.ready
+
+
+@pytest.mark.asyncio
+async def test_whisper_warm_up_runs_one_inference():
+    """Test WhisperService.warm_up transcribes a short silent clip"""
+    service = WhisperService()
+    service.batcher = None
+    service.model = MagicMock()
+    service.model.transcribe.return_value = {"text": "", "segments": []}
+    
+    await service.warm_up()
+    
+    audio = service.model.transcribe.call_args[0][0]
+    assert isinstance(audio, np.ndarray)
+    assert len(audio) == 16000
@@ -1,11 +1,12 @@
-import io
-import tempfile
+import asyncio
 from pathlib import Path
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 import numpy as np
 
+from app.core.cache import TieredCache
+from app.core.config import settings
 from app.core.models import TranscriptionRequest
 from app.services.speech.providers.whisper import WhisperService
 from app.services.speech.factory import SpeechServiceFactory, SpeechServiceType
@@ -16,8 +17,12 @@ from app.services.speech.base import AudioTranscriptionResult
 async def whisper_service():
     """Fixture for creating a whisper service instance"""
     service = WhisperService()
-    with patch("whisper.load_model") as mock_model:
+    service.batcher = None  # Exercise the sequential model.transcribe path
+    with patch("whisper.load_model") as mock_model, \
+         patch("app.services.speech.providers.whisper.decode_audio") as mock_decode, \
+         patch.object(settings, "VAD_ENABLED", False):  # Decoded audio is all zeros
         # Configure mocks
+        mock_decode.return_value = np.zeros(32000, dtype=np.float32)
         mock_whisper = MagicMock()
         mock_whisper.transcribe.return_value = {
             "text": "Hello world",
@@ -62,68 +67,169 @@ class TestWhisperProvider:
         # Create dummy audio content
         audio_content = b"dummy audio data"
         
-        # Mock temporary file creation
-        with patch("tempfile.NamedTemporaryFile") as mock_temp:
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value.__enter__.return_value = mock_file
-            mock_temp.return_value = mock_file
-            
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink") as mock_unlink:
-                
-                result = await whisper_service.transcribe(audio_content, "wav")
-                
-                assert isinstance(result, AudioTranscriptionResult)
-                assert result.text == "Hello world"
-                assert result.confidence == 0.9  # 1.0 - 0.1 (no_speech_prob)
-                assert result.duration == 2.0
-                assert result.language == "en"
-                assert result.model == "whisper-base"
-                
-                # Verify model was called
-                whisper_service.model.transcribe.assert_called_once()
+        result = await whisper_service.transcribe(audio_content, "wav")
+        
+        assert isinstance(result, AudioTranscriptionResult)
+        assert result.text == "Hello world"
+        assert result.confidence == 0.9  # 1.0 - 0.1 (no_speech_prob)
+        assert result.duration == 2.0
+        assert result.language == "en"
+        assert result.model == "whisper-base"
+        
+        # Verify model was called
+        whisper_service.model.transcribe.assert_called_once()
     
-    async def test_transcribe_with_audio_conversion(self, whisper_service: WhisperService):
-        """Test transcription with audio format conversion"""
-        # Create dummy MP3 content
+    async def test_transcribe_decodes_in_memory(self, whisper_service: WhisperService):
+        """Test compressed audio is decoded once and passed to Whisper as an array"""
         audio_content = b"dummy mp3 data"
+        decoded = np.zeros(16000, dtype=np.float32)
         
-        with patch("pydub.AudioSegment.from_file") as mock_from_file, \
+        with patch("app.services.speech.providers.whisper.decode_audio", return_value=decoded) as mock_decode, \
              patch("tempfile.NamedTemporaryFile") as mock_temp:
             
-            # Mock AudioSegment conversion
-            mock_audio = MagicMock()
-            mock_from_file.return_value = mock_audio
-            mock_audio.export.return_value = None
+            result = await whisper_service.transcribe(audio_content, "mp3")
             
-            # Mock temporary file
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
+            assert isinstance(result, AudioTranscriptionResult)
+            assert result.text == "Hello world"
             
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink"):
-                
-                result = await whisper_service.transcribe(audio_content, "mp3")
-                
-                assert isinstance(result, AudioTranscriptionResult)
-                assert result.text == "Hello world"
-                
-                # Verify conversion was attempted
-                mock_from_file.assert_called_once()
-                mock_audio.export.assert_called_once()
+            # One decode, no temporary files
+            mock_decode.assert_called_once_with(audio_content)
+            mock_temp.assert_not_called()
+            assert whisper_service.model.transcribe.call_args[0][0] is decoded
+    
+    async def test_transcribe_duration_from_samples(self, whisper_service: WhisperService):
+        """Test duration falls back to the decoded sample count"""
+        whisper_service.model.transcribe.return_value = {
+            "text": "Hello world",
+            "segments": [],
+            "language": "en"
+        }
+        
+        result = await whisper_service.transcribe(b"dummy audio", "wav")
+        
+        assert result.duration == 2.0  # 32000 samples at 16 kHz
     
-    async def test_transcribe_stream_not_implemented(self, whisper_service: WhisperService):
-        """Test that streaming transcription raises NotImplementedError"""
-        async def dummy_stream():
-            yield b"audio chunk"
+    async def test_transcribe_uses_result_cache(self, whisper_service: WhisperService, tmp_path):
+        """Test repeated uploads are served from the cache without re-running Whisper"""
+        cache = TieredCache("transcriptions", db_path=str(tmp_path / "cache.db"))
         
-        request = TranscriptionRequest(audio_format="wav", language="en", stream=True)
+        with patch.object(settings, "CACHE_ENABLED", True), \
+             patch("app.services.speech.providers.whisper.transcription_cache", cache):
+            first = await whisper_service.transcribe(b"same audio", "wav")
+            second = await whisper_service.transcribe(b"same audio", "wav")
+            await whisper_service.transcribe(b"other audio", "wav")
         
-        # The method raises NotImplementedError immediately when called
-        with pytest.raises(NotImplementedError, match="Streaming transcription not yet supported"):
-            await whisper_service.transcribe_stream(dummy_stream(), request)
+        assert second == first
+        assert whisper_service.model.transcribe.call_count == 2
+        assert cache.stats()["memory_hits"] == 1
+        assert cache.stats()["misses"] == 2
+    
+    async def test_cached_lookup_without_transcribing(self, whisper_service: WhisperService, tmp_path):
+        """Test a cached transcript can be looked up without decoding or inference"""
+        cache = TieredCache("transcriptions", db_path=str(tmp_path / "cache.db"))
+        
+        with patch.object(settings, "CACHE_ENABLED", True), \
+             patch("app.services.speech.providers.whisper.transcription_cache", cache):
+            assert await whisper_service.cached(b"same audio") is None
+            first = await whisper_service.transcribe(b"same audio", "wav")
+            assert await whisper_service.cached(b"same audio") == first
+            assert await whisper_service.cached(b"same audio", vad=True) is None
+        
+        assert whisper_service.model.transcribe.call_count == 1
+    
+    async def test_concurrent_identical_uploads_coalesce(self, whisper_service: WhisperService):
+        """Test simultaneous identical uploads share one inference"""
+        results = await asyncio.gather(
+            *(whisper_service.transcribe(b"same audio", "wav") for _ in range(3)),
+            whisper_service.transcribe(b"other audio", "wav"),
+        )
+        
+        assert whisper_service.model.transcribe.call_count == 2
+        assert results[0] == results[1] == results[2]
+        assert results[0] is not results[1]  # Each caller gets its own copy
+    
+    async def test_coalesced_callers_all_get_callbacks(self, whisper_service: WhisperService):
+        """Test a caller joining a shared transcription late still gets every report"""
+        release = asyncio.Event()
+        
+        async def infer(audio, language, progress=None, on_segments=None):
+            on_segments([{"start": 0.0, "end": 1.0, "text": "early"}])
+            await release.wait()
+            on_segments([{"start": 1.0, "end": 2.0, "text": "late"}])
+            return {"text": "early late", "segments": [], "language": "en"}
+        
+        seen = ([], [])
+        progress = ([], [])
+        with patch.object(whisper_service, "_infer", infer):
+            first = asyncio.create_task(whisper_service.transcribe(
+                b"same audio", "wav", progress=lambda *p: progress[0].append(p), on_segments=seen[0].extend
+            ))
+            while not seen[0]:
+                await asyncio.sleep(0.01)
+            second = asyncio.create_task(whisper_service.transcribe(
+                b"same audio", "wav", progress=lambda *p: progress[1].append(p), on_segments=seen[1].extend
+            ))
+            await asyncio.sleep(0.01)
+            release.set()
+            results = await asyncio.gather(first, second)
+        
+        assert results[0] == results[1]
+        assert [s["text"] for s in seen[0]] == [s["text"] for s in seen[1]] == ["early", "late"]
+        assert progress[1][0] == progress[0][0]  # Brought up to date on joining
+        assert progress[0][-1] == progress[1][-1] and progress[1][-1][0] == progress[1][-1][1]
+        assert whisper_service._shared_callbacks == {}
+    
+    async def test_transcribe_stream_partials_and_finals(self, whisper_service: WhisperService):
+        """Test streaming emits partial results and commits finals covering all audio"""
+        async def pcm_stream():
+            # 2.5 s of 16 kHz PCM in 250 ms frames
+            samples = (np.sin(np.arange(40000) / 10) * 8000).astype(np.int16).tobytes()
+            for i in range(0, len(samples), 8000):
+                yield samples[i:i + 8000]
+        
+        request = TranscriptionRequest(audio_format="pcm", language="en", stream=True)
+        # model.transcribe reports no duration; each result covers its own slice
+        whisper_service.model.transcribe.return_value.pop("duration")
+        
+        with patch.object(settings, "STREAM_STEP_MS", 500), \
+             patch.object(settings, "STREAM_WINDOW_SECONDS", 2):
+            results = [r async for r in whisper_service.transcribe_stream(pcm_stream(), request)]
+        
+        partials = [r for r in results if not r.is_final]
+        finals = [r for r in results if r.is_final]
+        assert partials and finals
+        assert results[0].is_final is False  # First words arrive before the window fills
+        assert sum(r.duration for r in finals) == pytest.approx(2.5, abs=1e-3)
+        assert all(r.text == "Hello world" for r in results)
+        assert whisper_service.model.transcribe.call_args[1]["language"] == "en"
+    
+    async def test_transcribe_stream_timestamps_continue_across_windows(self, whisper_service: WhisperService):
+        """Test segments of later windows are placed after the audio already committed"""
+        async def pcm_stream():
+            # 5 s of 16 kHz PCM in 250 ms frames: three windows of at most 2 s
+            samples = (np.sin(np.arange(80000) / 10) * 8000).astype(np.int16).tobytes()
+            for i in range(0, len(samples), 8000):
+                yield samples[i:i + 8000]
+        
+        whisper_service.model.transcribe.side_effect = lambda audio, **kwargs: {
+            "text": "Hello world",
+            "segments": [{"text": "Hello world", "start": 0.0, "end": len(audio) / 16000, "no_speech_prob": 0.1}],
+        }
+        request = TranscriptionRequest(audio_format="pcm", language="en", stream=True)
+        
+        with patch.object(settings, "STREAM_STEP_MS", 500), \
+             patch.object(settings, "STREAM_WINDOW_SECONDS", 2):
+            results = [r async for r in whisper_service.transcribe_stream(pcm_stream(), request)]
+        
+        finals = [r for r in results if r.is_final]
+        assert len(finals) >= 2
+        assert finals[0].segments[0]["start"] == 0.0
+        for previous, current in zip(finals, finals[1:]):
+            assert current.segments[0]["start"] == pytest.approx(previous.segments[0]["end"])
+        assert finals[-1].segments[0]["end"] == pytest.approx(5.0)
+        # A partial after the first final starts where that final ended
+        later_partials = [r for r in results[results.index(finals[0]):] if not r.is_final]
+        assert later_partials[0].segments[0]["start"] == pytest.approx(finals[0].segments[0]["end"])
     
     async def test_transcribe_confidence_calculation(self, whisper_service: WhisperService):
         """Test confidence calculation from segments"""
@@ -139,18 +245,10 @@ class TestWhisperProvider:
             "language": "en"
         }
         
-        with patch("tempfile.NamedTemporaryFile") as mock_temp:
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
-            
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink"):
-                
-                result = await whisper_service.transcribe(b"dummy audio", "wav")
-                
-                # Expected confidence: 1.0 - (0.1 + 0.2 + 0.05) / 3 = 1.0 - 0.116... ≈ 0.883
-                assert result.confidence == pytest.approx(0.883, rel=1e-2)
+        result = await whisper_service.transcribe(b"dummy audio", "wav")
+        
+        # Expected confidence: 1.0 - (0.1 + 0.2 + 0.05) / 3 = 1.0 - 0.116... ≈ 0.883
+        assert result.confidence == pytest.approx(0.883, rel=1e-2)
     
     async def test_transcribe_no_segments(self, whisper_service: WhisperService):
         """Test transcription with no segments"""
@@ -161,47 +259,16 @@ class TestWhisperProvider:
             "language": "en"
         }
         
-        with patch("tempfile.NamedTemporaryFile") as mock_temp:
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
-            
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink"):
-                
-                result = await whisper_service.transcribe(b"dummy audio", "wav")
-                
-                assert result.confidence == 0.0  # No segments means 0 confidence
+        result = await whisper_service.transcribe(b"dummy audio", "wav")
+        
+        assert result.confidence == 0.0  # No segments means 0 confidence
     
     async def test_transcribe_error_handling(self, whisper_service: WhisperService):
         """Test error handling in transcription"""
         whisper_service.model.transcribe.side_effect = Exception("Transcription failed")
         
-        with patch("tempfile.NamedTemporaryFile") as mock_temp:
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
-            
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink"):
-                
-                with pytest.raises(Exception, match="Transcription failed"):
-                    await whisper_service.transcribe(b"dummy audio", "wav")
-    
-    async def test_temporary_file_cleanup(self, whisper_service: WhisperService):
-        """Test that temporary files are cleaned up"""
-        with patch("tempfile.NamedTemporaryFile") as mock_temp, \
-             patch("os.path.exists", return_value=True) as mock_exists, \
-             patch("os.unlink") as mock_unlink:
-            
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
-            
+        with pytest.raises(Exception, match="Transcription failed"):
             await whisper_service.transcribe(b"dummy audio", "wav")
-            
-            # Verify cleanup was attempted
-            mock_unlink.assert_called_once_with("/tmp/test.wav")
     
     async def test_cleanup_method(self):
         """Test provider cleanup method"""
@@ -252,7 +319,7 @@ class TestWhisperProviderFactory:
             await SpeechServiceFactory.cleanup()
             
             mock_instance.cleanup.assert_called_once()
-            assert SpeechServiceFactory._instance is None
+            assert not SpeechServiceFactory._instances
 
 
 @pytest.mark.asyncio 
@@ -285,17 +352,9 @@ class TestWhisperProviderIntegration:
     async def test_language_detection(self, whisper_service: WhisperService):
         """Test automatic language detection"""
         # Verify that language is set to None for auto-detection
-        with patch("tempfile.NamedTemporaryFile") as mock_temp:
-            mock_file = MagicMock()
-            mock_file.name = "/tmp/test.wav"
-            mock_temp.return_value = mock_file
-            
-            with patch("os.path.exists", return_value=True), \
-                 patch("os.unlink"):
-                
-                await whisper_service.transcribe(b"dummy audio", "wav")
-                
-                # Verify transcribe was called with language=None (auto-detect)
-                call_args = whisper_service.model.transcribe.call_args
-                assert call_args[1]["language"] is None
-                assert call_args[1]["fp16"] is False 
\ No newline at end of file
+        await whisper_service.transcribe(b"dummy audio", "wav")
+        
+        # Verify transcribe was called with language=None (auto-detect)
+        call_args = whisper_service.model.transcribe.call_args
+        assert call_args[1]["language"] is None
+        assert call_args[1]["fp16"] is False 
\ No newline at end of file
@@ -1,15 +1,18 @@
 import pytest
 import pytest_asyncio
+from fastapi import UploadFile
 from httpx import AsyncClient
 from unittest.mock import AsyncMock, MagicMock, patch
 from pathlib import Path
 import json
 import io
+import zipfile
 
 from app.main import app
 from app.core.models import TranscriptionRequest
 from app.core.config import settings
 from app.services.speech.base import AudioTranscriptionResult
+from app.services.speech.executor import InferenceQueueFullError
 
 
 @pytest.mark.asyncio
@@ -37,6 +40,21 @@ class TestTranscriptionAPI:
         assert response.status_code == 200
         assert response.json() == {"status": "healthy", "service": settings.APP_NAME}
     
+    async def test_ready_reflects_warmup(self, client):
+        """Test /ready is 503 until warm-up finishes, then 200"""
+        from app.main import model_warmup
+        
+        with patch.object(model_warmup, "state", "loading"):
+            response = await client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["state"] == "loading"
+            assert "Retry-After" in response.headers
+        
+        with patch.object(model_warmup, "state", "ready"):
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["ready"] is True
+    
     async def test_transcribe_file_upload(self, client):
         """Test basic file upload transcription"""
         with patch("app.services.speech.router.get_transcription_service") as mock_factory:
@@ -49,6 +67,10 @@ class TestTranscriptionAPI:
                 model="whisper",
                 duration=1.5
             )
+            received = []
+            mock_service.transcribe.side_effect = lambda content, *args, **kwargs: (
+                received.append((type(content), content.read())) or mock_service.transcribe.return_value
+            )
             mock_factory.return_value = mock_service
             
             # Create test audio file
@@ -63,6 +85,74 @@ class TestTranscriptionAPI:
             assert "confidence" in data
             assert "language" in data
             assert "duration" in data
+            
+            # The spooled upload itself is passed on, not a copy of its bytes
+            content_type, content = received[0]
+            assert content_type is not bytes
+            assert content == test_audio
+    
+    async def test_transcribe_queue_full(self, client):
+        """Test transcription is rejected with Retry-After when inference is saturated"""
+        with patch("app.services.speech.router.get_transcription_service") as mock_factory:
+            mock_service = AsyncMock()
+            mock_service.transcribe.side_effect = InferenceQueueFullError(retry_after=7)
+            mock_factory.return_value = mock_service
+            
+            files = {"file": ("test.wav", b"fake_audio_data", "audio/wav")}
+            
+            response = await client.post("/api/v1/transcription/", files=files)
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "7"
+    
+    async def test_transcribe_admission_by_duration(self, client):
+        """Test long audio is turned away by its probed duration, not its size"""
+        from app.services.speech.admission import AdmissionController
+        
+        admission = AdmissionController(budget=100.0, max_wait=1.0, default_rtf=0.5, workers=1)
+        files = {"file": ("test.m4a", b"small but long", "audio/mp4")}
+        with patch("app.services.speech.router.get_transcription_service") as mock_factory, \
+             patch("app.services.speech.admission.admission_controller", admission), \
+             patch("app.services.speech.admission.probe_duration", return_value=3 * 3600.0):
+            mock_service = AsyncMock()
+            mock_factory.return_value = mock_service
+            
+            response = await client.post("/api/v1/transcription/", files=files)
+            assert response.status_code == 413
+            assert "background job" in response.json()["detail"]
+            
+            # 60 compute-seconds already admitted; 160 s of audio costs 80 more
+            async with admission.admit("base", 120.0):
+                with patch("app.services.speech.admission.probe_duration", return_value=160.0):
+                    response = await client.post("/api/v1/transcription/", files=files)
+            
+            assert response.status_code == 503
+            assert response.headers["Retry-After"] == "40"
+            mock_service.transcribe.assert_not_awaited()
+    
+    async def test_transcribe_selects_model_size(self, client):
+        """Test the model parameter picks provider and size per request"""
+        with patch("app.services.speech.router.get_transcription_service") as mock_factory:
+            mock_service = AsyncMock()
+            mock_service.transcribe.return_value = AudioTranscriptionResult(
+                text="hi", confidence=0.9, model="whisper-small"
+            )
+            mock_factory.return_value = mock_service
+            
+            files = {"file": ("test.wav", b"fake_audio_data", "audio/wav")}
+            response = await client.post(
+                "/api/v1/transcription/", files=files, params={"model": "whisper-small"}
+            )
+            
+            assert response.status_code == 200
+            mock_factory.assert_called_once_with("whisper", "small")
+    
+    async def test_transcribe_unknown_model_size(self, client):
+        """Test an unknown model size is rejected"""
+        files = {"file": ("test.wav", b"fake_audio_data", "audio/wav")}
+        response = await client.post(
+            "/api/v1/transcription/", files=files, params={"model": "whisper-gigantic"}
+        )
+        assert response.status_code == 400
     
     async def test_transcribe_invalid_file(self, client):
         """Test transcription with invalid file format"""
@@ -149,7 +239,20 @@ class TestTranscriptionAPI:
     
     async def test_transcribe_with_enhancement(self, client, sample_audio_file):
         """Test transcription with LLM enhancement"""
-        with patch("app.services.speech.factory.get_transcription_service") as mock_speech_factory:
+        from app.services.llm.mapreduce import MapReduceSummarizer
+        from app.services.llm.pipeline import EnhancementPipeline
+        
+        async def correct(text):
+            return "Hello, world."
+        
+        async def summarize(text):
+            return "A greeting."
+        
+        def pipeline():
+            return EnhancementPipeline(correct, MapReduceSummarizer(summarize, summarize))
+        
+        with patch("app.main.get_transcription_service") as mock_speech_factory, \
+             patch("app.main.transcription_chain.pipeline", side_effect=pipeline):
             
             # Mock speech service
             mock_speech_service = AsyncMock()
@@ -177,11 +280,42 @@ class TestTranscriptionAPI:
             assert "text" in result
             assert "enhanced_text" in result
             assert result["text"] == "hello world"
-            assert result["enhanced_text"] == "hello world"  # For now, same as original
+            assert result["enhanced_text"] == "Hello, world."
+            assert result["summary"] == "A greeting."
+            assert result["timings"]["enhance_after_transcribe_ms"] is not None
+    
+    async def test_transcribe_enhancement_failure_keeps_text(self, client, sample_audio_file):
+        """Test an LLM failure still returns the raw transcript"""
+        from app.services.llm.mapreduce import MapReduceSummarizer
+        from app.services.llm.pipeline import EnhancementPipeline
+        
+        async def broken(text):
+            raise RuntimeError("ollama down")
+        
+        def pipeline():
+            return EnhancementPipeline(broken, MapReduceSummarizer(broken, broken))
+        
+        with patch("app.main.get_transcription_service") as mock_speech_factory, \
+             patch("app.main.transcription_chain.pipeline", side_effect=pipeline):
+            mock_speech_service = AsyncMock()
+            mock_speech_service.transcribe.return_value = AudioTranscriptionResult(
+                text="hello world", confidence=0.95, model="whisper"
+            )
+            mock_speech_factory.return_value = mock_speech_service
+            
+            with open(sample_audio_file, "rb") as f:
+                files = {"file": ("test.wav", f, "audio/wav")}
+                response = await client.post("/transcribe", files=files, data={"enhance": "true"})
+        
+        assert response.status_code == 200
+        result = response.json()
+        assert result["text"] == "hello world"
+        assert result["enhanced_text"] is None
+        assert "enhancement_error" in result
     
     async def test_transcribe_error_handling(self, client, sample_audio_file):
         """Test error handling in transcription"""
-        with patch("app.services.speech.factory.get_transcription_service") as mock_factory:
+        with patch("app.main.get_transcription_service") as mock_factory:
             mock_service = AsyncMock()
             mock_service.transcribe.side_effect = Exception("Service error")
             mock_factory.return_value = mock_service
@@ -235,6 +369,20 @@ class TestTranscriptionAPI:
         assert "processing_time_avg" in result
         assert "active_connections" in result
         assert isinstance(result["requests_total"], int)
+        assert "stages" in result
+    
+    async def test_metrics_counts_requests(self, client):
+        """Test request counter and Prometheus exposition"""
+        before = (await client.get("/metrics")).json()["requests_total"]
+        await client.get("/health")
+        after = (await client.get("/metrics")).json()["requests_total"]
+        assert after >= before + 2
+        
+        response = await client.get("/metrics?format=prometheus")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_requests_total{method="GET",path="/health",status="200"}' in response.text
+        assert "# TYPE pipeline_stage_duration_seconds histogram" in response.text
 
 
 @pytest.mark.asyncio
@@ -299,4 +447,295 @@ class TestAPIValidation:
         files = {"file": ("large.wav", large_file, "audio/wav")}
         
         response = await client.post("/api/v1/transcription/", files=files)
-        assert response.status_code == 413  # Request Entity Too Large 
\ No newline at end of file
+        assert response.status_code == 413  # Request Entity Too Large 
+    
+    async def test_chunked_upload_over_limit(self, client):
+        """Test uploads without Content-Length are cut off at the limit too"""
+        async def body():
+            yield (b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="a.wav"\r\n'
+                   b"Content-Type: audio/wav\r\n\r\n")
+            for _ in range(27):
+                yield b"x" * (1024 * 1024)
+        
+        response = await client.post(
+            "/transcribe", content=body(),
+            headers={"Content-Type": "multipart/form-data; boundary=xyz"},
+        )
+        assert response.status_code == 413
+
+class TestStreamingWebSocket:
+    """Test suite for the streaming transcription WebSocket"""
+    
+    def test_streams_partial_and_final_results(self):
+        """Test audio frames in, partial/final/done messages out"""
+        from starlette.testclient import TestClient
+        
+        received = []
+        
+        async def mock_stream(audio_stream, request):
+            async for chunk in audio_stream:
+                received.append(chunk)
+                yield AudioTranscriptionResult(
+                    text="hello", confidence=0.9, model="whisper", is_final=False
+                )
+            yield AudioTranscriptionResult(text="hello world", confidence=0.9, model="whisper")
+        
+        mock_service = MagicMock()
+        mock_service.transcribe_stream = mock_stream
+        
+        with patch("app.main.get_transcription_service", AsyncMock(return_value=mock_service)):
+            client = TestClient(app)
+            with client.websocket_connect("/transcribe/stream?language=en&format=pcm") as ws:
+                ws.send_bytes(b"\x00\x01" * 800)
+                assert ws.receive_json()["type"] == "partial"
+                ws.send_text("end")
+                final = ws.receive_json()
+                assert final["type"] == "final"
+                assert final["text"] == "hello world"
+                assert ws.receive_json() == {"type": "done"}
+        
+        assert received == [b"\x00\x01" * 800]
+
+
+@pytest.mark.asyncio
+class TestEnhancementStream:
+    """Test suite for the SSE enhancement endpoint"""
+    
+    @pytest_asyncio.fixture
+    async def client(self):
+        """Create test client"""
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            yield client
+    
+    @staticmethod
+    def _events(body: str) -> list:
+        events = []
+        for block in body.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return events
+    
+    async def test_streams_tokens_then_done(self, client):
+        """Test token events for both fields followed by the full texts"""
+        async def mock_stream(transcription):
+            for field, token in [("summary", "A"), ("processed_text", "Hello"),
+                                 ("summary", " meeting"), ("processed_text", " world.")]:
+                yield field, token
+        
+        mock_service = MagicMock()
+        mock_service.stream_transcription = mock_stream
+        
+        with patch("app.services.llm.router.get_llm_service", AsyncMock(return_value=mock_service)):
+            response = await client.post(
+                "/api/v1/enhancement/stream", json={"transcription": "hello world"}
+            )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self._events(response.text)
+        assert events[0] == ("token", {"field": "summary", "text": "A"})
+        assert [event for event, _ in events].count("token") == 4
+        assert events[-1] == ("done", {"summary": "A meeting", "processed_text": "Hello world."})
+    
+    async def test_failure_mid_stream_sends_error_event(self, client):
+        """Test a generation failure is reported in-band"""
+        async def mock_stream(transcription):
+            yield "summary", "A"
+            raise RuntimeError("Ollama went away")
+        
+        mock_service = MagicMock()
+        mock_service.stream_transcription = mock_stream
+        
+        with patch("app.services.llm.router.get_llm_service", AsyncMock(return_value=mock_service)):
+            response = await client.post(
+                "/api/v1/enhancement/stream", json={"transcription": "hello world"}
+            )
+        
+        events = self._events(response.text)
+        assert events[-1][0] == "error"
+    
+    async def test_unavailable_llm(self, client):
+        """Test 503 when the LLM backend cannot be reached"""
+        with patch("app.services.llm.router.get_llm_service", AsyncMock(side_effect=RuntimeError("down"))):
+            response = await client.post(
+                "/api/v1/enhancement/stream", json={"transcription": "hello world"}
+            )
+        
+        assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+class TestJobsAPI:
+    """Test suite for background transcription jobs"""
+    
+    @pytest_asyncio.fixture
+    async def client(self, tmp_path):
+        """Create test client backed by a throwaway job store"""
+        from app.services.jobs.store import JobStore
+        
+        store = JobStore(str(tmp_path / "jobs"))
+        with patch("app.services.jobs.router.job_store", store):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                client.store = store
+                yield client
+    
+    async def test_submit_returns_job_id(self, client):
+        """Test a job is accepted immediately and queued with its audio on disk"""
+        files = {"file": ("meeting.wav", b"RIFF....WAVE", "audio/wav")}
+        response = await client.post(
+            "/api/v1/jobs", files=files, data={"model": "whisper-small", "enhance": "true"}
+        )
+        
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] == "queued"
+        assert response.headers["location"] == body["url"] == f"/api/v1/jobs/{body['id']}"
+        job = client.store.get(body["id"])
+        assert job["params"]["model_size"] == "small"
+        assert job["params"]["enhance"] is True
+        with open(client.store.audio_path(body["id"], "wav"), "rb") as f:
+            assert f.read() == b"RIFF....WAVE"
+    
+    async def test_rejects_unknown_model_and_format(self, client):
+        """Test validation happens at submission, not in the worker"""
+        response = await client.post(
+            "/api/v1/jobs", files={"file": ("a.wav", b"x", "audio/wav")}, data={"model": "whisper-huge"}
+        )
+        assert response.status_code == 400
+        
+        response = await client.post("/api/v1/jobs", files={"file": ("a.txt", b"x", "text/plain")})
+        assert response.status_code == 415
+    
+    async def test_rejects_oversized_upload(self, client):
+        """Test uploads over JOBS_MAX_AUDIO_MB are refused and not kept"""
+        with patch.object(settings, "JOBS_MAX_AUDIO_MB", 1):
+            response = await client.post(
+                "/api/v1/jobs", files={"file": ("a.wav", b"x" * (2 * 1024 * 1024), "audio/wav")}
+            )
+        
+        assert response.status_code == 413
+        assert client.store.counts()["queued"] == 0
+    
+    async def test_status_reports_progress_and_result(self, client):
+        """Test polling shows progress in audio seconds, then the result"""
+        job_id = client.store.new_id()
+        client.store.create(job_id, "wav", {"provider": "whisper"})
+        job = client.store.claim()
+        client.store.heartbeat(job_id, job["attempts"], 30.0, 120.0)
+        
+        response = await client.get(f"/api/v1/jobs/{job_id}")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "running"
+        assert body["progress_seconds"] == 30.0
+        assert body["progress"] == 0.25
+        
+        client.store.complete(job_id, job["attempts"], {"text": "done", "duration": 120.0})
+        body = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        assert body["status"] == "completed"
+        assert body["progress"] == 1.0
+        assert body["result"]["text"] == "done"
+    
+    async def test_unknown_job(self, client):
+        """Test 404 for ids that were never queued"""
+        response = await client.get("/api/v1/jobs/nope")
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestBatchAPI:
+    """Test suite for the batch transcription endpoint"""
+    
+    @pytest_asyncio.fixture
+    async def client(self):
+        """Create test client"""
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            yield client
+    
+    @pytest.fixture
+    def mock_service(self):
+        """Speech service echoing each clip back as its text"""
+        async def transcribe(content, file_ext, vad=None):
+            data = content if isinstance(content, bytes) else content.read()
+            return AudioTranscriptionResult(text=data.decode(), confidence=0.9, model="whisper")
+        
+        with patch("app.services.speech.router.get_transcription_service") as mock_factory:
+            service = AsyncMock()
+            service.transcribe.side_effect = transcribe
+            mock_factory.return_value = service
+            yield service
+    
+    async def test_file_list_and_zip(self, client, mock_service):
+        """Test uploaded files and zip members each stream back as one NDJSON line"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as bundle:
+            bundle.writestr("b.wav", b"two")
+            bundle.writestr("c.mp3", b"three")
+        files = [
+            ("files", ("a.wav", b"one", "audio/wav")),
+            ("files", ("clips.zip", archive.getvalue(), "application/zip")),
+        ]
+        
+        response = await client.post("/api/v1/transcription/batch", files=files)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        records = [json.loads(line) for line in response.text.splitlines()]
+        texts = {record["name"]: record["result"]["text"] for record in records if record["type"] == "result"}
+        assert texts == {"a.wav": "one", "b.wav": "two", "c.mp3": "three"}
+        assert records[-1] == {**records[-1], "type": "summary", "count": 3, "failed": 0}
+    
+    async def test_manifest(self, client, mock_service, tmp_path):
+        """Test server-local paths are transcribed from BATCH_LOCAL_ROOT"""
+        (tmp_path / "a.wav").write_bytes(b"local")
+        
+        with patch.object(settings, "BATCH_LOCAL_ROOT", str(tmp_path)):
+            response = await client.post(
+                "/api/v1/transcription/batch", data={"manifest": json.dumps(["a.wav"])}
+            )
+            escaped = await client.post(
+                "/api/v1/transcription/batch", data={"manifest": "../outside.wav"}
+            )
+        
+        assert response.status_code == 200
+        assert json.loads(response.text.splitlines()[0])["result"]["text"] == "local"
+        assert escaped.status_code == 400
+    
+    async def test_rejects_empty_batch_and_corrupt_zip(self, client, mock_service):
+        """Test requests with nothing readable are refused before streaming"""
+        response = await client.post("/api/v1/transcription/batch", data={"model": "whisper"})
+        assert response.status_code == 400
+        
+        files = [("files", ("clips.zip", b"not a zip", "application/zip"))]
+        response = await client.post("/api/v1/transcription/batch", files=files)
+        assert response.status_code == 400
+    
+    async def test_uploads_outlive_the_request_handler(self, mock_service):
+        """Test clips are still readable after the request's uploads are closed"""
+        from app.services.speech.router import transcribe_batch_audio
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as bundle:
+            bundle.writestr("b.wav", b"two")
+        archive.seek(0)
+        uploads = [
+            UploadFile(io.BytesIO(b"one"), size=3, filename="a.wav"),
+            UploadFile(archive, filename="clips.zip"),
+        ]
+        read = []
+        transcribe = mock_service.transcribe.side_effect
+        
+        async def record_source(content, file_ext, vad=None):
+            read.append(content)
+            return await transcribe(content, file_ext, vad=vad)
+        
+        mock_service.transcribe.side_effect = record_source
+        response = await transcribe_batch_audio(files=uploads, manifest=None, model="whisper", vad=None)
+        # fastapi 0.110 closes request files when the endpoint returns, before the body streams
+        for upload in uploads:
+            await upload.close()
+        lines = [line async for line in response.body_iterator]
+        
+        records = [json.loads(line) for line in lines]
+        texts = {record["name"]: record["result"]["text"] for record in records if record["type"] == "result"}
+        assert texts == {"a.wav": "one", "b.wav": "two"}
+        assert all(source.closed for source in read if not isinstance(source, bytes))
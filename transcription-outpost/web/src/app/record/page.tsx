@@ -10,6 +10,17 @@ interface TranscriptionResult {
   processing_time?: number
 }
 
+interface StreamMessage extends Partial<TranscriptionResult> {
+  type: 'partial' | 'final' | 'ping' | 'done'
+}
+
+// Live results come straight from the FastAPI WebSocket, not through the Next.js API route
+const getStreamUrl = () => {
+  const base = process.env.NEXT_PUBLIC_FASTAPI_WS_URL ||
+    `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.hostname}:8000`
+  return `${base}/transcribe/stream?format=ogg&language=auto`
+}
+
 export default function RecordPage() {
   const [isRecording, setIsRecording] = useState(false)
   const [hasPermission, setHasPermission] = useState<boolean | null>(null)
@@ -21,6 +32,8 @@ export default function RecordPage() {
   const [recordedBlob, setRecordedBlob] = useState<Blob | null>(null)
   const [isClient, setIsClient] = useState(false)
   const [isMobile, setIsMobile] = useState(false)
+  const [liveFinal, setLiveFinal] = useState('')
+  const [livePartial, setLivePartial] = useState('')
 
   const mediaRecorderRef = useRef<MediaRecorder | null>(null)
   const streamRef = useRef<MediaStream | null>(null)
@@ -28,6 +41,8 @@ export default function RecordPage() {
   const intervalRef = useRef<NodeJS.Timeout | null>(null)
   const analyzerRef = useRef<AnalyserNode | null>(null)
   const animationRef = useRef<number | null>(null)
+  const socketRef = useRef<WebSocket | null>(null)
+  const pendingChunksRef = useRef<Blob[]>([])
 
   // Check if we're on client side and detect mobile
   useEffect(() => {
@@ -144,6 +159,62 @@ export default function RecordPage() {
     animationRef.current = requestAnimationFrame(updateAudioLevel)
   }
 
+  const openLiveTranscription = () => {
+    setLiveFinal('')
+    setLivePartial('')
+    pendingChunksRef.current = []
+
+    try {
+      const socket = new WebSocket(getStreamUrl())
+      socket.binaryType = 'arraybuffer'
+
+      socket.onopen = () => {
+        // Flush whatever MediaRecorder produced while the socket was connecting
+        pendingChunksRef.current.forEach(chunk => socket.send(chunk))
+        pendingChunksRef.current = []
+      }
+
+      socket.onmessage = (event) => {
+        const message: StreamMessage = JSON.parse(event.data)
+        if (message.type === 'partial') {
+          setLivePartial(message.text || '')
+        } else if (message.type === 'final') {
+          setLiveFinal(prev => [prev, message.text].filter(Boolean).join(' '))
+          setLivePartial('')
+        } else if (message.type === 'done') {
+          socket.close()
+        }
+      }
+
+      socket.onerror = () => {
+        // Live results are best effort; the full upload still works without them
+        console.warn('⚠️ Live transcription unavailable')
+      }
+
+      socketRef.current = socket
+    } catch (error) {
+      console.warn('⚠️ Could not open live transcription socket:', error)
+    }
+  }
+
+  const sendLiveChunk = (chunk: Blob) => {
+    const socket = socketRef.current
+    if (!socket) return
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(chunk)
+    } else if (socket.readyState === WebSocket.CONNECTING) {
+      pendingChunksRef.current.push(chunk)
+    }
+  }
+
+  const closeLiveTranscription = () => {
+    const socket = socketRef.current
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send('end') // Server flushes the remaining audio as final results
+    }
+    socketRef.current = null
+  }
+
   const startRecording = async () => {
     if (!streamRef.current) {
       await requestMicrophonePermission()
@@ -163,16 +234,19 @@ export default function RecordPage() {
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           chunksRef.current.push(event.data)
+          sendLiveChunk(event.data)
         }
       }
 
       mediaRecorder.onstop = () => {
         const blob = new Blob(chunksRef.current, { type: 'audio/ogg' })
         setRecordedBlob(blob)
+        closeLiveTranscription() // After the last dataavailable, so no audio is dropped
         console.log('Recording stopped, blob size:', blob.size)
       }
 
-      mediaRecorder.start(1000) // Collect data every second
+      openLiveTranscription()
+      mediaRecorder.start(250) // Small slices keep live transcription latency low
       mediaRecorderRef.current = mediaRecorder
       setIsRecording(true)
       setRecordingDuration(0)
@@ -237,6 +311,7 @@ export default function RecordPage() {
   }
 
   const cleanup = () => {
+    socketRef.current?.close()
     if (streamRef.current) {
       streamRef.current.getTracks().forEach(track => track.stop())
     }
@@ -366,6 +441,14 @@ export default function RecordPage() {
               </div>
             )}
 
+            {/* Live Transcript */}
+            {(isRecording || liveFinal || livePartial) && (
+              <div className="bg-white/10 rounded-lg p-4 mb-6 text-left text-white min-h-[3rem]">
+                <span>{liveFinal}</span>
+                {livePartial && <span className="text-white/60"> {livePartial}</span>}
+              </div>
+            )}
+
             {/* Control Buttons */}
             <div className="flex justify-center space-x-4">
               {!isRecording ? (